@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Iterator
+
+from doctree import FLOW_STYLE, TOPIC_STYLE, ActivityNode, EpcDiagram, EpcNode, IfNode
+from ir import ComposedDiagram
+
+if TYPE_CHECKING:
+    import pygraphviz as pgv
+
+# insertion ordered sets, so lookups and the drawn graph are deterministic
+Names = dict[str, None]
+
+
+def _nodes(head: EpcNode) -> Iterator[EpcNode]:
+    stack = [head]
+    while stack:
+        node = stack.pop()
+        while node:
+            yield node
+            if isinstance(node, IfNode):
+                stack.extend(branch for branch in node.branches if branch)
+            node = node.next
+
+
+def _add(index: dict[str, Names], key: str, name: str):
+    index.setdefault(key, {})[name] = None
+
+
+def _context(diagram: EpcDiagram) -> dict:
+    databases, calls, handles = {}, {}, {}
+    for node in _nodes(diagram.head):
+        if node._database:
+            databases[node._database] = None
+        if isinstance(node, ActivityNode):
+            calls.update(dict.fromkeys(node._outgoing_api_calls))
+            handles.update(dict.fromkeys(node._incoming_api_calls))
+
+    return {
+        "name": diagram.name,
+        "databases": list(databases),
+        "calls": list(calls),
+        "handles": list(handles),
+    }
+
+
+def summarize(composed: ComposedDiagram) -> dict:
+    """
+    What the index keeps of a composed diagram, as JSON: the topics of the
+    main diagram and the databases and API calls of it and its inner
+    diagrams, under their own names.
+    """
+    architecture = composed.diagram.architecture
+    return {
+        "subscribes": list(architecture._subscribes),
+        "publishes": list(architecture._publishes),
+        "context": [
+            _context(diagram) for diagram in (composed.diagram, *composed.inner)
+        ],
+    }
+
+
+class ArchitectureIndex:
+    """
+    Topics, databases and API calls of every composed diagram, indexed both
+    ways. Topics come from the main diagrams, databases and API calls from
+    the main and inner diagrams under their own names. Each flow, topic
+    and edge is kept once however often it is annotated.
+    """
+
+    def __init__(self) -> None:
+        self._subscribes: dict[str, Names] = {}
+        self._publishes: dict[str, Names] = {}
+        self._subscribers: dict[str, Names] = {}
+        self._publishers: dict[str, Names] = {}
+        self._databases: dict[str, Names] = {}
+        self._callers: dict[str, Names] = {}
+        self._handlers: dict[str, Names] = {}
+
+    def add_summary(self, name: str, summary: dict):
+        """Adds the main diagram `name` from what `summarize` kept of it."""
+        subscribes = self._subscribes.setdefault(name, {})
+        publishes = self._publishes.setdefault(name, {})
+        for topic in summary["subscribes"]:
+            subscribes[topic] = None
+            _add(self._subscribers, topic, name)
+        for topic in summary["publishes"]:
+            publishes[topic] = None
+            _add(self._publishers, topic, name)
+
+        for context in summary["context"]:
+            for database in context["databases"]:
+                _add(self._databases, database, context["name"])
+            for api in context["calls"]:
+                _add(self._callers, api, context["name"])
+            for api in context["handles"]:
+                _add(self._handlers, api, context["name"])
+
+    def add(self, composed: ComposedDiagram):
+        self.add_summary(composed.name, summarize(composed))
+
+    def subscribers(self, topic: str) -> list[str]:
+        return list(self._subscribers.get(topic, ()))
+
+    def publishers(self, topic: str) -> list[str]:
+        return list(self._publishers.get(topic, ()))
+
+    def flows_using(self, database: str) -> list[str]:
+        return list(self._databases.get(database, ()))
+
+    def callers(self, api: str) -> list[str]:
+        return list(self._callers.get(api, ()))
+
+    def handlers(self, api: str) -> list[str]:
+        return list(self._handlers.get(api, ()))
+
+    def topics(self) -> list[tuple[str, list[str], list[str]]]:
+        """The subscribed and published topics of every main diagram."""
+        return [
+            (name, list(subscribes), list(self._publishes[name]))
+            for name, subscribes in self._subscribes.items()
+        ]
+
+    def draw(self, pygraph: pgv.AGraph):
+        drawn = set()
+
+        def add_node(name: str, style: dict):
+            if name not in drawn:
+                drawn.add(name)
+                pygraph.add_node(name, **style)
+
+        for name, subscribes, publishes in self.topics():
+            if not subscribes and not publishes:
+                continue
+
+            add_node(name, FLOW_STYLE)
+            for topic in subscribes:
+                add_node(topic, TOPIC_STYLE)
+                pygraph.add_edge(topic, name)
+            for topic in publishes:
+                add_node(topic, TOPIC_STYLE)
+                pygraph.add_edge(name, topic)
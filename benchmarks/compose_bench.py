@@ -0,0 +1,79 @@
+"""
+Times composing comment heavy flows with `Composer.compose`.
+
+    python -m benchmarks.compose_bench --flows 200 --steps 50 --repeat 5
+"""
+import time
+
+import typer
+
+from compose import Composer, DiagramNodeAdder
+from doctree import EpcDiagram
+from settings.language import (
+    ArchitecturalKeywords,
+    ClusterKeywords,
+    ContextKeywords,
+    Keywords,
+)
+
+
+def _tokens(steps: int) -> list[str]:
+    tokens = [
+        f"# {ClusterKeywords.MAIN_CLUSTER} bench",
+        f"# {ArchitecturalKeywords.SUBSCRIBES} topic.a, topic.b",
+    ]
+    for index in range(steps):
+        tokens += [
+            f"# {Keywords.ACTIVITY} load {index} {ContextKeywords.DATABASE} db.table "
+            f"{ContextKeywords.API_CALL_OUT} id, key {ContextKeywords.API_CALL_IN} rows "
+            f"{Keywords.ACTIVITY} transform {index} "
+            f"{Keywords.EVENT} loaded {index} {ArchitecturalKeywords.PUBLISHES} t.{index}",
+            f"# {Keywords.IF} branch {index} {Keywords.ACTIVITY} check {index}",
+            f"# {Keywords.ACTIVITY} left {index}",
+            f"# {Keywords.ELSE} {Keywords.EVENT} right {index}",
+            f"# {Keywords.ENDIF}",
+            f"# {ClusterKeywords.INNER_FLOW} helper {index}",
+            "# a plain comment without any keyword in it at all",
+        ]
+
+    return tokens
+
+
+def _best(run, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def _match(tokens: list[list[str]]):
+    # every comment is distinct, as in a real repository
+    node_adder = DiagramNodeAdder()
+    for index, flow in enumerate(tokens):
+        diagram = EpcDiagram()
+        for token in flow:
+            node_adder._handle_flow(token=f"{token} {index}", diagram=diagram)
+
+
+def main(flows: int = 200, steps: int = 50, repeat: int = 5):
+    tokens = [_tokens(steps) for _ in range(flows)]
+    composer = Composer()
+    count = sum(map(len, tokens))
+
+    matched = _best(lambda: _match(tokens), repeat)
+    composed = _best(lambda: [composer.compose(parsed=flow) for flow in tokens], repeat)
+
+    print(f"comments : {count}")
+    print(
+        f"match    : {matched * 1000:.1f} ms ({matched / count * 1e6:.2f} us/comment)"
+    )
+    print(
+        f"compose  : {composed * 1000:.1f} ms ({composed / count * 1e6:.2f} us/comment)"
+    )
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,140 @@
+"""
+Writes synthetic source trees annotated with docupyt comments.
+
+    python -m benchmarks.generator /tmp/tree --files 200 --depth 3
+"""
+import os
+from dataclasses import asdict, dataclass
+
+import typer
+
+from settings.language import (
+    ArchitecturalKeywords,
+    ClusterKeywords,
+    ContextKeywords,
+    Keywords,
+)
+
+ANNOTATIONS = (
+    (ContextKeywords.DATABASE, "db.table_{index}"),
+    (ContextKeywords.API_CALL_OUT, "request_{index}"),
+    (ContextKeywords.API_CALL_IN, "response_{index}"),
+)
+
+
+@dataclass
+class TreeSpec:
+    files: int = 100
+    mains: int = 1
+    inners: int = 1
+    steps: int = 20
+    depth: int = 1
+    annotations: int = 1
+    directories: int = 10
+
+    def scaled(self, factor: int) -> "TreeSpec":
+        return TreeSpec(**{**asdict(self), "files": self.files * factor})
+
+
+def _activity(name: str, annotations: int) -> str:
+    text = f"{Keywords.ACTIVITY} {name}"
+    for keyword, value in ANNOTATIONS[:annotations]:
+        text += f" {keyword} {value.format(index=name.replace(' ', '_'))}"
+
+    return text
+
+
+def _steps(prefix: str, spec: TreeSpec, indent: str) -> list[str]:
+    lines = []
+    for step in range(spec.steps):
+        name = f"{prefix} step {step}"
+        lines += [
+            f"{indent}# {_activity(name, spec.annotations)}",
+            f"{indent}value = compute(value, {step})",
+        ]
+
+    return lines
+
+
+def _conditions(prefix: str, spec: TreeSpec, indent: str) -> list[str]:
+    opened = []
+    closed = []
+    for level in range(spec.depth):
+        opened += [
+            f"{indent}# {Keywords.IF} {prefix} check {level}",
+            f"{indent}# {_activity(f'{prefix} branch {level}', spec.annotations)}",
+        ]
+        closed = [
+            f"{indent}# {Keywords.ELSE}",
+            f"{indent}# {Keywords.EVENT} {prefix} rejected {level} "
+            f"{ArchitecturalKeywords.PUBLISHES} topic.{level}",
+            f"{indent}# {Keywords.ENDIF}",
+        ] + closed
+
+    return opened + closed
+
+
+def _file_source(index: int, spec: TreeSpec) -> str:
+    lines = ['"""Generated module, # not a comment."""', "import os", ""]
+    for inner in range(spec.inners):
+        name = f"helper {index} {inner}"
+        lines += [
+            f"def helper_{index}_{inner}(value):",
+            f"    # {ClusterKeywords.CLUSTER} {name}",
+            *_steps(name, spec, "    "),
+            f"    # {ClusterKeywords.END_CLUSTER}",
+            "    return value",
+            "",
+        ]
+
+    for main in range(spec.mains):
+        name = f"flow {index} {main}"
+        lines += [
+            f"def handler_{index}_{main}(value):",
+            f"    # {ClusterKeywords.MAIN_CLUSTER} {name}",
+            f"    # {ArchitecturalKeywords.SUBSCRIBES} topic.{index % 7}",
+            *_steps(name, spec, "    "),
+            *_conditions(name, spec, "    "),
+            *[
+                f"    # {ClusterKeywords.INNER_FLOW} helper {index} {inner}"
+                for inner in range(spec.inners)
+            ],
+            f"    # {ClusterKeywords.END_MAIN_CLUSTER}",
+            '    return {"note": "# act: inside a string"}',
+            "",
+        ]
+
+    return "\n".join(lines)
+
+
+def generate(root: str, spec: TreeSpec) -> list[str]:
+    """Writes `spec.files` modules spread over `spec.directories` packages."""
+    paths = []
+    for index in range(spec.files):
+        directory = os.path.join(root, f"package_{index % max(spec.directories, 1)}")
+        os.makedirs(directory, exist_ok=True)
+
+        path = os.path.join(directory, f"module_{index}.py")
+        with open(path, "w") as file:
+            file.write(_file_source(index, spec))
+        paths.append(path)
+
+    return paths
+
+
+def main(
+    root: str,
+    files: int = 100,
+    mains: int = 1,
+    inners: int = 1,
+    steps: int = 20,
+    depth: int = 1,
+    annotations: int = 1,
+):
+    spec = TreeSpec(files, mains, inners, steps, depth, annotations)
+    paths = generate(root, spec)
+    print(f"wrote {len(paths)} files to {root}")
+
+
+if __name__ == "__main__":
+    typer.run(main)
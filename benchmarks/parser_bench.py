@@ -0,0 +1,67 @@
+"""
+Compares the tokenizer based `Parser` with the comment only `CommentParser`
+on large synthetic python files.
+
+    python -m benchmarks.parser_bench --functions 2000 --repeat 3
+"""
+import os
+import tempfile
+import time
+from parser.doctree_parser import CommentParser, Parser
+
+import typer
+
+FLOW = """
+def handler_{index}(request, session):
+    # main-diagram: flow {index}
+    # act: load request {index} [=] db.requests -> request_id
+    payload = {{"id": request.id, "note": "# not a comment"}}
+    # if: payload valid
+    # act: store payload [=] db.payloads
+    for key, value in payload.items():
+        session.add(key, value * 2 + {index})
+    # else:
+    # event: rejected {index} publishes: payload.rejected
+    # end:
+    return session.commit()
+    # end-diagram-main:
+"""
+
+
+def _write_source(functions: int) -> str:
+    handle, path = tempfile.mkstemp(suffix=".py")
+    with os.fdopen(handle, "w") as file:
+        for index in range(functions):
+            file.write(FLOW.format(index=index))
+
+    return path
+
+
+def _time(parser, path: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in parser.parse(path):
+            pass
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def main(functions: int = 2000, repeat: int = 3):
+    path = _write_source(functions)
+    try:
+        size = os.path.getsize(path)
+        tokenized = _time(Parser(), path, repeat)
+        scanned = _time(CommentParser(), path, repeat)
+    finally:
+        os.remove(path)
+
+    print(f"source size      : {size / 1024:.0f} KiB")
+    print(f"Parser           : {tokenized * 1000:.1f} ms")
+    print(f"CommentParser    : {scanned * 1000:.1f} ms")
+    print(f"speedup          : {tokenized / scanned:.1f}x")
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,82 @@
+"""
+Times laying out and writing one synthetic main diagram.
+
+    python -m benchmarks.render_bench --steps 150 --repeat 3
+"""
+import os
+import tempfile
+import time
+
+import typer
+from pygraphviz import AGraph
+
+from client import DocupytClient
+from compose import Composer
+from render import OutputFormat, Renderer, RenderJob
+from settings.language import ClusterKeywords, ContextKeywords, Keywords
+
+
+def _tokens(steps: int) -> list[str]:
+    tokens = [f"# {ClusterKeywords.MAIN_CLUSTER} bench"]
+    for index in range(steps):
+        if index % 10 == 0:
+            tokens += [
+                f"# {Keywords.IF} branch {index}",
+                f"# {Keywords.ACTIVITY} left {index} {ContextKeywords.DATABASE} db.{index}",
+                f"# {Keywords.ELSE}",
+                f"# {Keywords.EVENT} right {index}",
+                f"# {Keywords.ENDIF}",
+            ]
+        else:
+            tokens.append(
+                f"# {Keywords.ACTIVITY} step {index} "
+                f"{ContextKeywords.API_CALL_OUT} api.{index}"
+            )
+
+    return tokens
+
+
+def _source(steps: int) -> str:
+    graph = AGraph(directed=True, compound=True)
+    diagram = Composer().compose(parsed=_tokens(steps))
+    DocupytClient()._draw(pygraph=graph, diagram=diagram)
+    return graph.string()
+
+
+def _best(render, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render()
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def main(steps: int = 150, repeat: int = 3):
+    source = _source(steps)
+    with tempfile.TemporaryDirectory() as directory:
+        png = os.path.join(directory, "bench.png")
+        dot = os.path.join(directory, "bench.dot")
+
+        def double_layout():
+            graph = AGraph(string=source)
+            graph.layout()
+            graph.draw(png, prog="dot")
+
+        renderer = Renderer()
+        timings = {
+            "layout() + draw(prog=dot)": _best(double_layout, repeat),
+            "png": _best(lambda: renderer.render([RenderJob(source, png)]), repeat),
+            "dot": _best(
+                lambda: renderer.render([RenderJob(source, dot, OutputFormat.DOT)]),
+                repeat,
+            ),
+        }
+
+    for name, seconds in timings.items():
+        print(f"{name:<28}: {seconds * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    typer.run(main)
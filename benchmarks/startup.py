@@ -0,0 +1,91 @@
+"""
+Times starting the `docupyt` command line in a fresh interpreter.
+
+    python -m benchmarks.startup --repeat 10 --output startup.json
+
+Three runs are timed: `--help`, drawing a tree of one file, and drawing an
+unchanged tree again with the flow cache filled. Each run also lists which
+of the heavy modules it imported.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Optional
+
+import typer
+
+from benchmarks.generator import TreeSpec, generate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ("pygraphviz", "code_tokenize", "typer")
+
+# runs main.py and prints the heavy modules it imported to stderr
+_PROBE = """
+import json
+import sys
+sys.argv = ["main.py", *sys.argv[1:]]
+try:
+    import main
+    main.app()
+except SystemExit:
+    pass
+finally:
+    print(json.dumps(sorted(set(sys.modules) & set({heavy}))), file=sys.stderr)
+"""
+
+
+def _run(args: list[str]) -> tuple[float, list[str]]:
+    command = [sys.executable, "-c", _PROBE.format(heavy=HEAVY), *args]
+    start = time.perf_counter()
+    process = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+
+    return elapsed, json.loads(process.stderr.splitlines()[-1])
+
+
+def _best(args: list[str], repeat: int) -> dict:
+    runs = [_run(args) for _ in range(repeat)]
+    return {"seconds": min(seconds for seconds, _ in runs), "imports": runs[-1][1]}
+
+
+def run(repeat: int = 5, parser: str = "tokenize") -> dict:
+    results = {"help": _best(["--help"], repeat)}
+    with tempfile.TemporaryDirectory() as root:
+        source = os.path.join(root, "src")
+        generate(source, TreeSpec(files=1, directories=1))
+
+        draw = ["--path", source, "--parser", parser, "--format", "dot"]
+        results["single_file"] = _best(
+            draw + ["--out-path", os.path.join(root, "single"), "--no-cache"],
+            repeat,
+        )
+
+        cached = draw + ["--out-path", os.path.join(root, "cached")]
+        _run(cached)
+        results["cached_noop"] = _best(cached, repeat)
+
+    return results
+
+
+def main(
+    repeat: int = 5,
+    parser: str = "tokenize",
+    output: Optional[str] = None,
+):
+    results = run(repeat, parser)
+    for name, result in results.items():
+        print(
+            f"{name:<12} {result['seconds'] * 1000:>8.1f}ms"
+            f"  {', '.join(result['imports'])}"
+        )
+
+    if output:
+        with open(output, "w") as file:
+            json.dump(results, file, indent=1)
+
+
+if __name__ == "__main__":
+    typer.run(main)
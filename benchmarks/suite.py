@@ -0,0 +1,177 @@
+"""
+Times every phase of a docupyt run on generated trees of two sizes.
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --baseline benchmarks/baseline.json
+
+Each phase is timed on a tree of `--files` files and on one `--scale`
+times larger. The exponent of the growth between the two is saved next to
+the timings: about 1 for linear phases, about 2 for quadratic ones. With
+`--baseline`, a phase that got slower than the tolerance or grows faster
+than the baseline fails the run. `benchmarks/baseline.json` holds the
+timings of the default tree; write it again with `--output` after a change
+that is meant to move them.
+"""
+import json
+import math
+import os
+import tempfile
+import time
+from parser.doctree_parser import Parser
+from typing import Callable, Optional
+
+import typer
+from pygraphviz import AGraph
+
+from benchmarks.generator import TreeSpec, generate
+from client import DocupytClient
+from clusterer import Cluster
+from compose import Composer
+from discovery import FileDiscovery
+from settings.version import VERSION
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+PHASES = ("discovery", "parse", "extract", "compose", "draw", "layout")
+MIN_SECONDS = 0.05
+
+
+def _best(run: Callable, repeat: int) -> tuple[float, object]:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        best = min(best, time.perf_counter() - start)
+
+    return best, result
+
+
+def _time_phases(root: str, repeat: int) -> dict[str, float]:
+    timings = {}
+    parser = Parser()
+    composer = Composer()
+    client = DocupytClient(parser=parser)
+
+    timings["discovery"], files = _best(
+        lambda: list(FileDiscovery().discover(root)), repeat
+    )
+    timings["parse"], _ = _best(
+        lambda: [list(parser.parse(file)) for file in files], repeat
+    )
+    timings["extract"], extracted = _best(
+        lambda: [flows for _, flows in Cluster(parser=parser).extract_files(files)],
+        repeat,
+    )
+
+    flows = [flow for found in extracted for flow in found.inner + found.main]
+    timings["compose"], diagrams = _best(
+        lambda: [composer.compose(parsed=flow.tokens) for flow in flows], repeat
+    )
+
+    def draw():
+        sources = []
+        for diagram in diagrams:
+            graph = AGraph(directed=True, compound=True)
+            client._draw(pygraph=graph, diagram=diagram)
+            sources.append(graph.string())
+        return sources
+
+    timings["draw"], sources = _best(draw, repeat)
+    timings["layout"], _ = _best(
+        lambda: [AGraph(string=source).layout(prog="dot") for source in sources],
+        repeat,
+    )
+
+    return timings
+
+
+def run(spec: TreeSpec, scale: int, repeat: int) -> dict:
+    sizes = [spec, spec.scaled(scale)]
+    timings = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as root:
+            generate(root, size)
+            timings.append(_time_phases(root, repeat))
+
+    phases = {}
+    for phase in PHASES:
+        small, large = timings[0][phase], timings[1][phase]
+        phases[phase] = {
+            "seconds": [small, large],
+            "exponent": math.log(max(large, 1e-9) / max(small, 1e-9), scale),
+        }
+
+    return {
+        "docupyt": VERSION,
+        "spec": vars(spec),
+        "scale": scale,
+        "phases": phases,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for phase, now in results["phases"].items():
+        before = baseline["phases"].get(phase)
+        if not before:
+            continue
+
+        # act: timings of phases this short are mostly noise
+        if max(now["seconds"][1], before["seconds"][1]) < MIN_SECONDS:
+            continue
+
+        ratio = now["seconds"][1] / max(before["seconds"][1], 1e-9)
+        if ratio > 1 + tolerance:
+            regressions.append(f"{phase}: {ratio:.2f}x slower than the baseline")
+        if now["exponent"] > before["exponent"] + tolerance:
+            regressions.append(
+                f"{phase}: grows as n^{now['exponent']:.2f},"
+                f" baseline n^{before['exponent']:.2f}"
+            )
+
+    return regressions
+
+
+def main(
+    files: int = 50,
+    mains: int = 1,
+    inners: int = 1,
+    steps: int = 20,
+    depth: int = 2,
+    annotations: int = 1,
+    scale: int = 4,
+    repeat: int = 3,
+    output: Optional[str] = None,
+    baseline: Optional[str] = None,
+    tolerance: float = 0.3,
+):
+    # act: a mistyped baseline must not turn the regression check off
+    if baseline and not os.path.isfile(baseline):
+        raise typer.BadParameter(f"{baseline} does not exist", param_hint="--baseline")
+
+    spec = TreeSpec(files, mains, inners, steps, depth, annotations)
+    results = run(spec, scale, repeat)
+
+    print(f"{'phase':<10} {'n':>10} {f'{scale}n':>10}  growth")
+    for phase, timing in results["phases"].items():
+        small, large = timing["seconds"]
+        print(
+            f"{phase:<10} {small * 1000:>8.1f}ms {large * 1000:>8.1f}ms"
+            f"  n^{timing['exponent']:.2f}"
+        )
+
+    if output:
+        with open(output, "w") as file:
+            json.dump(results, file, indent=1)
+
+    if baseline:
+        with open(baseline) as file:
+            regressions = compare(results, json.load(file), tolerance)
+
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+import tempfile
+from typing import Iterable, Iterator, Optional
+
+from logs import log
+from settings.version import VERSION
+
+CACHE_DIRECTORY = ".docupyt-cache"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class SpilledTokens:
+    """Tokens of one flow kept in a `FlowSpill`, read back when iterated."""
+
+    def __init__(self, spill: "FlowSpill", offset: int, size: int, count: int):
+        self._spill = spill
+        self._offset = offset
+        self._size = size
+        self._count = count
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._spill.read(self._offset, self._size))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index):
+        return self._spill.read(self._offset, self._size)[index]
+
+
+class FlowSpill:
+    """
+    Anonymous temporary file the tokens of extracted flows are moved to,
+    so only flow names and file offsets stay in memory. The file is
+    removed when the spill is garbage collected.
+    """
+
+    def __init__(self, directory: str = None) -> None:
+        self._file = tempfile.TemporaryFile(dir=directory)
+
+    def write(self, tokens: Iterable) -> SpilledTokens:
+        tokens = [str(token) for token in tokens]
+        data = json.dumps(tokens).encode()
+
+        self._file.seek(0, os.SEEK_END)
+        offset = self._file.tell()
+        self._file.write(data)
+        return SpilledTokens(self, offset, len(data), len(tokens))
+
+    def read(self, offset: int, size: int) -> list[str]:
+        self._file.seek(offset)
+        return json.loads(self._file.read(size))
+
+
+def fingerprint(*parts: str) -> str:
+    digest = hashlib.sha256(VERSION.encode())
+    for part in parts:
+        digest.update(b"\0")
+        digest.update(str(part).encode())
+
+    return digest.hexdigest()
+
+
+class FlowCache:
+    """
+    Persistent cache kept under the output directory.
+
+    `flows/` holds the flows extracted from each source file, keyed by the
+    hash of the file content, the parser and the docupyt version, and the
+    page count and topics of every drawn diagram, keyed by its fingerprint.
+    `diagrams.json` holds the fingerprint every rendered diagram was drawn
+    from, so an unchanged diagram is not laid out again.
+    """
+
+    def __init__(
+        self,
+        out_path: str,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        rebuild: bool = False,
+    ) -> None:
+        self._directory = os.path.join(out_path, CACHE_DIRECTORY)
+        self._flows_directory = os.path.join(self._directory, "flows")
+        self._diagrams_path = os.path.join(self._directory, "diagrams.json")
+        self._max_bytes = max_bytes
+        self._rebuild = rebuild
+
+        os.makedirs(self._flows_directory, exist_ok=True)
+
+    def under(self, out_path: str) -> "FlowCache":
+        """A cache with the same settings kept under another output directory."""
+        return FlowCache(out_path, max_bytes=self._max_bytes, rebuild=self._rebuild)
+
+    def key(self, content: bytes, namespace: str = "") -> str:
+        return fingerprint(namespace, hashlib.sha256(content).hexdigest())
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self._flows_directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[dict]:
+        if self._rebuild:
+            return None
+
+        path = self._entry_path(key)
+        try:
+            with open(path) as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        # act: mark entry as recently used for eviction
+        os.utime(path)
+        return entry
+
+    def put(self, key: str, entry: dict):
+        path = self._entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as file:
+            json.dump(entry, file)
+        os.replace(temporary, path)
+
+    def diagrams(self) -> dict[str, str]:
+        if self._rebuild:
+            return {}
+
+        try:
+            with open(self._diagrams_path) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def save_diagrams(self, fingerprints: dict[str, str]):
+        with open(self._diagrams_path, "w") as file:
+            json.dump(fingerprints, file, indent=1, sort_keys=True)
+
+    def evict(self):
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self._flows_directory):
+            for name in files:
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        if total <= self._max_bytes:
+            return
+
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= self._max_bytes:
+                break
+
+            os.remove(path)
+            total -= size
+            evicted += 1
+
+        log.info(msg=f"Evicted {evicted} cache entries.")
@@ -0,0 +1,133 @@
+"""
+Files changed in a git work tree since a revision, read with the `git`
+command line.
+
+    python main.py --path src --since origin/main
+
+Changed files are the ones added, modified or renamed since the revision,
+compared with the work tree, and the untracked files git does not ignore.
+Removed files are the ones deleted or renamed away. Paths are absolute and
+only the ones `FileDiscovery` would yield for the same root are kept.
+"""
+import os
+import subprocess
+from dataclasses import dataclass, field
+
+from discovery import FileDiscovery
+
+
+class GitError(Exception):
+    def __init__(self, command: list[str], reason: str) -> None:
+        super().__init__(command, reason)
+        self.command = command
+        self.reason = reason
+
+    def __str__(self) -> str:
+        return f"`{' '.join(self.command)}` failed: {self.reason}"
+
+
+def git(root: str, *args: str, allowed: tuple[int, ...] = (0,)) -> str:
+    command = ["git", "-C", root, *args]
+    try:
+        process = subprocess.run(command, capture_output=True, text=True)
+    except OSError as error:
+        raise GitError(command, str(error)) from error
+
+    if process.returncode not in allowed:
+        raise GitError(command, process.stderr.strip() or f"exit {process.returncode}")
+
+    return process.stdout
+
+
+def _fields(output: str) -> list[str]:
+    return output.split("\0")[:-1]
+
+
+@dataclass
+class Changes:
+    root: str
+    revision: str
+    changed: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    # act: where the changed files were at the revision, when they existed
+    previous: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def touched(self) -> list[str]:
+        return self.changed + self.removed
+
+    def revisions(self) -> list[str]:
+        """Files of the revision the changed and removed files replace."""
+        return list(dict.fromkeys([*self.previous.values(), *self.removed]))
+
+
+def changes_since(root: str, revision: str, discovery: FileDiscovery = None) -> Changes:
+    discovery = discovery or FileDiscovery()
+    root = os.path.abspath(root)
+    changes = Changes(root=root, revision=revision)
+
+    def path(relative: str) -> str:
+        return os.path.join(root, relative)
+
+    def keep(file: str) -> bool:
+        return discovery.accepts(root, file)
+
+    # act: paths relative to the root, renames as "R<score> old new"
+    fields = _fields(
+        git(root, "diff", "--name-status", "-z", "-M", "--relative", revision, "--")
+    )
+    index = 0
+    while index < len(fields):
+        status = fields[index]
+        if status[0] in "RC":
+            old, new = path(fields[index + 1]), path(fields[index + 2])
+            index += 3
+        else:
+            old = new = path(fields[index + 1])
+            index += 2
+
+        if status[0] == "D":
+            if keep(old):
+                changes.removed.append(old)
+            continue
+
+        if status[0] == "R" and keep(old):
+            changes.removed.append(old)
+        if keep(new):
+            changes.changed.append(new)
+            if status[0] != "A":
+                changes.previous[new] = old
+
+    untracked = _fields(git(root, "ls-files", "-z", "--others", "--exclude-standard"))
+    changes.changed += [path(file) for file in untracked if keep(path(file))]
+    return changes
+
+
+def show(root: str, revision: str, file: str) -> bytes:
+    """The content of `file` at the revision."""
+    relative = os.path.relpath(file, root).replace(os.sep, "/")
+    command = ["git", "-C", root, "show", f"{revision}:./{relative}"]
+    try:
+        process = subprocess.run(command, capture_output=True)
+    except OSError as error:
+        raise GitError(command, str(error)) from error
+
+    if process.returncode:
+        raise GitError(command, process.stderr.decode(errors="replace").strip())
+
+    return process.stdout
+
+
+def grep(root: str, words: list[str], discovery: FileDiscovery = None) -> list[str]:
+    """Tracked and untracked files under the root containing any of `words`."""
+    if not words:
+        return []
+
+    discovery = discovery or FileDiscovery()
+    patterns = [argument for word in words for argument in ("-e", word)]
+    # act: git grep exits 1 when nothing matches
+    output = git(
+        root, "grep", "-l", "-z", "-F", "--untracked", *patterns, "--", allowed=(0, 1)
+    )
+    files = [os.path.join(root, file) for file in _fields(output)]
+    return [file for file in files if discovery.accepts(root, file)]
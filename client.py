@@ -1,12 +1,39 @@
-from dataclasses import dataclass
-from parser.doctree_parser import Parser
+from __future__ import annotations
 
-from code_tokenize.tokens import TokenSequence
-from pygraphviz import AGraph
+import asyncio
+import json
+import os
+import tempfile
+from dataclasses import dataclass
+from functools import partial
+from parser.doctree_parser import IParser, Parser
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Iterable, Iterator, Optional
 
-from clusterer import Cluster
+from architecture import ArchitectureIndex, summarize
+from cache import FlowCache, FlowSpill, fingerprint
+from changes import Changes, changes_since, grep, show
+from clusterer import Cluster, Flow
 from compose import Composer
+from discovery import FileDiscovery
+from doctree import ConnectorNode, EpcDiagram, node_id
+from ir import ComposedDiagram, DiagramEntry, IRReader, IRWriter
 from logs import log
+from manifest import Manifest, source_fingerprint
+from pagination import DEFAULT_PAGE_SIZE, Page, diagram_name, page_name, paginate
+from profiling import profiler
+from registry import FlowRegistry
+from render import (
+    AsyncRenderer,
+    OutputFormat,
+    Renderer,
+    RenderJob,
+    RenderResult,
+    new_graph,
+)
+from settings.language import ArchitecturalKeywords, ClusterKeywords
+
+if TYPE_CHECKING:
+    from pygraphviz import AGraph
 
 
 @dataclass
@@ -14,69 +41,476 @@ class FileFormat:
     input_path: str
 
 
+def _owner(scope: Optional[set[str]]) -> Optional[Callable[[str], bool]]:
+    """Whether an output belongs to the diagrams in scope, all without one."""
+    if scope is None:
+        return None
+
+    return lambda output: diagram_name(output) in scope
+
+
 # Façade
 class DocupytClient:
     def __init__(
-        self, parser: Parser = Parser(), composer: Composer = Composer()
+        self,
+        parser: IParser = None,
+        composer: Composer = None,
+        cache: FlowCache = None,
+        stream: bool = False,
+        page_size: int = DEFAULT_PAGE_SIZE,
     ) -> None:
-        self._parser = parser
-        self._composer = composer
-
-    def _compose_and_draw(self, pygraph: AGraph, flow: TokenSequence):
-        # act: compose diagram
-        diagram = self._composer.compose(parsed=flow)
+        self._parser = parser or Parser()
+        self._composer = composer or Composer()
+        self._cache = cache
+        self._stream = stream
+        self._page_size = page_size
+        # act: topics, databases and API calls of the diagrams of the last run
+        self.architecture = ArchitectureIndex()
 
-        # act: draw diagram
+    def _draw(self, pygraph: AGraph, diagram: EpcDiagram):
         current_node = diagram.head
         while current_node:
             current_node.draw_line(pygraph)
             current_node = current_node.next
 
-        return diagram
-
-    def _compose_and_draw_inner(self, pygraph: AGraph, flow: TokenSequence, name: str):
+    def _draw_inner(self, pygraph: AGraph, diagram: EpcDiagram):
         pygraph.add_subgraph(
-            name=name, label=name, cluster=True, labelloc="t", fontcolor="blue"
+            name=diagram.name,
+            label=diagram.name,
+            cluster=True,
+            labelloc="t",
+            fontcolor="blue",
         )
-        sg = pygraph.get_subgraph(name=name)
+        sg = pygraph.get_subgraph(name=diagram.name)
+        self._draw(pygraph=sg, diagram=diagram)
+
+    def _compose(self, flow: Flow) -> EpcDiagram:
+        with profiler.measure("compose", flow.name):
+            return self._composer.compose(parsed=flow.tokens, name=flow.name)
+
+    def _compose_main(
+        self, main_flow: Flow, inner_flows: list[Flow]
+    ) -> ComposedDiagram:
+        # act: compose diagram
+        diagram = self._compose(main_flow)
+        inner = [self._compose(flow) for flow in inner_flows]
+        return ComposedDiagram(diagram=diagram, inner=inner)
+
+    def _source(
+        self, composed: ComposedDiagram, output_format: OutputFormat = OutputFormat.PNG
+    ) -> str:
+        with profiler.measure("draw", composed.name):
+            G = new_graph(output_format)
+            self._draw(pygraph=G, diagram=composed.diagram)
+            for inner in composed.inner:
+                self._draw_inner(pygraph=G, diagram=inner)
+            return G.string()
+
+    def _draw_page(self, pygraph: AGraph, name: str, pages: list[Page], index: int):
+        page = pages[index]
+        if page.nodes:
+            # act: connectors stand in for the nodes drawn on the other pages
+            first, last = page.nodes[0], page.nodes[-1]
+            if index > 0:
+                ConnectorNode(
+                    node_id("page", name, index), f"from page {index}", next=first
+                ).draw_line(pygraph)
+
+            following = last.next
+            if following:
+                last.next = ConnectorNode(
+                    node_id("page", name, index + 1), f"continues on page {index + 2}"
+                )
+            try:
+                for node in page.nodes:
+                    node.draw_line(pygraph)
+                if following:
+                    last.next.draw_line(pygraph)
+            finally:
+                last.next = following
+
+        for inner in page.inner:
+            self._draw_inner(pygraph=pygraph, diagram=inner)
 
-        returned = self._compose_and_draw(pygraph=sg, flow=flow)
-        return returned
+    def _page_source(
+        self,
+        composed: ComposedDiagram,
+        pages: list[Page],
+        index: int,
+        output_format: OutputFormat,
+    ) -> str:
+        if len(pages) == 1:
+            return self._source(composed, output_format)
 
-    def _draw_architectural_connections(self, pygraph: AGraph, diagram: TokenSequence):
-        diagram.architecture.draw_connections(pygraph=pygraph)
+        with profiler.measure("draw", f"{composed.name} page {index + 1}"):
+            G = new_graph(output_format)
+            self._draw_page(pygraph=G, name=composed.name, pages=pages, index=index)
+            return G.string()
 
-    def draw_epc(self, out_path: str, file_format: list[FileFormat]):
-        cluster = Cluster()
-        cluster.extract_flows(file_name_list=[file.input_path for file in file_format])
+    def _fingerprint(self, flow: Flow, inner_flows: list[Flow]) -> str:
+        return fingerprint(
+            json.dumps([flow.to_dict()] + [inner.to_dict() for inner in inner_flows])
+        )
 
-        main_flows = [flow.tokens for flow in cluster._main_flows]
-        ARCHG = AGraph(directed=True, compound=True)
-        for index, main_flow in enumerate(main_flows):
-            G = AGraph(directed=True, compound=True)
-            current_main_process = self._compose_and_draw(pygraph=G, flow=main_flow)
+    def _registry(self, cluster: Cluster) -> FlowRegistry:
+        registry = FlowRegistry()
+        registry.add(inner=cluster._inner_flows, main=cluster._main_flows)
+        return registry
 
-            current_main_process.architecture.draw_architectural(
-                ARCHG, cluster._main_flows[index].name
+    def _entry(self, registry: FlowRegistry, main_flow: Flow) -> DiagramEntry:
+        for name in registry.missing(main_flow.name):
+            log.warning(
+                msg=f"{main_flow.file}: '{main_flow.name}' references"
+                f" {ClusterKeywords.INNER_FLOW} '{name}' which is not defined"
             )
 
-            inner_flows = [
-                flow
-                for flow in cluster._inner_flows
-                if flow.name in current_main_process.inner_flow_names
-            ]
-            for inner_flow in inner_flows:
-                self._compose_and_draw_inner(
-                    pygraph=G, flow=inner_flow.tokens, name=inner_flow.name
+        inner_flows = registry.references(main_flow.name)
+        return DiagramEntry(
+            name=main_flow.name,
+            fingerprint=self._fingerprint(main_flow, inner_flows),
+            loader=partial(self._compose_main, main_flow, inner_flows),
+        )
+
+    def _entries(self, registry: FlowRegistry) -> Iterator[DiagramEntry]:
+        for main_flow in registry.main_flows():
+            yield self._entry(registry, main_flow)
+
+    def _summary_key(self, entry: DiagramEntry) -> str:
+        return fingerprint("summary", entry.fingerprint, str(self._page_size))
+
+    def _summary(self, entry: DiagramEntry) -> Optional[dict]:
+        """Page count and architecture of a diagram drawn before from the same flows."""
+        if not self._cache:
+            return None
+
+        return self._cache.get(self._summary_key(entry))
+
+    def _summarize(
+        self, entry: DiagramEntry, composed: ComposedDiagram, pages: list[Page]
+    ) -> dict:
+        summary = {"pages": len(pages), **summarize(composed)}
+        if self._cache:
+            self._cache.put(self._summary_key(entry), summary)
+
+        return summary
+
+    def _render_jobs(
+        self,
+        entries: Iterable[DiagramEntry],
+        out_path: str,
+        output_format: OutputFormat,
+        drawn: dict,
+        fingerprints: dict,
+        manifest: Manifest,
+        architecture: ArchitectureIndex,
+        scope: Optional[set[str]] = None,
+        draw_architecture: bool = True,
+    ) -> Iterator[RenderJob]:
+        for entry in entries:
+            composed = pages = None
+            summary = self._summary(entry)
+            if summary is None:
+                composed = entry.load()
+                pages = paginate(composed, self._page_size)
+                summary = self._summarize(entry, composed, pages)
+            architecture.add_summary(entry.name, summary)
+            # act: diagrams out of scope only add to the architecture
+            if scope is not None and entry.name not in scope:
+                continue
+
+            # act: split diagrams past the page size, each page is laid out
+            # on its own
+            for index in range(summary["pages"]):
+                output = os.path.join(
+                    out_path, page_name(entry.name, index, str(output_format))
                 )
+                fingerprints[output] = entry.fingerprint
+                if summary["pages"] > 1:
+                    fingerprints[output] = fingerprint(
+                        entry.fingerprint, str(self._page_size), str(index)
+                    )
+
+                # act: skip diagrams drawn from the same flows
+                if drawn.get(output) == fingerprints[output] and os.path.exists(output):
+                    log.debug(msg=f"Unchanged, skipping {output}")
+                    manifest.keep(output)
+                    continue
+
+                # act: compose only the diagrams drawn again
+                if composed is None:
+                    composed = entry.load()
+                    pages = paginate(composed, self._page_size)
+
+                # act: draw diagram
+                source = self._page_source(composed, pages, index, output_format)
+
+                if manifest.unchanged(
+                    output, source_fingerprint(source, output_format)
+                ):
+                    log.debug(msg=f"Same graph, skipping {output}")
+                    continue
+
+                yield RenderJob(source=source, output=output, format=output_format)
+
+        if not draw_architecture:
+            return
+
+        output = os.path.join(out_path, f"architecture.{output_format}")
+        # act: the architecture only changes with the topics of the diagrams
+        fingerprints[output] = fingerprint(json.dumps(architecture.topics()))
+        if drawn.get(output) == fingerprints[output] and os.path.exists(output):
+            manifest.keep(output)
+            return
 
-            G.layout()
-            G.draw(
-                f"./{out_path}/{cluster._main_flows[index].name}.png",
-                prog="dot",
+        with profiler.measure("draw", "architecture"):
+            ARCHG = new_graph(output_format)
+            architecture.draw(ARCHG)
+            source = ARCHG.string()
+
+        if not manifest.unchanged(output, source_fingerprint(source, output_format)):
+            yield RenderJob(source=source, output=output, format=output_format)
+
+    def _cluster(self) -> Cluster:
+        # act: keep only flow names in memory when streaming
+        spill = FlowSpill() if self._stream else None
+        return Cluster(parser=self._parser, cache=self._cache, spill=spill)
+
+    def _extract(self, file_format: Iterable[FileFormat], jobs: int) -> Cluster:
+        cluster = self._cluster()
+        cluster.extract_flows(
+            file_name_list=(file.input_path for file in file_format), jobs=jobs
+        )
+        return cluster
+
+    def _render(
+        self,
+        out_path: str,
+        entries: Iterable[DiagramEntry],
+        renderer: Renderer,
+        output_format: OutputFormat,
+        drawn: dict,
+        scope: Optional[set[str]] = None,
+        draw_architecture: bool = True,
+    ) -> tuple[list[RenderResult], dict]:
+        fingerprints = {}
+        manifest = Manifest(out_path, owns=_owner(scope), extension=str(output_format))
+        architecture = ArchitectureIndex()
+        results = renderer.render(
+            self._render_jobs(
+                entries,
+                out_path,
+                output_format,
+                drawn,
+                fingerprints,
+                manifest,
+                architecture,
+                scope,
+                draw_architecture,
             )
+        )
+        # act: a run drawing one diagram did not read the others
+        if draw_architecture:
+            self.architecture = architecture
+        if scope is not None:
+            # act: keep the fingerprints of the diagrams left alone
+            removed = {
+                os.path.join(out_path, name) for name in manifest.status["removed"]
+            }
+            kept = {key: value for key, value in drawn.items() if key not in removed}
+            fingerprints = {**kept, **fingerprints}
+
+        for result in results:
+            self._rendered(result, manifest, fingerprints)
+
+        self._done(manifest, results)
+        return results, fingerprints
+
+    def _rendered(self, result: RenderResult, manifest: Manifest, fingerprints: dict):
+        # act: failed diagrams are drawn again on the next run
+        manifest.rendered(result.output, result.ok)
+        if not result.ok:
+            fingerprints.pop(result.output, None)
+
+    def _done(self, manifest: Manifest, results: list[RenderResult]):
+        manifest.save()
+        failed = sum(not result.ok for result in results)
+        log.info(
+            msg=f"Done. Rendered {len(results) - failed}, failed {failed},"
+            f" unchanged {len(manifest.status['unchanged'])},"
+            f" removed {len(manifest.status['removed'])}."
+        )
+
+    def _save_diagrams(self, fingerprints: dict):
+        if self._cache:
+            self._cache.save_diagrams(fingerprints)
+            self._cache.evict()
+
+    def _draw_entries(
+        self,
+        out_path: str,
+        entries: Iterable[DiagramEntry],
+        jobs: int,
+        output_format: OutputFormat,
+    ) -> list[RenderResult]:
+        drawn = self._cache.diagrams() if self._cache else {}
+        results, fingerprints = self._render(
+            out_path, entries, Renderer(jobs=jobs), output_format, drawn
+        )
+
+        self._save_diagrams(fingerprints)
+        return results
+
+    def emit_ir(
+        self, ir_path: str, file_format: Iterable[FileFormat], jobs: int = 1
+    ) -> int:
+        cluster = self._extract(file_format, jobs)
+
+        count = 0
+        with IRWriter(ir_path) as writer:
+            for entry in self._entries(self._registry(cluster)):
+                writer.write(entry.load(), fingerprint=entry.fingerprint)
+                count += 1
 
-        ARCHG.layout()
-        ARCHG.draw(f"./{out_path}/architecture.png", prog="dot")
+        log.info(msg=f"Wrote {count} diagrams to {ir_path}.")
+        return count
+
+    def draw_ir(
+        self,
+        out_path: str,
+        ir_path: str,
+        jobs: int = 1,
+        output_format: OutputFormat = OutputFormat.PNG,
+    ) -> list[RenderResult]:
+        return self._draw_entries(out_path, IRReader(ir_path), jobs, output_format)
+
+    def draw_epc(
+        self,
+        out_path: str,
+        file_format: Iterable[FileFormat],
+        jobs: int = 1,
+        output_format: OutputFormat = OutputFormat.PNG,
+    ) -> list[RenderResult]:
+        cluster = self._extract(file_format, jobs)
+        return self._draw_entries(
+            out_path, self._entries(self._registry(cluster)), jobs, output_format
+        )
+
+    def _revision_registry(self, changes: Changes) -> FlowRegistry:
+        """Flows of the changed and removed files as they were at the revision."""
+        with tempfile.TemporaryDirectory() as directory:
+            copies = {}
+            for index, file in enumerate(changes.revisions()):
+                # act: keep the file name, the parser goes by its extension
+                copy = os.path.join(directory, str(index), os.path.basename(file))
+                os.makedirs(os.path.dirname(copy))
+                with open(copy, "wb") as target:
+                    target.write(show(changes.root, changes.revision, file))
+                copies[copy] = file
+
+            registry = FlowRegistry()
+            cluster = Cluster(parser=self._parser, cache=self._cache)
+            for copy, flows in cluster.extract_files(list(copies)):
+                for flow in flows.inner + flows.main:
+                    flow.file = copies[copy]
+                registry.add(inner=flows.inner, main=flows.main)
+
+        return registry
+
+    def draw_since(
+        self,
+        out_path: str,
+        root: str,
+        revision: str,
+        discovery: FileDiscovery = None,
+        jobs: int = 1,
+        output_format: OutputFormat = OutputFormat.PNG,
+    ) -> list[RenderResult]:
+        """
+        Draws only the main diagrams affected by the files changed since
+        `revision`: the ones defined in them, the ones referencing an inner
+        flow defined in them before or after the change, and the
+        architecture. Outputs of main diagrams that were removed are
+        deleted, every other output is left alone.
+        """
+        changes = changes_since(root, revision, discovery)
+        log.info(
+            msg=f"{len(changes.changed)} files changed and"
+            f" {len(changes.removed)} removed since {revision}."
+        )
+        previous = self._revision_registry(changes)
+
+        # act: extract the changed files, then the files naming their inner
+        # flows and the files with topics for the architecture
+        cluster = self._cluster()
+        cluster.extract_flows(changes.changed, jobs=jobs)
+        inner_names = [flow.name for flow in previous.inner_flows()]
+        inner_names += [flow.name for flow in cluster._inner_flows]
+        topics = [ArchitecturalKeywords.SUBSCRIBES, ArchitecturalKeywords.PUBLISHES]
+        files = set(grep(changes.root, inner_names, discovery))
+        files |= set(grep(changes.root, topics, discovery))
+        cluster.extract_flows(sorted(files - set(changes.changed)), jobs=jobs)
+        registry = self._registry(cluster)
+
+        affected = registry.affected(changes.touched)
+        for name in inner_names:
+            affected |= registry.dependents(name)
+        removed = previous.affected(changes.touched)
+        affected |= {name for name in removed if registry.main(name)}
+        removed = {name for name in removed if not registry.main(name)}
+        log.info(
+            msg=f"Drawing {len(affected)} affected diagrams,"
+            f" removing {len(removed)}."
+        )
+
+        drawn = self._cache.diagrams() if self._cache else {}
+        results, fingerprints = self._render(
+            out_path,
+            self._entries(registry),
+            Renderer(jobs=jobs),
+            output_format,
+            drawn,
+            scope=affected | removed,
+        )
+
+        self._save_diagrams(fingerprints)
+        return results
+
+    async def draw_epc_async(
+        self,
+        out_path: str,
+        file_format: Iterable[FileFormat],
+        jobs: int = 1,
+        output_format: OutputFormat = OutputFormat.PNG,
+        limit: int = 4,
+        timeout: Optional[float] = None,
+    ) -> AsyncIterator[RenderResult]:
+        """
+        Like `draw_epc`, but lays the diagrams out with `dot` subprocesses
+        and yields each result as soon as its output is written.
+        """
+        cluster = await asyncio.to_thread(self._extract, file_format, jobs)
+        entries = self._entries(self._registry(cluster))
+        drawn = self._cache.diagrams() if self._cache else {}
+        fingerprints = {}
+        manifest = Manifest(out_path, extension=str(output_format))
+        self.architecture = ArchitectureIndex()
+
+        results = []
+        renderer = AsyncRenderer(limit=limit, timeout=timeout)
+        async for result in renderer.render(
+            self._render_jobs(
+                entries,
+                out_path,
+                output_format,
+                drawn,
+                fingerprints,
+                manifest,
+                self.architecture,
+            )
+        ):
+            self._rendered(result, manifest, fingerprints)
+            results.append(result)
+            yield result
 
-        log.info(msg="Done.")
+        self._done(manifest, results)
+        self._save_diagrams(fingerprints)
@@ -1,90 +1,331 @@
+import os
 import re
-from copy import deepcopy
-from parser.doctree_parser import Parser
+from collections import deque
+from concurrent.futures import Executor, Future
+from dataclasses import dataclass, field
+from parser.doctree_parser import Comment, IParser, Parser
+from typing import Iterable, Iterator
 
+from cache import FlowCache, FlowSpill
+from compose import has_keywords
+from logs import log
+from profiling import profiler
 from settings.language import ClusterKeywords
 
+# act: only a diagram keyword opens or closes a flow, node keywords outside
+# a diagram are ignored, so a file without one has nothing to extract
+_DIAGRAM_KEYWORDS = re.compile(
+    b"|".join(re.escape(str(keyword).encode()) for keyword in ClusterKeywords)
+)
+
+
+def has_diagrams(source: bytes) -> bool:
+    return _DIAGRAM_KEYWORDS.search(source) is not None
+
 
 class Flow:
     tokens: list
     name: str
+    file: str
 
-    def __init__(self) -> None:
+    def __init__(self, name: str = None, file: str = None) -> None:
+        self.name = name
+        self.file = file
         self.tokens = []
 
+    def to_dict(self) -> dict:
+        return {"name": self.name, "tokens": [str(token) for token in self.tokens]}
 
-class Flows:
-    processed_indexes = {}
-    latest_flow: Flow = None
+    @classmethod
+    def from_dict(cls, data: dict) -> "Flow":
+        flow = cls(name=data["name"])
+        flow.tokens = list(data["tokens"])
+        return flow
 
 
-class Cluster:
-    _inner_flows: list[Flow] = []
-    _main_flows: list[Flow] = []
+@dataclass
+class Skipped:
+    """Files the prefilter kept from the parser, and their size."""
+
+    files: int = 0
+    bytes: int = 0
+
+    def add(self, size: int):
+        self.files += 1
+        self.bytes += size
+
+
+@dataclass
+class FileFlows:
+    inner: list[Flow] = field(default_factory=list)
+    main: list[Flow] = field(default_factory=list)
+    issues: list[str] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return {
+            "inner": [flow.to_dict() for flow in self.inner],
+            "main": [flow.to_dict() for flow in self.main],
+            "issues": self.issues,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "FileFlows":
+        return cls(
+            inner=list(map(Flow.from_dict, data["inner"])),
+            main=list(map(Flow.from_dict, data["main"])),
+            issues=list(data.get("issues", [])),
+        )
+
+
+class FlowExtractionError(Exception):
+    def __init__(self, file_path: str, reason: str) -> None:
+        super().__init__(file_path, reason)
+        self.file_path = file_path
+        self.reason = reason
+
+    def __str__(self) -> str:
+        return f"Could not extract flows from {self.file_path}: {self.reason}"
+
+
+def _location(token, index: int) -> str:
+    if isinstance(token, Comment):
+        return f"line {token.line}"
+
+    node = getattr(token, "ast_node", None)
+    if node is not None:
+        return f"line {node.start_point[0] + 1}"
+
+    return f"token {index}"
+
+
+class FlowExtractor:
+    """
+    Single pass state machine splitting a token stream into inner and main
+    flows. A flow holds its opening token and everything up to its closing
+    token. While an inner diagram is open every token belongs to it, so
+    inner diagrams written inside a main diagram are not part of it.
+    """
+
+    _NAMES = {
+        keyword: re.compile(rf"(?<={keyword})(.*?)$")
+        for keyword in (ClusterKeywords.CLUSTER, ClusterKeywords.MAIN_CLUSTER)
+    }
 
     def __init__(self) -> None:
-        pass
+        self.found = FileFlows()
+        self._inner: Flow = None
+        self._inner_at: str = None
+        self._main: Flow = None
+        self._main_at: str = None
 
-    def _find_inner_diagrams(self, token: str, index: int, flows: Flows):
-        if ClusterKeywords.CLUSTER in token:
-            flow = deepcopy(Flow())
-            flow.name = (
-                re.search(rf"(?<={ClusterKeywords.CLUSTER})(.*?)$", token)[0]
-                .lstrip()
-                .rstrip()
-            )
-            flows.latest_flow = deepcopy(flow)
-            flows.processed_indexes.update({"start_index": index})
+    def _open(self, keyword: str, token: str) -> Flow:
+        name = self._NAMES[keyword].search(token)
+        flow = Flow(name=(name[0] if name else token.split(keyword, 1)[1]).strip())
+        flow.tokens.append(token)
+        return flow
+
+    def _report(self, location: str, message: str):
+        self.found.issues.append(f"{location}: {message}")
 
-        elif ClusterKeywords.END_CLUSTER in token:
-            self._inner_flows.append(deepcopy(flows.latest_flow))
-            flows.processed_indexes.update({"end_index": index})
-            flows.latest_flow = None
+    def _feed_inner(self, token: str, location: str) -> bool:
+        if ClusterKeywords.CLUSTER in token:
+            if self._inner:
+                self._report(
+                    self._inner_at,
+                    f"{ClusterKeywords.CLUSTER} '{self._inner.name}' is not terminated",
+                )
+            self._inner = self._open(ClusterKeywords.CLUSTER, token)
+            self._inner_at = location
             return True
 
-        if flows.latest_flow is not None:
-            flows.latest_flow.tokens.append(token)
+        if not self._inner:
+            if ClusterKeywords.END_CLUSTER in token:
+                self._report(
+                    location, f"{ClusterKeywords.END_CLUSTER} without a diagram"
+                )
+            return False
+
+        if ClusterKeywords.END_CLUSTER in token:
+            self.found.inner.append(self._inner)
+            self._inner = None
+        elif has_keywords(token):
+            self._inner.tokens.append(token)
 
-    # TODO refactor repeated functionality
-    def _find_main_flows(self, token: str, index: int, flows: Flows):
+        return True
+
+    def _feed_main(self, token: str, location: str):
         if ClusterKeywords.MAIN_CLUSTER in token:
-            flow = deepcopy(Flow())
-            flow.name = (
-                re.search(rf"(?<={ClusterKeywords.MAIN_CLUSTER})(.*?)$", token)[0]
-                .lstrip()
-                .rstrip()
-            )
-            flows.latest_flow = deepcopy(flow)
-            flows.processed_indexes.update({"start_index": index})
+            if self._main:
+                self._report(
+                    self._main_at,
+                    f"{ClusterKeywords.MAIN_CLUSTER} '{self._main.name}' "
+                    "is not terminated",
+                )
+            self._main = self._open(ClusterKeywords.MAIN_CLUSTER, token)
+            self._main_at = location
 
         elif ClusterKeywords.END_MAIN_CLUSTER in token:
-            self._main_flows.append(deepcopy(flows.latest_flow))
-            flows.processed_indexes.update({"end_index": index})
-            flows.latest_flow = None
-            return True
+            if self._main:
+                self.found.main.append(self._main)
+            else:
+                self._report(
+                    location, f"{ClusterKeywords.END_MAIN_CLUSTER} without a diagram"
+                )
+            self._main = None
 
-        if flows.latest_flow is not None:
-            flows.latest_flow.tokens.append(token)
+        elif self._main and has_keywords(token):
+            self._main.tokens.append(token)
 
-    def extract_flows(self, file_name_list: list[str]):
-        for file in file_name_list:
-            parser = Parser()
-            parsed = parser.parse(file)
+    def feed(self, token_raw, index: int):
+        token = str(token_raw)
+        location = _location(token_raw, index)
+        if not self._feed_inner(token, location):
+            self._feed_main(token, location)
 
-            flows = Flows()
-            for index, token_raw in enumerate(parsed):
-                indexes_processed = self._find_inner_diagrams(
-                    str(token_raw), index, flows
-                )
+    def close(self) -> FileFlows:
+        if self._inner:
+            self._report(
+                self._inner_at,
+                f"{ClusterKeywords.CLUSTER} '{self._inner.name}' is not terminated",
+            )
+        if self._main:
+            self._report(
+                self._main_at,
+                f"{ClusterKeywords.MAIN_CLUSTER} '{self._main.name}' is not terminated",
+            )
 
-                if indexes_processed:
-                    start_index = flows.processed_indexes["start_index"]
-                    end_index = flows.processed_indexes["end_index"] + 1
+        return self.found
 
-                    del parsed[start_index:end_index]
 
-            main_flows = Flows()
-            for index, token_raw in enumerate(parsed):
-                indexes_processed = self._find_main_flows(
-                    str(token_raw), index, main_flows
-                )
+def _read(file: str) -> bytes:
+    try:
+        with open(file, "rb") as stream:
+            return stream.read()
+    except OSError as error:
+        raise FlowExtractionError(file, repr(error)) from error
+
+
+class Cluster:
+    _inner_flows: list[Flow]
+    _main_flows: list[Flow]
+
+    def __init__(
+        self,
+        parser: IParser = None,
+        cache: FlowCache = None,
+        spill: FlowSpill = None,
+    ) -> None:
+        self._parser = parser or Parser()
+        self._cache = cache
+        self._spill = spill
+        self._inner_flows = []
+        self._main_flows = []
+        self.skipped = Skipped()
+
+    def _parse_flows(self, file: str) -> FileFlows:
+        with profiler.measure("extract", file):
+            extractor = FlowExtractor()
+            tokens = profiler.iterate("parse", file, self._parser.parse, file)
+            for index, token_raw in enumerate(tokens):
+                extractor.feed(token_raw, index)
+
+            return extractor.close()
+
+    def _cache_key(self, source: bytes) -> str:
+        return self._cache.key(source, namespace=type(self._parser).__name__)
+
+    def _extract(self, files: Iterable[str], executor: Executor = None, limit: int = 1):
+        """
+        Yields the flows of every file in input order. Files without a diagram
+        keyword and cache hits are answered in place, misses are parsed here
+        or by the executor; finished results at the front of the queue are
+        yielded while later files are submitted. At most `limit` files are in
+        flight, so memory does not grow with the number of files when the
+        front of the queue is slow.
+        """
+        pending = deque()
+        for file in files:
+            source = _read(file)
+            diagrams = has_diagrams(source)
+            key = self._cache_key(source) if self._cache and diagrams else None
+            entry = self._cache.get(key) if key else None
+
+            if not diagrams:
+                # act: nothing to parse or cache
+                self.skipped.add(len(source))
+                pending.append((file, None, FileFlows(), True))
+            elif entry is not None:
+                pending.append((file, key, FileFlows.from_dict(entry), True))
+            elif executor:
+                future = executor.submit(extract_file_flows, self._parser, file)
+                pending.append((file, key, future, False))
+            else:
+                flows = extract_file_flows(self._parser, file)
+                pending.append((file, key, flows, False))
+
+            while pending and (
+                len(pending) >= limit
+                or not isinstance(pending[0][2], Future)
+                or pending[0][2].done()
+            ):
+                yield self._resolve(*pending.popleft())
+
+        while pending:
+            yield self._resolve(*pending.popleft())
+
+    def _resolve(self, file: str, key: str, result, cached: bool):
+        flows = result.result() if isinstance(result, Future) else result
+        return file, key, flows, cached
+
+    def extract_files(
+        self, file_name_list: Iterable[str], jobs: int = 1
+    ) -> Iterator[tuple[str, FileFlows]]:
+        """Yields the flows of every file in input order, caching misses."""
+        if jobs < 1:
+            jobs = os.cpu_count() or 1
+
+        executor = None
+        if jobs > 1:
+            from concurrent.futures import ProcessPoolExecutor
+
+            executor = ProcessPoolExecutor(max_workers=jobs)
+        try:
+            for file, key, flows, cached in self._extract(
+                file_name_list, executor=executor, limit=jobs * 4
+            ):
+                if self._cache and not cached:
+                    self._cache.put(key, flows.to_dict())
+
+                for issue in flows.issues:
+                    log.warning(msg=f"{file}: {issue}")
+
+                for flow in flows.inner + flows.main:
+                    flow.file = file
+
+                yield file, flows
+        finally:
+            if executor:
+                executor.shutdown(cancel_futures=True)
+
+    def extract_flows(self, file_name_list: Iterable[str], jobs: int = 1):
+        with profiler.measure("extract_flows"):
+            for _, flows in self.extract_files(file_name_list, jobs=jobs):
+                if self._spill:
+                    for flow in flows.inner + flows.main:
+                        flow.tokens = self._spill.write(flow.tokens)
+
+                self._inner_flows.extend(flows.inner)
+                self._main_flows.extend(flows.main)
+
+        if self.skipped.files:
+            log.info(
+                msg=f"Skipped {self.skipped.files} files without diagram keywords,"
+                f" {self.skipped.bytes} bytes not parsed."
+            )
+
+
+def extract_file_flows(parser: IParser, file: str) -> FileFlows:
+    try:
+        return Cluster(parser=parser)._parse_flows(file)
+    except Exception as error:
+        raise FlowExtractionError(file, repr(error)) from error
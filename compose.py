@@ -1,10 +1,14 @@
-import copy
+from __future__ import annotations
+
 import re
-from uuid import uuid4
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+from doctree import ActivityNode, EpcDiagram, EventNode, IfNode, ProcessNode, node_id
 
-from code_tokenize.tokens import TokenSequence
+if TYPE_CHECKING:
+    from code_tokenize.tokens import TokenSequence
 
-from doctree import ActivityNode, EpcDiagram, EpcNode, EventNode, IfNode, ProcessNode
 from settings.language import (
     NODE_KEYWORDS,
     SYMBOLS,
@@ -14,167 +18,253 @@ from settings.language import (
     Keywords,
 )
 
-
-class DiagramNodeAdder:
-    def _process_regex_sentitivity(self, keyword: str):
-        processed = keyword.replace("[", r"\[").replace("]", r"\]")
-        return processed
-
-    def _search_exact_regex(self, regex: str, token: str):
-        result = re.search(regex, token)
-        return result[0] if result else None
-
-    def _extract(self, token: str, keyword: str, until_one_of: list):
-        rules = "|".join(until_one_of)
-        processed_keyword = self._process_regex_sentitivity(keyword=keyword)
-        processed_rules = self._process_regex_sentitivity(keyword=rules)
-        return self._search_exact_regex(
-            regex=rf"(?<={processed_keyword})(.*?)(?=({processed_rules}|$))",
-            token=token,
-        )
-
-    def _get_after(self, token: str, keyword: str):
-        return (
-            self._extract(token=token, keyword=keyword, until_one_of=SYMBOLS)
-            .lstrip()
-            .rstrip()
+_KEYWORDS = sorted(
+    {
+        str(keyword)
+        for keywords in (
+            Keywords,
+            ContextKeywords,
+            ClusterKeywords,
+            ArchitecturalKeywords,
         )
-
-    def _split_flow(self, token: str):
-        rules = "|".join(NODE_KEYWORDS)
-        regex = rf"({rules})(.*?)(?=({rules}|$))"
-        flows = [
-            x.group()
-            for x in re.finditer(
-                regex,
-                token,
-            )
+        for keyword in keywords
+    },
+    key=len,
+    reverse=True,
+)
+# a lookahead matches at every position, so overlapping keywords are all found;
+# the leading class lets the engine skip characters no keyword starts with
+_KEYWORD_PATTERN = re.compile(
+    "(?=[{}])(?=({}))".format(
+        "".join(sorted({re.escape(keyword[0]) for keyword in _KEYWORDS})),
+        "|".join(re.escape(keyword) for keyword in _KEYWORDS),
+    )
+)
+_SYMBOLS = frozenset(map(str, SYMBOLS))
+_NODE_KEYWORDS = frozenset(map(str, NODE_KEYWORDS))
+
+
+class KeywordScan:
+    """
+    Positions of every docupyt keyword in a comment, found in one scan with
+    a pattern compiled once from `settings.language`. Lookups are answered
+    from the recorded positions, optionally within a `[start, end)` section
+    of the comment.
+    """
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.positions = [
+            (match.start(), match.group(1)) for match in _KEYWORD_PATTERN.finditer(text)
         ]
+        self._occurrences: dict[str, list[int]] = {}
+        for position, keyword in self.positions:
+            self._occurrences.setdefault(keyword, []).append(position)
+
+    def find(self, keyword: str, start: int = 0, end: int = None) -> int:
+        end = len(self.text) if end is None else end
+        for position in self._occurrences.get(keyword, ()):
+            if start <= position <= end - len(keyword):
+                return position
+
+        return -1
+
+    def has(self, keyword: str, start: int = 0, end: int = None) -> bool:
+        if start == 0 and end is None:
+            return keyword in self._occurrences
+
+        return self.find(keyword, start, end) != -1
+
+    def _line_end(self, end: int) -> int:
+        # act: like `$`, the end of a section or just before its last newline
+        return end - 1 if end and self.text[end - 1] == "\n" else end
+
+    def _stop(self, begin: int, end: int, keywords: frozenset) -> int:
+        """
+        Where the text after a keyword ending at `begin` stops: at the next of
+        `keywords` or the end of the section, -1 when a line ends first.
+        """
+        stop = max(begin, self._line_end(end))
+        for position, found in self.positions:
+            if position >= stop:
+                break
+            if position >= begin and found in keywords:
+                if position + len(found) <= end:
+                    stop = position
+                    break
+
+        return -1 if "\n" in self.text[begin:stop] else stop
+
+    def after(self, keyword: str, start: int = 0, end: int = None) -> str:
+        """
+        Text after `keyword` up to the next symbol, stripped. The text does
+        not run over a line, so the first occurrence it fits after is taken.
+        """
+        end = len(self.text) if end is None else end
+        for position in self._occurrences.get(keyword, ()):
+            if not start <= position <= end - len(keyword):
+                continue
 
-        return flows
-
-    def _handle_subscriptions(self, token: str, diagram: EpcDiagram) -> EpcNode:
-        if ArchitecturalKeywords.SUBSCRIBES in token:
-            raw_action = self._get_after(token, ArchitecturalKeywords.SUBSCRIBES)
-            subscriptions = list(
-                map(lambda x: x.lstrip().rstrip(), raw_action.split(","))
-            )
-
-            for subscription in subscriptions:
-                diagram.architecture.subscribe(subscription)
+            begin = position + len(keyword)
+            stop = self._stop(begin, end, _SYMBOLS)
+            if stop != -1:
+                return self.text[begin:stop].strip()
+
+        return ""
+
+    def sections(self) -> list[tuple[str, int, int]]:
+        """
+        Splits the comment at node keywords. A section runs from its keyword
+        to the next node keyword that starts after it or to the end of the
+        line; a keyword whose line goes on past the section is skipped.
+        """
+        sections = []
+        resume = 0
+        for position, keyword in self.positions:
+            if keyword not in _NODE_KEYWORDS or position < resume:
+                continue
 
-    def _handle_activity(self, token: str, diagram: EpcDiagram) -> EpcNode:
-        if Keywords.ACTIVITY in token:
-            raw_action = self._get_after(token, Keywords.ACTIVITY)
-            node = ActivityNode(description=raw_action)
+            stop = self._stop(position + len(keyword), len(self.text), _NODE_KEYWORDS)
+            if stop != -1:
+                sections.append((keyword, position, stop))
+                resume = stop
 
-            if ContextKeywords.DATABASE in token:
-                db = self._get_after(token, ContextKeywords.DATABASE)
-                node.set_database_connection(database=db)
+        return sections
 
-            if ContextKeywords.API_CALL_IN in token:
-                call = self._get_after(token, ContextKeywords.API_CALL_IN)
-                node.set_incoming_api_call(api_call=call)
 
-            if ContextKeywords.API_CALL_OUT in token:
-                call = self._get_after(token, ContextKeywords.API_CALL_OUT)
-                node.set_outgoing_api_call(api_call=call)
+scan = lru_cache(maxsize=4096)(KeywordScan)
 
-            diagram.push(node)
 
-    def _handle_event(self, token: str, diagram: EpcDiagram) -> EpcNode:
-        if Keywords.EVENT in token:
-            raw_action = self._get_after(token, Keywords.EVENT)
-            diagram.push(EventNode(description=raw_action))
+def has_keywords(text: str) -> bool:
+    return _KEYWORD_PATTERN.search(text) is not None
 
-            if ArchitecturalKeywords.PUBLISHES in token:
-                raw_action = self._get_after(token, ArchitecturalKeywords.PUBLISHES)
-                diagram.architecture.publish(raw_action)
 
-    def _handle_inner_flow(self, token: str, diagram: EpcDiagram) -> EpcNode:
-        if ClusterKeywords.INNER_FLOW in token:
-            raw_name = self._get_after(token, ClusterKeywords.INNER_FLOW)
-            diagram.inner_flow_names.append(str(raw_name))
-            diagram.push(ProcessNode(description=raw_name))
+class DiagramNodeAdder:
+    def _get_after(self, token: str, keyword: str):
+        return scan(token).after(keyword)
+
+    def _handle_subscriptions(self, scanned: KeywordScan, diagram: EpcDiagram):
+        raw_action = scanned.after(ArchitecturalKeywords.SUBSCRIBES)
+        for subscription in raw_action.split(","):
+            diagram.architecture.subscribe(subscription.strip())
+
+    def _add_activity(
+        self, scanned: KeywordScan, start: int, end: int, diagram: EpcDiagram
+    ):
+        node = ActivityNode(description=scanned.after(Keywords.ACTIVITY, start, end))
+
+        if scanned.has(ContextKeywords.DATABASE, start, end):
+            db = scanned.after(ContextKeywords.DATABASE, start, end)
+            node.set_database_connection(database=db)
+
+        if scanned.has(ContextKeywords.API_CALL_IN, start, end):
+            call = scanned.after(ContextKeywords.API_CALL_IN, start, end)
+            node.set_incoming_api_call(api_call=call)
+
+        if scanned.has(ContextKeywords.API_CALL_OUT, start, end):
+            call = scanned.after(ContextKeywords.API_CALL_OUT, start, end)
+            node.set_outgoing_api_call(api_call=call)
+
+        diagram.push(node)
+
+    def _add_event(
+        self, scanned: KeywordScan, start: int, end: int, diagram: EpcDiagram
+    ):
+        raw_action = scanned.after(Keywords.EVENT, start, end)
+        diagram.push(EventNode(description=raw_action))
+
+        if scanned.has(ArchitecturalKeywords.PUBLISHES, start, end):
+            raw_action = scanned.after(ArchitecturalKeywords.PUBLISHES, start, end)
+            diagram.architecture.publish(raw_action)
+
+    _NODE_HANDLERS = {
+        Keywords.ACTIVITY: _add_activity,
+        Keywords.EVENT: _add_event,
+    }
+
+    def _handle_activity(self, token: str, diagram: EpcDiagram):
+        scanned = scan(token)
+        if scanned.has(Keywords.ACTIVITY):
+            self._add_activity(scanned, 0, len(token), diagram)
+
+    def _handle_event(self, token: str, diagram: EpcDiagram):
+        scanned = scan(token)
+        if scanned.has(Keywords.EVENT):
+            self._add_event(scanned, 0, len(token), diagram)
+
+    def _handle_inner_flow(self, scanned: KeywordScan, diagram: EpcDiagram):
+        raw_name = scanned.after(ClusterKeywords.INNER_FLOW)
+        diagram.inner_flow_names.append(raw_name)
+        diagram.push(ProcessNode(description=raw_name))
 
     def _handle_flow(self, token: str, diagram: EpcDiagram):
-        self._handle_inner_flow(token=token, diagram=diagram)
-        self._handle_subscriptions(token=token, diagram=diagram)
-
-        flows = self._split_flow(token=token)
-        for flow in flows:
-            self._handle_activity(token=flow, diagram=diagram)
-            self._handle_event(token=flow, diagram=diagram)
-
-    def _handle_if(self, sequence: TokenSequence, depth=0) -> EpcNode:
-        first_element = str(sequence.pop(0))
-        if Keywords.IF not in str(first_element):
-            return None, None
-
-        if_node = copy.deepcopy(IfNode(uuid4()))
-        current_branch = copy.deepcopy(EpcDiagram())
-
-        self._handle_flow(token=first_element, diagram=current_branch)
-
-        depth_inner_processed_index = None
-        depth_latest_index = None
-
-        for index, token_raw in enumerate(sequence):
-            token = str(token_raw)
-
-            if (
-                depth_latest_index and depth_inner_processed_index
-            ) and index < depth_latest_index + depth_inner_processed_index + 1:
-                continue
-            else:
-                depth_inner_processed_index = None
-                depth_latest_index = None
-
-            if Keywords.IF in token:
-                # eğer diagramı içeri geçersen hem içteki hem dıştaki çizecek.
-                depth_latest_index = index
-                depth_inner_processed_index, depth_if = self._handle_if(
-                    sequence=sequence[index:], depth=depth + 1
-                )
-
-                if depth_inner_processed_index:
-                    current_branch.push(depth_if)
-                    continue
-
-            if Keywords.ELSE in token:
-                if_node.branches.append(current_branch.head)
-                current_branch = EpcDiagram()
-
-            self._handle_flow(token=token, diagram=current_branch)
-
-            if Keywords.ENDIF in token:
-                if_node.branches.append(current_branch.head)
-                return index + 1, if_node
-
-        return None, None
-
-    def add_nodes(self, token_sequence: str) -> EpcDiagram:
-        diagram = EpcDiagram()
-        inner_processed_index = None
-        latest_index = None
-        for index, token_raw in enumerate(token_sequence):
-            token = str(token_raw)
-
-            if (
-                latest_index and inner_processed_index
-            ) and index < latest_index + inner_processed_index + 1:
+        scanned = scan(token)
+        if not scanned.positions:
+            return
+
+        if scanned.has(ClusterKeywords.INNER_FLOW):
+            self._handle_inner_flow(scanned, diagram)
+        if scanned.has(ArchitecturalKeywords.SUBSCRIBES):
+            self._handle_subscriptions(scanned, diagram)
+
+        for keyword, start, end in scanned.sections():
+            handler = self._NODE_HANDLERS.get(keyword)
+            if handler:
+                handler(self, scanned, start, end, diagram)
+
+    def _match_conditions(self, tokens: list[str]) -> dict[int, int]:
+        """
+        Pairs every `if:` with the `end:` closing it, in one pass over the
+        flow. An `if:` that is never closed and an `end:` without an open
+        `if:` are left unpaired and handled as plain flow.
+        """
+        matches = {}
+        opened = []
+        for index, token in enumerate(tokens):
+            scanned = scan(token)
+            if scanned.has(Keywords.IF):
+                opened.append(index)
+            elif scanned.has(Keywords.ENDIF) and opened:
+                matches[opened.pop()] = index
+
+        return matches
+
+    def _branch(self, diagram: EpcDiagram) -> EpcDiagram:
+        # act: branches share the inner flows and topics of their diagram
+        branch = EpcDiagram(name=diagram.name)
+        branch.inner_flow_names = diagram.inner_flow_names
+        branch.architecture = diagram.architecture
+        return branch
+
+    def add_nodes(self, token_sequence: TokenSequence, name: str = "EPC") -> EpcDiagram:
+        tokens = [str(token) for token in token_sequence]
+        matches = self._match_conditions(tokens)
+
+        diagram = EpcDiagram(name=name)
+        # open conditions as (if node, branch being filled, closing index)
+        conditions: list[tuple[IfNode, EpcDiagram, int]] = []
+        current = diagram
+        for index, token in enumerate(tokens):
+            if index in matches:
+                if_node = IfNode(node_id("if", name, index, token))
+                current.push(if_node)
+                current = self._branch(diagram)
+                conditions.append((if_node, current, matches[index]))
+                self._handle_flow(token=token, diagram=current)
                 continue
 
-            inner_processed_index, if_node = self._handle_if(
-                sequence=token_sequence[index:]
-            )
+            if conditions and scan(token).has(Keywords.ELSE):
+                if_node, branch, end = conditions.pop()
+                if_node.branches.append(branch.head)
+                current = self._branch(diagram)
+                conditions.append((if_node, current, end))
 
-            if inner_processed_index:
-                latest_index = index
-                diagram.push(if_node)
-                continue
+            self._handle_flow(token=token, diagram=current)
 
-            self._handle_flow(token=token, diagram=diagram)
+            if conditions and conditions[-1][2] == index:
+                if_node, branch, _ = conditions.pop()
+                if_node.branches.append(branch.head)
+                current = conditions[-1][1] if conditions else diagram
 
         return diagram
 
@@ -185,12 +275,12 @@ class Composer:
     def _get_after(self, string: str, keyword: str):
         return string.split(keyword, 1)[1]
 
-    def _struct(self, parsed: TokenSequence) -> EpcDiagram:
+    def _struct(self, parsed: TokenSequence, name: str = "EPC") -> EpcDiagram:
         node_adder = DiagramNodeAdder()
-        diagram = node_adder.add_nodes(token_sequence=parsed)
+        diagram = node_adder.add_nodes(token_sequence=parsed, name=name)
 
         return diagram
 
-    def compose(self, parsed: TokenSequence):
-        diagram = self._struct(parsed=parsed)
+    def compose(self, parsed: TokenSequence, name: str = "EPC"):
+        diagram = self._struct(parsed=parsed, name=name)
         return diagram
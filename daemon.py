@@ -0,0 +1,344 @@
+"""
+Render daemon keeping the client, the parser and the extracted flows warm
+between runs.
+
+    python main.py --serve --port 8765
+    python main.py --path src --daemon
+
+It listens on localhost only and takes JSON requests:
+
+    POST /render   {"path", "out_path", "format"}          rendered outputs
+    POST /diagram  {"path", "out_path", "format", "name"}  pages of one diagram
+    POST /ir       {"path", "out_path", "format"}          IR as JSON lines
+    GET  /status                                           warm workspaces
+
+Each source directory, output directory and format is a workspace holding
+the flows of every file. A request first checks the modification time and
+size of the files and extracts only the ones that changed, by content hash
+from the flow cache when it is enabled. Each workspace keeps that cache
+under its own output directory. Graphviz is not thread safe, so
+requests are worked off one at a time. At most `max_requests` are admitted,
+the rest are turned away as busy.
+
+Only requests naming the daemon's own address in `Host` are answered, so a
+web page cannot reach it through a rebound domain, and a POST must be
+`application/json`, which a page cannot send to another origin without the
+daemon agreeing to it first.
+"""
+import copy
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from client import DocupytClient
+from clusterer import FlowExtractionError
+from discovery import FileDiscovery
+from ir import encode_record, header
+from logs import log
+from render import OutputFormat
+from settings.daemon import DEFAULT_HOST, DEFAULT_PORT
+from watch import Watcher, WatchSession
+
+Reply = tuple[int, str, str]
+
+
+class DaemonError(Exception):
+    def __init__(self, status: int, reason: str) -> None:
+        super().__init__(status, reason)
+        self.status = status
+        self.reason = reason
+
+    def __str__(self) -> str:
+        return f"Daemon answered {self.status}: {self.reason}"
+
+
+def _json(status: int, body: dict) -> Reply:
+    return status, json.dumps(body), "application/json"
+
+
+class Workspace:
+    def __init__(
+        self,
+        client: DocupytClient,
+        root: str,
+        out_path: str,
+        output_format: OutputFormat,
+        discovery: FileDiscovery,
+        jobs: int = 1,
+    ) -> None:
+        # act: each output directory keeps the fingerprints of its own diagrams
+        if client._cache:
+            client = copy.copy(client)
+            client._cache = client._cache.under(out_path)
+
+        self.out_path = out_path
+        self.output_format = output_format
+        self.session = WatchSession(client, out_path, jobs, output_format)
+        self._watcher = Watcher(root, self.session, discovery=discovery)
+
+    def sync(self) -> int:
+        """Extracts the files changed since the last request."""
+        previous = self._watcher._snapshot
+        changed, removed = self._watcher._poll()
+        try:
+            if changed or removed:
+                self.session.refresh(sorted(changed), sorted(removed))
+        except FlowExtractionError:
+            # act: extract the same files again on the next request
+            self._watcher._snapshot = previous
+            raise
+
+        return len(changed) + len(removed)
+
+
+class RenderDaemon:
+    def __init__(
+        self,
+        client: DocupytClient,
+        discovery: FileDiscovery = None,
+        jobs: int = 1,
+        max_requests: int = 4,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+    ) -> None:
+        self._client = client
+        self._discovery = discovery or FileDiscovery()
+        self._jobs = jobs
+        self._slots = threading.BoundedSemaphore(max_requests)
+        self._work = threading.Lock()
+        self._workspaces: dict[tuple, Workspace] = {}
+
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.render_daemon = self
+
+    def _workspace(self, request: dict) -> Workspace:
+        if not request.get("path"):
+            raise ValueError("path is required")
+
+        root = os.path.abspath(request["path"])
+        out_path = os.path.abspath(request.get("out_path") or "_outputs")
+        output_format = OutputFormat(request.get("format") or OutputFormat.PNG)
+
+        key = (root, out_path, output_format)
+        if key not in self._workspaces:
+            self._workspaces[key] = Workspace(
+                self._client,
+                root,
+                out_path,
+                output_format,
+                self._discovery,
+                jobs=self._jobs,
+            )
+
+        return self._workspaces[key]
+
+    def _render(self, request: dict) -> Reply:
+        workspace = self._workspace(request)
+        os.makedirs(workspace.out_path, exist_ok=True)
+        changed = workspace.sync()
+        results = workspace.session.render()
+        return _json(
+            200,
+            {
+                "changed": changed,
+                "rendered": [result.output for result in results if result.ok],
+                "failed": {
+                    result.output: result.error for result in results if not result.ok
+                },
+            },
+        )
+
+    def _diagram(self, request: dict) -> Reply:
+        workspace = self._workspace(request)
+        os.makedirs(workspace.out_path, exist_ok=True)
+        workspace.sync()
+        entry = workspace.session.entry(request.get("name"))
+        if entry is None:
+            return _json(404, {"error": f"no diagram named {request.get('name')!r}"})
+
+        results = workspace.session.render(entry.name)
+        failed = [result for result in results if not result.ok]
+        if failed:
+            return _json(500, {"error": failed[0].error})
+
+        return _json(200, {"rendered": [result.output for result in results]})
+
+    def _ir(self, request: dict) -> Reply:
+        workspace = self._workspace(request)
+        workspace.sync()
+        lines = [json.dumps(header())]
+        for entry in workspace.session.entries():
+            lines.append(json.dumps(encode_record(entry.load(), entry.fingerprint)))
+
+        return 200, "\n".join(lines) + "\n", "application/x-ndjson"
+
+    def status(self) -> Reply:
+        return _json(
+            200,
+            {
+                "workspaces": [
+                    {"path": root, "out_path": out_path, "format": str(output_format)}
+                    for root, out_path, output_format in self._workspaces
+                ]
+            },
+        )
+
+    def handle(self, route: str, request: dict) -> Reply:
+        handler = {
+            "/render": self._render,
+            "/diagram": self._diagram,
+            "/ir": self._ir,
+        }.get(route)
+        if handler is None:
+            return _json(404, {"error": f"unknown route {route}"})
+
+        if not self._slots.acquire(blocking=False):
+            return _json(503, {"error": "busy"})
+
+        try:
+            with self._work:
+                return handler(request)
+        except ValueError as error:
+            return _json(400, {"error": str(error)})
+        except FlowExtractionError as error:
+            return _json(422, {"error": str(error)})
+        except Exception as error:
+            log.exception(msg=f"Request to {route} failed")
+            return _json(500, {"error": repr(error)})
+        finally:
+            self._slots.release()
+
+    def serve(self):
+        host, port = self.server.server_address[:2]
+        log.info(msg=f"Serving on http://{host}:{port}")
+        try:
+            self.server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.server.server_close()
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def _hosts(self) -> set[str]:
+        host, port = self.server.server_address[:2]
+        return {f"{name}:{port}" for name in (host, "localhost", "127.0.0.1")}
+
+    def _refused(self) -> Optional[Reply]:
+        if self.headers.get("Host") not in self._hosts():
+            return _json(403, {"error": "unknown host"})
+
+        return None
+
+    def _reply(self, reply: Reply):
+        status, body, content_type = reply
+        data = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        refused = self._refused()
+        if refused:
+            self._reply(refused)
+        elif self.path == "/status":
+            self._reply(self.server.render_daemon.status())
+        else:
+            self._reply(_json(404, {"error": f"unknown route {self.path}"}))
+
+    def do_POST(self):
+        refused = self._refused()
+        if refused:
+            self._reply(refused)
+            return
+
+        if self.headers.get_content_type() != "application/json":
+            self._reply(_json(415, {"error": "request is not application/json"}))
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._reply(_json(400, {"error": "request is not JSON"}))
+            return
+
+        self._reply(self.server.render_daemon.handle(self.path, request))
+
+    def log_message(self, format: str, *args):
+        log.debug(msg=format % args)
+
+
+class DaemonClient:
+    """
+    Sends requests to a running daemon. A request answers None when no
+    daemon is listening, it is busy or it does not answer within `timeout`,
+    so the caller can work in process.
+    """
+
+    def __init__(
+        self,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        timeout: float = 600.0,
+    ) -> None:
+        self._url = f"http://{host}:{port}"
+        self._timeout = timeout
+
+    def _request(self, route: str, payload: dict) -> Optional[str]:
+        request = urllib.request.Request(
+            self._url + route,
+            data=json.dumps(payload).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self._timeout) as response:
+                return response.read().decode()
+        except urllib.error.HTTPError as error:
+            reason = error.read().decode()
+            if error.code == 503:
+                return None
+            try:
+                reason = json.loads(reason)["error"]
+            except (ValueError, KeyError, TypeError):
+                pass
+            raise DaemonError(error.code, reason) from error
+        except (urllib.error.URLError, ConnectionError, TimeoutError):
+            return None
+
+    def _payload(self, path: str, out_path: str, output_format: OutputFormat) -> dict:
+        return {
+            "path": os.path.abspath(path),
+            "out_path": os.path.abspath(out_path),
+            "format": str(output_format),
+        }
+
+    def render(
+        self, path: str, out_path: str, output_format: OutputFormat
+    ) -> Optional[dict]:
+        body = self._request("/render", self._payload(path, out_path, output_format))
+        return None if body is None else json.loads(body)
+
+    def diagram(
+        self, path: str, out_path: str, output_format: OutputFormat, name: str
+    ) -> Optional[dict]:
+        payload = {**self._payload(path, out_path, output_format), "name": name}
+        body = self._request("/diagram", payload)
+        return None if body is None else json.loads(body)
+
+    def ir(self, path: str) -> Optional[list[dict]]:
+        body = self._request("/ir", {"path": os.path.abspath(path)})
+        if body is None:
+            return None
+
+        return [json.loads(line) for line in body.splitlines() if line]
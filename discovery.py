@@ -0,0 +1,234 @@
+import os
+import re
+from dataclasses import dataclass, field
+from fnmatch import fnmatch
+from typing import Iterator, Optional
+
+DEFAULT_INCLUDE = ("*.py",)
+DEFAULT_PRUNE = (
+    ".git",
+    ".hg",
+    ".svn",
+    ".tox",
+    ".nox",
+    ".venv",
+    "venv",
+    "__pycache__",
+    "node_modules",
+    ".mypy_cache",
+    ".pytest_cache",
+)
+IGNORE_FILES = (".gitignore", ".docupytignore")
+
+
+def _translate(pattern: str) -> str:
+    """
+    Translates a gitignore glob into a regex. `*` and `?` never cross a
+    `/`, `**` does.
+    """
+    index, length, regex = 0, len(pattern), ""
+    while index < length:
+        char = pattern[index]
+        if pattern.startswith("**/", index):
+            regex += "(?:.*/)?"
+            index += 3
+            continue
+        if pattern.startswith("**", index):
+            regex += ".*"
+            index += 2
+            continue
+
+        if char == "*":
+            regex += "[^/]*"
+        elif char == "?":
+            regex += "[^/]"
+        elif char == "\\" and index + 1 < length:
+            regex += re.escape(pattern[index + 1])
+            index += 1
+        elif char == "[" and pattern.find("]", index + 2) != -1:
+            start, end = index + 1, pattern.find("]", index + 2)
+            body = pattern[start:end]
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            regex += f"[{body}]"
+            index = end
+        else:
+            regex += re.escape(char)
+        index += 1
+
+    return regex
+
+
+@dataclass
+class IgnoreRule:
+    regex: re.Pattern
+    negate: bool
+    directory_only: bool
+
+    @classmethod
+    def parse(cls, line: str) -> Optional["IgnoreRule"]:
+        line = line.rstrip("\n").rstrip("\r")
+        if not line.strip() or line.startswith("#"):
+            return None
+
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+
+        if not line.endswith("\\ "):
+            line = line.rstrip()
+
+        directory_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            return None
+
+        anchored = "/" in line
+        line = line.lstrip("/")
+        prefix = "" if anchored else "(?:.*/)?"
+
+        return cls(
+            regex=re.compile(rf"{prefix}{_translate(line)}$"),
+            negate=negate,
+            directory_only=directory_only,
+        )
+
+
+@dataclass
+class IgnoreRules:
+    """Rules of one `.gitignore` style file, relative to its directory."""
+
+    base: str
+    rules: list[IgnoreRule] = field(default_factory=list)
+
+    @classmethod
+    def load(cls, directory: str, file_names=IGNORE_FILES) -> Optional["IgnoreRules"]:
+        rules = []
+        for file_name in file_names:
+            path = os.path.join(directory, file_name)
+            if not os.path.isfile(path):
+                continue
+
+            with open(path, errors="replace") as file:
+                rules.extend(filter(None, map(IgnoreRule.parse, file)))
+
+        return cls(base=directory, rules=rules) if rules else None
+
+    def match(self, path: str, is_dir: bool) -> Optional[bool]:
+        relative = os.path.relpath(path, self.base).replace(os.sep, "/")
+
+        decision = None
+        for rule in self.rules:
+            if rule.directory_only and not is_dir:
+                continue
+            if rule.regex.match(relative):
+                decision = not rule.negate
+
+        return decision
+
+
+class FileDiscovery:
+    """
+    Streams the files under a directory with `os.scandir`. Directories that
+    are pruned, excluded or ignored are never descended into, and every
+    path is yielded as soon as its directory has been scanned.
+    """
+
+    def __init__(
+        self,
+        include: tuple[str, ...] = DEFAULT_INCLUDE,
+        exclude: tuple[str, ...] = (),
+        prune: tuple[str, ...] = DEFAULT_PRUNE,
+        ignore_files: tuple[str, ...] = IGNORE_FILES,
+    ) -> None:
+        self._include = tuple(include) or DEFAULT_INCLUDE
+        self._exclude = tuple(exclude)
+        self._prune = set(prune)
+        self._ignore_files = tuple(ignore_files)
+
+    def _matches(self, root: str, path: str, name: str, patterns) -> bool:
+        relative = os.path.relpath(path, root).replace(os.sep, "/")
+        return any(
+            fnmatch(name, pattern) or fnmatch(relative, pattern) for pattern in patterns
+        )
+
+    def _ignored(self, chain: tuple[IgnoreRules, ...], path: str, is_dir: bool):
+        ignored = False
+        for rules in chain:
+            decision = rules.match(path, is_dir)
+            if decision is not None:
+                ignored = decision
+
+        return ignored
+
+    def _skip_directory(self, root: str, chain, path: str, name: str) -> bool:
+        if name in self._prune:
+            return True
+        if self._matches(root, path, name, self._exclude):
+            return True
+        if os.path.exists(os.path.join(path, "pyvenv.cfg")):
+            return True
+
+        return self._ignored(chain, path, is_dir=True)
+
+    def _skip_file(self, root: str, chain, path: str, name: str) -> bool:
+        if not self._matches(root, path, name, self._include):
+            return True
+        if self._matches(root, path, name, self._exclude):
+            return True
+
+        return self._ignored(chain, path, is_dir=False)
+
+    def accepts(self, root: str, path: str) -> bool:
+        """
+        Whether `discover(root)` yields `path`, checked from its directories
+        instead of scanning them. The file does not need to exist.
+        """
+        relative = os.path.relpath(path, root)
+        if relative == os.curdir or relative.startswith(os.pardir):
+            return False
+
+        *directories, name = relative.split(os.sep)
+        directory, chain = root, ()
+        for part in [*directories, None]:
+            rules = IgnoreRules.load(directory, self._ignore_files)
+            if rules:
+                chain = chain + (rules,)
+            if part is None:
+                break
+
+            directory = os.path.join(directory, part)
+            if self._skip_directory(root, chain, directory, part):
+                return False
+
+        return not self._skip_file(root, chain, os.path.join(directory, name), name)
+
+    def discover(self, root: str) -> Iterator[str]:
+        if os.path.isfile(root):
+            yield root
+            return
+
+        stack = [(root, ())]
+        while stack:
+            directory, chain = stack.pop()
+            rules = IgnoreRules.load(directory, self._ignore_files)
+            if rules:
+                chain = chain + (rules,)
+
+            try:
+                with os.scandir(directory) as iterator:
+                    entries = sorted(iterator, key=lambda entry: entry.name)
+            except OSError:
+                continue
+
+            directories = []
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if not self._skip_directory(root, chain, entry.path, entry.name):
+                        directories.append((entry.path, chain))
+                elif entry.is_file() and not self._skip_file(
+                    root, chain, entry.path, entry.name
+                ):
+                    yield entry.path
+
+            stack.extend(reversed(directories))
@@ -1,8 +1,38 @@
-from abc import ABC, abstractmethod
-from typing import Optional, Self
-from uuid import uuid4
+from __future__ import annotations
 
-import pygraphviz as pgv
+import hashlib
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Optional, Self
+
+if TYPE_CHECKING:
+    import pygraphviz as pgv
+
+
+def node_id(*parts) -> str:
+    """Graph ID derived from the given parts, the same on every run."""
+    digest = hashlib.blake2b("\x1f".join(map(str, parts)).encode(), digest_size=8)
+    return digest.hexdigest()
+
+
+FLOW_STYLE = dict(
+    color="palegoldenrod",
+    shape="polygon",
+    fontcolor="black",
+    style="filled",
+    fontsize=16,
+    width=4,
+    group="1",
+)
+TOPIC_STYLE = dict(
+    color="darkred",
+    shape="octagon",
+    fontcolor="white",
+    style="filled",
+    width=1.0,
+    height=0.6,
+    fixedsize=False,
+    group="1",
+)
 
 
 class ArchitectureManager:
@@ -14,62 +44,17 @@ class ArchitectureManager:
         self._publishes = []
 
     def subscribe(self, subscribe: str):
-        self._subscribes.append(subscribe)
+        if subscribe not in self._subscribes:
+            self._subscribes.append(subscribe)
 
     def publish(self, publish: str):
-        self._publishes.append(publish)
-
-    def draw_architectural(self, pygraph: pgv.AGraph, diagram_name: str):
-        for subscribe in self._subscribes:
-            pygraph.add_node(
-                diagram_name,
-                color="palegoldenrod",
-                shape="polygon",
-                fontcolor="black",
-                style="filled",
-                fontsize=16,
-                width=4,
-                group="1",
-            )
-            pygraph.add_node(
-                subscribe,
-                color="darkred",
-                shape="octagon",
-                fontcolor="white",
-                style="filled",
-                width=1.0,
-                height=0.6,
-                fixedsize=False,
-                group="1",
-            )
-            pygraph.add_edge(subscribe, diagram_name)
-
-        for publish in self._publishes:
-            pygraph.add_node(
-                diagram_name,
-                color="palegoldenrod",
-                shape="polygon",
-                fontcolor="black",
-                style="filled",
-                fontsize=16,
-                width=4,
-                group="1",
-            )
-            pygraph.add_node(
-                publish,
-                color="darkred",
-                shape="octagon",
-                fontcolor="white",
-                style="filled",
-                width=1.0,
-                height=0.6,
-                fixedsize=False,
-                group="1",
-            )
-            pygraph.add_edge(diagram_name, publish)
+        if publish not in self._publishes:
+            self._publishes.append(publish)
 
 
 class EpcNode(ABC):
+    __slots__ = ("_description", "_start", "_end", "next", "_database")
+
     _description: str
     _start: str
     _end: str
@@ -86,7 +71,7 @@ class EpcNode(ABC):
         self._database = database
 
     def add_db_node(self, pygraph: pgv.AGraph, description: str, group: str):
-        id = uuid4()
+        id = node_id("database", group, description)
         pygraph.add_node(
             id,
             label=description,
@@ -125,6 +110,8 @@ class EpcNode(ABC):
 
 
 class ActivityNode(EpcNode):
+    __slots__ = ("_incoming_api_calls", "_outgoing_api_calls")
+
     def __init__(self, description: str, next: Self | None = None) -> None:
         super().__init__(description, next)
         self._incoming_api_calls: list[str] = []
@@ -148,7 +135,7 @@ class ActivityNode(EpcNode):
         outgoing_api_calls: list[str],
         group: str,
     ):
-        id = uuid4()
+        id = node_id("api", group, *incoming_api_calls, "", *outgoing_api_calls)
 
         incoming = "".join(
             [
@@ -221,6 +208,8 @@ class ActivityNode(EpcNode):
 
 
 class EventNode(EpcNode):
+    __slots__ = ()
+
     def add_node(self, pygraph: pgv.AGraph, description: str):
         pygraph.add_node(
             description,
@@ -236,6 +225,8 @@ class EventNode(EpcNode):
 
 
 class ProcessNode(EpcNode):
+    __slots__ = ()
+
     def add_node(self, pygraph: pgv.AGraph, description: str):
         pygraph.add_node(
             description,
@@ -249,17 +240,40 @@ class ProcessNode(EpcNode):
         )
 
 
+class ConnectorNode(EpcNode):
+    """Links the pages a long flow is split into."""
+
+    __slots__ = ("_label",)
+
+    def __init__(self, description: str, label: str, next: Self | None = None) -> None:
+        super().__init__(description, next)
+        self._label = label
+
+    def add_node(self, pygraph: pgv.AGraph, description: str):
+        pygraph.add_node(
+            description,
+            label=self._label,
+            color="lightgray",
+            shape="cds",
+            fontcolor="black",
+            style="filled",
+            group="1",
+        )
+
+
 class IfNode(EpcNode):
+    __slots__ = ("branches",)
+
     branches: list[EpcNode]
 
     def __init__(
         self,
         description: str,
         next: Self | None = None,
-        branches: list[EpcNode] = [],
+        branches: list[EpcNode] | None = None,
     ) -> None:
         super().__init__(description, next)
-        self.branches = branches
+        self.branches = [] if branches is None else branches
 
     def add_node(self, pygraph: pgv.AGraph, description: str):
         pygraph.add_node(
@@ -273,7 +287,7 @@ class IfNode(EpcNode):
 
     def draw_line(self, pygraph: pgv.AGraph, end_id: str = None):
         if self.branches:
-            self._end = uuid4()
+            self._end = node_id("endif", self._start)
             self.add_node(pygraph, self._start)
             self.add_node(pygraph, self._end)
 
@@ -0,0 +1,231 @@
+"""
+Intermediate representation of composed diagrams.
+
+An IR file is JSON lines, gzip compressed when its name ends with `.gz`.
+The first line is a header, every other line is one main diagram:
+
+    {"format": "docupyt-ir", "version": 1, "docupyt": "0.1.1"}
+    {"fingerprint": "...", "diagram": {...}, "inner": [{...}, ...]}
+
+A diagram is `{"name", "nodes", "inner_flow_names", "subscribes",
+"publishes"}` and `inner` holds the inner diagrams the main diagram draws.
+Nodes are listed in flow order:
+
+    {"type": "activity", "description": "...", "database": "...",
+     "incoming": [...], "outgoing": [...]}
+    {"type": "event" | "process", "description": "...", "database": "..."}
+    {"type": "if", "description": "...", "branches": [[node, ...], ...]}
+
+Empty fields are left out. A record written without a fingerprint is
+read back with one made from its content, so a diagram is not taken for
+another one drawn before. A reader only decodes the line of the diagram
+it is handing out, so diagrams are loaded one at a time.
+"""
+import gzip
+import json
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, Optional
+
+from cache import fingerprint
+from doctree import ActivityNode, EpcDiagram, EpcNode, EventNode, IfNode, ProcessNode
+from settings.version import VERSION
+
+IR_FORMAT = "docupyt-ir"
+IR_VERSION = 1
+
+_NODE_TYPES = {
+    "activity": ActivityNode,
+    "event": EventNode,
+    "process": ProcessNode,
+    "if": IfNode,
+}
+_TYPE_NAMES = {node_type: name for name, node_type in _NODE_TYPES.items()}
+
+
+class IRError(Exception):
+    def __init__(self, path: str, reason: str) -> None:
+        super().__init__(path, reason)
+        self.path = path
+        self.reason = reason
+
+    def __str__(self) -> str:
+        return f"Could not read IR from {self.path}: {self.reason}"
+
+
+@dataclass
+class ComposedDiagram:
+    diagram: EpcDiagram
+    inner: list[EpcDiagram] = field(default_factory=list)
+
+    @property
+    def name(self) -> str:
+        return self.diagram.name
+
+
+@dataclass
+class DiagramEntry:
+    """A main diagram that is only composed or decoded when loaded."""
+
+    name: str
+    fingerprint: str
+    loader: Callable[[], ComposedDiagram]
+
+    def load(self) -> ComposedDiagram:
+        return self.loader()
+
+
+def _chain(head: Optional[EpcNode]) -> Iterator[EpcNode]:
+    while head:
+        yield head
+        head = head.next
+
+
+def encode_node(node: EpcNode) -> dict:
+    data = {"type": _TYPE_NAMES[type(node)], "description": str(node._description)}
+    if node._database:
+        data["database"] = node._database
+
+    if isinstance(node, ActivityNode):
+        if node._incoming_api_calls:
+            data["incoming"] = node._incoming_api_calls
+        if node._outgoing_api_calls:
+            data["outgoing"] = node._outgoing_api_calls
+
+    if isinstance(node, IfNode):
+        data["branches"] = [
+            [encode_node(branch_node) for branch_node in _chain(branch)]
+            for branch in node.branches
+        ]
+
+    return data
+
+
+def decode_node(data: dict) -> EpcNode:
+    node = _NODE_TYPES[data["type"]](description=data["description"])
+    if data.get("database"):
+        node.set_database_connection(database=data["database"])
+
+    if isinstance(node, ActivityNode):
+        node._incoming_api_calls = list(data.get("incoming", []))
+        node._outgoing_api_calls = list(data.get("outgoing", []))
+
+    if isinstance(node, IfNode):
+        for branch in data.get("branches", []):
+            # act: an empty branch is kept as a missing head
+            node.branches.append(_decode_chain(branch).head)
+
+    return node
+
+
+def _decode_chain(nodes: list[dict]) -> EpcDiagram:
+    diagram = EpcDiagram()
+    for data in nodes:
+        diagram.push(decode_node(data))
+
+    return diagram
+
+
+def encode_diagram(diagram: EpcDiagram) -> dict:
+    return {
+        "name": diagram.name,
+        "nodes": [encode_node(node) for node in _chain(diagram.head)],
+        "inner_flow_names": diagram.inner_flow_names,
+        "subscribes": diagram.architecture._subscribes,
+        "publishes": diagram.architecture._publishes,
+    }
+
+
+def decode_diagram(data: dict) -> EpcDiagram:
+    diagram = _decode_chain(data["nodes"])
+    diagram.name = data["name"]
+    diagram.inner_flow_names = list(data.get("inner_flow_names", []))
+    for subscribe in data.get("subscribes", []):
+        diagram.architecture.subscribe(subscribe)
+    for publish in data.get("publishes", []):
+        diagram.architecture.publish(publish)
+
+    return diagram
+
+
+def _decode_record(record: dict) -> ComposedDiagram:
+    return ComposedDiagram(
+        diagram=decode_diagram(record["diagram"]),
+        inner=[decode_diagram(inner) for inner in record.get("inner", [])],
+    )
+
+
+def _open(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, f"{mode}t", encoding="utf-8")
+
+    return open(path, mode, encoding="utf-8")
+
+
+def header() -> dict:
+    return {"format": IR_FORMAT, "version": IR_VERSION, "docupyt": VERSION}
+
+
+def encode_record(composed: ComposedDiagram, fingerprint: str = "") -> dict:
+    return {
+        "fingerprint": fingerprint,
+        "diagram": encode_diagram(composed.diagram),
+        "inner": [encode_diagram(inner) for inner in composed.inner],
+    }
+
+
+class IRWriter:
+    """Writes composed diagrams as they come, one line each."""
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._file = None
+
+    def __enter__(self) -> "IRWriter":
+        self._file = _open(self._path, "w")
+        self._file.write(json.dumps(header()) + "\n")
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._file.close()
+
+    def write(self, composed: ComposedDiagram, fingerprint: str = ""):
+        record = encode_record(composed, fingerprint)
+        self._file.write(json.dumps(record) + "\n")
+
+
+class IRReader:
+    """Streams the diagrams of an IR file, decoding each one on load."""
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+
+    def _check_header(self, line: str):
+        try:
+            header = json.loads(line)
+        except ValueError:
+            header = None
+
+        if not isinstance(header, dict) or header.get("format") != IR_FORMAT:
+            raise IRError(self._path, "not a docupyt IR file")
+        if header.get("version") != IR_VERSION:
+            raise IRError(
+                self._path,
+                f"IR version {header.get('version')} is not supported, "
+                f"expected {IR_VERSION}",
+            )
+
+    def __iter__(self) -> Iterator[DiagramEntry]:
+        with _open(self._path, "r") as file:
+            self._check_header(file.readline())
+
+            for line in file:
+                if not line.strip():
+                    continue
+
+                record = json.loads(line)
+                yield DiagramEntry(
+                    name=record["diagram"]["name"],
+                    fingerprint=record.get("fingerprint")
+                    or fingerprint(json.dumps(record, sort_keys=True)),
+                    loader=lambda record=record: _decode_record(record),
+                )
@@ -1,50 +1,163 @@
 import os
-from typing import Optional
+from parser.doctree_parser import PARSERS, ParserBackend
+from typing import List, Optional
 
 import typer
 
-from client import DocupytClient, FileFormat
+from cache import DEFAULT_MAX_BYTES, FlowCache
+from discovery import DEFAULT_INCLUDE, FileDiscovery
+from logs import log
+from pagination import DEFAULT_PAGE_SIZE
+from profiling import ProfileHook, profiler
+from render import OutputFormat
+from settings.daemon import DEFAULT_PORT
 
 app = typer.Typer()
 
-client = DocupytClient()
 
+@app.command()
+def docupyt(
+    path: Optional[str] = None,
+    out_path: Optional[str] = "_outputs",
+    parser: ParserBackend = ParserBackend.TOKENIZE,
+    include: List[str] = list(DEFAULT_INCLUDE),
+    exclude: List[str] = [],
+    no_cache: bool = False,
+    rebuild: bool = False,
+    cache_size: int = DEFAULT_MAX_BYTES // (1024 * 1024),
+    jobs: int = 1,
+    output_format: OutputFormat = typer.Option(OutputFormat.PNG, "--format"),
+    emit_ir: Optional[str] = None,
+    from_ir: Optional[str] = None,
+    watch: bool = False,
+    since: Optional[str] = None,
+    stream: bool = False,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    serve: bool = False,
+    daemon: bool = False,
+    port: int = DEFAULT_PORT,
+    max_requests: int = 4,
+    profile: bool = False,
+    profile_top: int = 10,
+    profile_hook: ProfileHook = ProfileHook.NONE,
+):
+    if not path and not from_ir and not serve:
+        raise ValueError("Path is required")
 
-def get_filepaths(directory):
-    """
-    This function will generate the file names in a directory
-    tree by walking the tree either top-down or bottom-up. For each
-    directory in the tree rooted at directory top (including top itself),
-    it yields a 3-tuple (dirpath, dirnames, filenames).
-    """
-    file_paths = []
+    if not os.path.exists(out_path):
+        os.mkdir(out_path)
 
-    for root, directories, files in os.walk(directory):
-        for filename in files:
-            filepath = os.path.join(root, filename)
-            file_paths.append(filepath)
+    # act: the daemon only renders whole trees, the rest runs in process
+    if daemon and path and not (from_ir or emit_ir or watch or since or profile):
+        # act: the daemon parses and draws with the options it was served with
+        served = {
+            "--parser": parser != ParserBackend.TOKENIZE,
+            "--include": list(include) != list(DEFAULT_INCLUDE),
+            "--exclude": bool(exclude),
+            "--no-cache": no_cache,
+            "--rebuild": rebuild,
+            "--cache-size": cache_size != DEFAULT_MAX_BYTES // (1024 * 1024),
+            "--jobs": jobs != 1,
+            "--stream": stream,
+            "--page-size": page_size != DEFAULT_PAGE_SIZE,
+        }
+        refused = [flag for flag, used in served.items() if used]
+        if refused:
+            raise typer.BadParameter(
+                f"{', '.join(refused)} cannot be sent to the daemon,"
+                " pass them to the --serve command instead",
+                param_hint="--daemon",
+            )
 
-    return file_paths
+        from daemon import DaemonClient
 
+        reply = DaemonClient(port=port).render(path, out_path, output_format)
+        if reply is not None:
+            log.info(
+                msg=f"Daemon rendered {len(reply['rendered'])},"
+                f" failed {len(reply['failed'])}."
+            )
+            return
+        log.info(msg=f"No daemon answered on port {port}, rendering in process.")
 
-@app.command()
-def docupyt(path: Optional[str] = None, out_path: Optional[str] = "_outputs"):
-    if not path:
-        raise ValueError("Path is required")
+    if profile:
+        profiler.enable(hook=profile_hook)
 
-    if not os.path.exists(out_path):
-        os.mkdir(out_path)
+    # act: the client pulls in every phase, --help does not need it
+    from client import DocupytClient, FileFormat
 
-    formats = []
+    try:
+        cache = None
+        if not no_cache:
+            cache = FlowCache(
+                out_path, max_bytes=cache_size * 1024 * 1024, rebuild=rebuild
+            )
 
-    for filepath in get_filepaths(path):
-        formats.append(
+        client = DocupytClient(
+            parser=PARSERS[parser](), cache=cache, stream=stream, page_size=page_size
+        )
+        if from_ir:
+            client.draw_ir(
+                out_path=out_path,
+                ir_path=from_ir,
+                jobs=jobs,
+                output_format=output_format,
+            )
+            return
+
+        discovery = FileDiscovery(include=tuple(include), exclude=tuple(exclude))
+        if serve:
+            from daemon import RenderDaemon
+
+            RenderDaemon(
+                client,
+                discovery=discovery,
+                jobs=jobs,
+                max_requests=max_requests,
+                port=port,
+            ).serve()
+            return
+
+        formats = (
             FileFormat(
                 input_path=filepath,
             )
+            for filepath in discovery.discover(path)
         )
 
-    client.draw_epc(out_path=out_path, file_format=formats)
+        if watch:
+            from watch import Watcher, WatchSession
+
+            session = WatchSession(
+                client, out_path, jobs=jobs, output_format=output_format
+            )
+            Watcher(path, session, discovery=discovery).run()
+            return
+
+        if emit_ir:
+            client.emit_ir(ir_path=emit_ir, file_format=formats, jobs=jobs)
+            return
+
+        if since:
+            client.draw_since(
+                out_path=out_path,
+                root=path,
+                revision=since,
+                discovery=discovery,
+                jobs=jobs,
+                output_format=output_format,
+            )
+            return
+
+        client.draw_epc(
+            out_path=out_path,
+            file_format=formats,
+            jobs=jobs,
+            output_format=output_format,
+        )
+    finally:
+        if profile:
+            profiler.write(os.path.join(out_path, "profile.json"), top=profile_top)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,145 @@
+"""
+Manifest of the outputs written to an output directory.
+
+`manifest.json` maps every output, relative to the output directory, to
+the fingerprint of the graph source it was rendered from, and lists what
+the last run did to each output:
+
+    {"format": "docupyt-manifest", "version": 1, "docupyt": "0.1.1",
+     "outputs": {"payment.png": "..."},
+     "created": [...], "updated": [...], "unchanged": [...], "removed": [...]}
+
+An output whose graph source did not change is not laid out or written
+again. Outputs of the last run that are not produced anymore are deleted.
+A run drawing only some diagrams passes `owns`, and the outputs it does
+not own are kept as they are. A run passing `extension` keeps the outputs
+of other formats too, unless their diagram is not drawn anymore.
+"""
+import json
+import os
+from typing import Callable, Optional
+
+from cache import fingerprint
+from logs import log
+from pagination import diagram_name
+from settings.version import VERSION
+
+MANIFEST_FORMAT = "docupyt-manifest"
+MANIFEST_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+
+STATUSES = ("created", "updated", "unchanged", "removed")
+
+
+def source_fingerprint(source: str, output_format: str) -> str:
+    return fingerprint(output_format, source)
+
+
+class Manifest:
+    def __init__(
+        self,
+        out_path: str,
+        owns: Optional[Callable[[str], bool]] = None,
+        extension: Optional[str] = None,
+    ) -> None:
+        self._out_path = out_path
+        self._owns = owns
+        self._extension = extension
+        self.path = os.path.join(out_path, MANIFEST_NAME)
+        self.previous = self._load()
+        self.outputs: dict[str, str] = {}
+        self.status: dict[str, list[str]] = {status: [] for status in STATUSES}
+        self._seen: set[str] = set()
+        self._pending: dict[str, str] = {}
+
+    def _load(self) -> dict[str, str]:
+        try:
+            with open(self.path) as file:
+                manifest = json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+        if (
+            manifest.get("format") != MANIFEST_FORMAT
+            or manifest.get("version") != MANIFEST_VERSION
+        ):
+            return {}
+
+        return manifest.get("outputs", {})
+
+    def _name(self, output: str) -> str:
+        return os.path.relpath(output, self._out_path)
+
+    def keep(self, output: str):
+        """Records an output left alone without drawing its graph source."""
+        name = self._name(output)
+        self._seen.add(name)
+        self.status["unchanged"].append(name)
+        if name in self.previous:
+            self.outputs[name] = self.previous[name]
+
+    def unchanged(self, output: str, source: str) -> bool:
+        """
+        Whether the output was rendered from the same graph source and still
+        exists. Otherwise the fingerprint is held until the output is written.
+        """
+        name = self._name(output)
+        self._seen.add(name)
+        if self.previous.get(name) == source and os.path.exists(output):
+            self.outputs[name] = source
+            self.status["unchanged"].append(name)
+            return True
+
+        self._pending[name] = source
+        return False
+
+    def rendered(self, output: str, ok: bool):
+        name = self._name(output)
+        source = self._pending.pop(name, None)
+        # act: failed outputs are rendered again on the next run
+        if not ok or source is None:
+            return
+
+        self.outputs[name] = source
+        self.status["updated" if name in self.previous else "created"].append(name)
+
+    def _replaced(self, name: str, diagrams: set[str]) -> bool:
+        """Whether this run draws the output, or drops its diagram."""
+        if self._extension is None or name.endswith(f".{self._extension}"):
+            return True
+
+        return diagram_name(name) not in diagrams
+
+    def _remove_stale(self):
+        diagrams = {diagram_name(name) for name in self._seen}
+        for name in sorted(set(self.previous) - self._seen):
+            owned = not self._owns or self._owns(name)
+            if not owned or not self._replaced(name, diagrams):
+                self.outputs[name] = self.previous[name]
+                continue
+
+            try:
+                os.remove(os.path.join(self._out_path, name))
+            except FileNotFoundError:
+                pass
+            except OSError as error:
+                log.warning(msg=f"Could not remove {name}: {error}")
+                continue
+            self.status["removed"].append(name)
+
+    def save(self) -> dict:
+        self._remove_stale()
+        manifest = {
+            "format": MANIFEST_FORMAT,
+            "version": MANIFEST_VERSION,
+            "docupyt": VERSION,
+            "outputs": dict(sorted(self.outputs.items())),
+            **{status: sorted(names) for status, names in self.status.items()},
+        }
+
+        temporary = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as file:
+            json.dump(manifest, file, indent=1)
+        os.replace(temporary, self.path)
+
+        return manifest
@@ -0,0 +1,95 @@
+"""
+Splits main diagrams with more nodes than a budget into pages.
+
+Pages are cut between the top level nodes of the main flow, so a
+condition always stays on one page with all of its branches. A top level
+node heavier than the budget gets a page of its own. The inner diagrams
+follow the main flow and fill pages the same way.
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from doctree import ActivityNode, EpcDiagram, EpcNode, IfNode
+from ir import ComposedDiagram
+
+DEFAULT_PAGE_SIZE = 300
+
+
+@dataclass
+class Page:
+    nodes: list[EpcNode] = field(default_factory=list)
+    inner: list[EpcDiagram] = field(default_factory=list)
+
+
+def page_name(name: str, index: int, extension: str) -> str:
+    """`payment.png` for the first page, `payment.page-2.png` for the next."""
+    if not index:
+        return f"{name}.{extension}"
+
+    return f"{name}.page-{index + 1}.{extension}"
+
+
+def diagram_name(output: str) -> str:
+    """The diagram an output name of `page_name` belongs to."""
+    return re.sub(r"(\.page-\d+)?\.[^.]*$", "", output)
+
+
+def _chain(head: EpcNode) -> Iterator[EpcNode]:
+    while head:
+        yield head
+        head = head.next
+
+
+def weight(node: EpcNode, follow: bool = False) -> int:
+    """
+    The number of graph nodes drawn for `node`: itself, its database and API
+    call nodes and, for a condition, its join and every branch. With
+    `follow`, the nodes after it are counted as well.
+    """
+    total = 0
+    stack = [(node, follow)]
+    while stack:
+        current, follow_next = stack.pop()
+        while current:
+            total += 1 + bool(current._database)
+            if isinstance(current, ActivityNode) and (
+                current._incoming_api_calls or current._outgoing_api_calls
+            ):
+                total += 1
+            if isinstance(current, IfNode) and current.branches:
+                total += 1
+                stack.extend((branch, True) for branch in current.branches if branch)
+            current = current.next if follow_next else None
+
+    return total
+
+
+def paginate(composed: ComposedDiagram, budget: int) -> list[Page]:
+    """Pages of at most `budget` nodes, one page when `budget` is 0."""
+    if budget <= 0:
+        return [Page(list(_chain(composed.diagram.head)), list(composed.inner))]
+
+    pages = [Page()]
+    used = 0
+
+    def room(needed: int) -> bool:
+        return not used or used + needed <= budget
+
+    for node in _chain(composed.diagram.head):
+        needed = weight(node)
+        if not room(needed):
+            pages.append(Page())
+            used = 0
+        pages[-1].nodes.append(node)
+        used += needed
+
+    for inner in composed.inner:
+        needed = weight(inner.head, follow=True)
+        if not room(needed):
+            pages.append(Page())
+            used = 0
+        pages[-1].inner.append(inner)
+        used += needed
+
+    return pages
@@ -1,19 +1,87 @@
+import re
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Iterator
 
-import code_tokenize as ctok
+from settings.language import StringEnum
 
 
 class IParser(ABC):
     @abstractmethod
-    def parse(self):
+    def parse(self, file_path: str):
         raise NotImplementedError("Parser functionality not implemented!")
 
 
 class Parser(IParser):
     def parse(self, file_path: str):
+        # act: code_tokenize loads tree-sitter, only pay for it when used
+        import code_tokenize as ctok
+
         with open(file_path) as file:
             file_str = file.read()
             return ctok.tokenize(
                 file_str,
                 lang="python",
             )
+
+
+@dataclass(frozen=True)
+class Comment:
+    line: int
+    text: str
+
+    def __str__(self) -> str:
+        return self.text
+
+
+class CommentParser(IParser):
+    """
+    Scans a python source for comments only. String literals are matched
+    and skipped so a `#` inside them is not mistaken for a comment; every
+    other token is never materialized.
+
+    Diagrams only differ from the ones of `Parser` where a string literal
+    inside a diagram holds a keyword: `Parser` keeps the string as a token
+    and composes it like a comment, this parser drops it.
+    """
+
+    _SCANNER = re.compile(
+        r"""
+        (?P<string>
+            '''(?:[^\\]|\\[\s\S])*?'''
+            |\"\"\"(?:[^\\]|\\[\s\S])*?\"\"\"
+            |'(?:[^'\\\n]|\\[\s\S])*'
+            |"(?:[^"\\\n]|\\[\s\S])*"
+        )
+        |(?P<comment>\#[^\r\n]*)
+        """,
+        re.VERBOSE,
+    )
+
+    def scan(self, source: str) -> Iterator[Comment]:
+        line = 1
+        position = 0
+        for match in self._SCANNER.finditer(source):
+            if match.lastgroup != "comment":
+                continue
+
+            line += source.count("\n", position, match.start())
+            position = match.start()
+            yield Comment(line=line, text=match.group())
+
+    def parse(self, file_path: str) -> Iterator[Comment]:
+        with open(file_path) as file:
+            file_str = file.read()
+
+        return self.scan(file_str)
+
+
+class ParserBackend(StringEnum):
+    TOKENIZE = "tokenize"
+    COMMENTS = "comments"
+
+
+PARSERS = {
+    ParserBackend.TOKENIZE: Parser,
+    ParserBackend.COMMENTS: CommentParser,
+}
@@ -0,0 +1,186 @@
+import cProfile
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Iterable, Iterator, Optional
+
+from logs import log
+from settings.language import StringEnum
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on windows
+    resource = None
+
+_NOTHING = nullcontext()
+
+
+class ProfileHook(StringEnum):
+    NONE = "none"
+    CPROFILE = "cprofile"
+    TRACEMALLOC = "tracemalloc"
+
+
+def _max_rss_kib() -> Optional[int]:
+    if resource is None:
+        return None
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class Profiler:
+    """
+    Records wall time, CPU time and memory of each phase per file or
+    diagram. Disabled, `measure` hands out one shared empty context and
+    `iterate` only calls through, so the calls cost next to nothing.
+    Work done in worker processes is not recorded.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.records: list[dict] = []
+        self._cprofile: Optional[cProfile.Profile] = None
+        self._peaks: list[int] = []
+
+    def enable(self, hook: ProfileHook = ProfileHook.NONE):
+        self.enabled = True
+        self.records = []
+        if hook == ProfileHook.CPROFILE:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        elif hook == ProfileHook.TRACEMALLOC:
+            tracemalloc.start()
+
+    def disable(self):
+        self.enabled = False
+        if self._cprofile:
+            self._cprofile.disable()
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def _record(self, phase: str, item: str, wall: float, cpu: float, **memory):
+        self.records.append(
+            {"phase": phase, "item": str(item), "wall": wall, "cpu": cpu, **memory}
+        )
+
+    def _start_peak(self):
+        if self._peaks:
+            self._peaks[-1] = max(self._peaks[-1], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        self._peaks.append(0)
+
+    def _end_peak(self) -> int:
+        peak = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+        if self._peaks:
+            self._peaks[-1] = max(self._peaks[-1], peak)
+
+        return peak
+
+    @contextmanager
+    def _measure(self, phase: str, item: str):
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            self._start_peak()
+
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            memory = {"max_rss_kib": _max_rss_kib()}
+            if tracing:
+                memory["traced_peak_bytes"] = self._end_peak()
+            self._record(phase, item, wall, cpu, **memory)
+
+    def measure(self, phase: str, item: str = ""):
+        if not self.enabled:
+            return _NOTHING
+
+        return self._measure(phase, item)
+
+    def _iterate(self, phase: str, item: str, produce: Callable, args) -> Iterator:
+        wall, cpu = time.perf_counter(), time.process_time()
+        iterator = iter(produce(*args))
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        try:
+            while True:
+                started, started_cpu = time.perf_counter(), time.process_time()
+                try:
+                    value = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    wall += time.perf_counter() - started
+                    cpu += time.process_time() - started_cpu
+
+                yield value
+        finally:
+            self._record(phase, item, wall, cpu)
+
+    def iterate(self, phase: str, item: str, produce: Callable, *args) -> Iterable:
+        """
+        Calls `produce(*args)` and times only the work done in that call and
+        in producing each item, not the work of the caller in between.
+        """
+        if not self.enabled:
+            return produce(*args)
+
+        return self._iterate(phase, item, produce, args)
+
+    def phases(self) -> dict[str, dict]:
+        phases = {}
+        for record in self.records:
+            phase = phases.setdefault(
+                record["phase"], {"count": 0, "wall": 0.0, "cpu": 0.0}
+            )
+            phase["count"] += 1
+            phase["wall"] += record["wall"]
+            phase["cpu"] += record["cpu"]
+
+        return phases
+
+    def slowest(self, top: int = 10) -> list[dict]:
+        records = sorted(self.records, key=lambda record: -record["wall"])
+        return records[:top]
+
+    def report(self, top: int = 10) -> dict:
+        report = {
+            "phases": self.phases(),
+            "slowest": self.slowest(top),
+            "records": self.records,
+            "max_rss_kib": _max_rss_kib(),
+        }
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            report["allocations"] = [
+                str(statistic) for statistic in snapshot.statistics("lineno")[:top]
+            ]
+
+        return report
+
+    def write(self, path: str, top: int = 10):
+        report = self.report(top)
+        self.disable()
+
+        with open(path, "w") as file:
+            json.dump(report, file, indent=1)
+
+        if self._cprofile:
+            self._cprofile.dump_stats(f"{path}.prof")
+            log.info(msg=f"Wrote cProfile stats to {path}.prof")
+
+        for name, phase in self.phases().items():
+            log.info(
+                msg=f"{name:<14} {phase['wall'] * 1000:>10.1f} ms wall"
+                f" {phase['cpu'] * 1000:>10.1f} ms cpu  x{phase['count']}"
+            )
+        for record in self.slowest(top):
+            log.info(
+                msg=f"{record['wall'] * 1000:>10.1f} ms  {record['phase']:<8}"
+                f" {record['item']}"
+            )
+        log.info(msg=f"Wrote profile to {path}")
+
+
+profiler = Profiler()
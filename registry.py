@@ -0,0 +1,111 @@
+from collections import defaultdict
+from typing import Iterable, Iterator, Optional
+
+from clusterer import Flow
+from compose import scan
+from logs import log
+from settings.language import ClusterKeywords
+
+
+def referenced_names(flow: Flow) -> list[str]:
+    """Names of the inner flows a flow references, in order, once each."""
+    names = {}
+    for token in map(str, flow.tokens):
+        if ClusterKeywords.INNER_FLOW in token:
+            names[scan(token).after(ClusterKeywords.INNER_FLOW)] = None
+
+    return list(names)
+
+
+class FlowRegistry:
+    """
+    Inner and main flows indexed by name, with the file each one came from
+    and the inner flows every main flow references. The first flow with a
+    name wins, later ones are reported as duplicates.
+    """
+
+    def __init__(self) -> None:
+        self._inner: dict[str, Flow] = {}
+        self._main: dict[str, Flow] = {}
+        self._references: dict[str, list[str]] = {}
+        self._dependents: dict[str, set[str]] = defaultdict(set)
+        self._files: dict[str, list[Flow]] = defaultdict(list)
+        self.duplicates: list[str] = []
+
+    def _register(self, index: dict[str, Flow], flow: Flow, kind: str) -> bool:
+        first = index.get(flow.name)
+        if first is not None:
+            issue = (
+                f"{kind} '{flow.name}' in {flow.file} is already defined"
+                f" in {first.file}, ignoring it"
+            )
+            self.duplicates.append(issue)
+            log.warning(msg=issue)
+            return False
+
+        index[flow.name] = flow
+        self._files[flow.file].append(flow)
+        return True
+
+    def add_inner(self, flow: Flow):
+        self._register(self._inner, flow, ClusterKeywords.CLUSTER)
+
+    def add_main(self, flow: Flow):
+        if not self._register(self._main, flow, ClusterKeywords.MAIN_CLUSTER):
+            return
+
+        self._references[flow.name] = referenced_names(flow)
+        for name in self._references[flow.name]:
+            self._dependents[name].add(flow.name)
+
+    def add(self, inner: Iterable[Flow] = (), main: Iterable[Flow] = ()):
+        for flow in inner:
+            self.add_inner(flow)
+        for flow in main:
+            self.add_main(flow)
+
+    def inner(self, name: str) -> Optional[Flow]:
+        return self._inner.get(name)
+
+    def main(self, name: str) -> Optional[Flow]:
+        return self._main.get(name)
+
+    def main_flows(self) -> Iterator[Flow]:
+        return iter(self._main.values())
+
+    def inner_flows(self) -> Iterator[Flow]:
+        return iter(self._inner.values())
+
+    def references(self, main_name: str) -> list[Flow]:
+        """Inner flows a main flow references that are defined."""
+        return [
+            self._inner[name]
+            for name in self._references.get(main_name, ())
+            if name in self._inner
+        ]
+
+    def missing(self, main_name: str) -> list[str]:
+        return [
+            name
+            for name in self._references.get(main_name, ())
+            if name not in self._inner
+        ]
+
+    def dependents(self, inner_name: str) -> set[str]:
+        """Names of the main flows that reference an inner flow."""
+        return set(self._dependents.get(inner_name, ()))
+
+    def affected(self, files: Iterable[str]) -> set[str]:
+        """
+        Names of the main flows to render again after `files` changed: the
+        ones defined in them and the ones referencing an inner flow there.
+        """
+        names = set()
+        for file in files:
+            for flow in self._files.get(file, ()):
+                if self._main.get(flow.name) is flow:
+                    names.add(flow.name)
+                else:
+                    names |= self.dependents(flow.name)
+
+        return names
@@ -0,0 +1,225 @@
+import asyncio
+import os
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import AsyncIterator, Iterable, Optional
+
+from logs import log
+from profiling import profiler
+from settings.language import StringEnum
+from textgraph import DotGraph, MermaidGraph, PlantUMLGraph
+
+
+class OutputFormat(StringEnum):
+    PNG = "png"
+    SVG = "svg"
+    DOT = "dot"
+    MERMAID = "mmd"
+    PLANTUML = "puml"
+
+
+# formats written as text with no layout, the viewer lays them out
+TEXT_GRAPHS = {
+    OutputFormat.DOT: DotGraph,
+    OutputFormat.MERMAID: MermaidGraph,
+    OutputFormat.PLANTUML: PlantUMLGraph,
+}
+
+
+def new_graph(output_format: OutputFormat):
+    text_graph = TEXT_GRAPHS.get(output_format)
+    if text_graph:
+        return text_graph(directed=True, compound=True)
+
+    from pygraphviz import AGraph
+
+    return AGraph(directed=True, compound=True)
+
+
+@dataclass
+class RenderJob:
+    source: str
+    output: str
+    format: OutputFormat = OutputFormat.PNG
+
+
+@dataclass
+class RenderResult:
+    output: str
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def render_job(job: RenderJob) -> RenderResult:
+    with profiler.measure("layout", job.output):
+        return _render_job(job)
+
+
+def _render_job(job: RenderJob) -> RenderResult:
+    try:
+        if job.format in TEXT_GRAPHS:
+            with open(job.output, "w") as file:
+                file.write(job.source)
+        else:
+            from pygraphviz import AGraph
+
+            # draw with a prog runs the layout itself, calling layout()
+            # first would lay the graph out twice
+            graph = AGraph(string=job.source)
+            graph.draw(job.output, format=str(job.format), prog="dot")
+    except Exception as error:
+        return RenderResult(output=job.output, error=repr(error))
+
+    return RenderResult(output=job.output)
+
+
+class Renderer:
+    """
+    Lays out and writes graphs. Graphviz is not thread safe, so with more
+    than one job every graph is shipped as DOT source to a process pool.
+    A failing graph is reported in its result and does not stop the rest.
+    """
+
+    def __init__(self, jobs: int = 1) -> None:
+        self._jobs = jobs if jobs > 0 else os.cpu_count() or 1
+
+    def _collect(self, job: RenderJob, future: Future) -> RenderResult:
+        try:
+            return future.result()
+        except Exception as error:
+            return RenderResult(output=job.output, error=repr(error))
+
+    def _render_parallel(self, jobs: Iterable[RenderJob]) -> list[RenderResult]:
+        from concurrent.futures import ProcessPoolExecutor
+
+        # act: only a few graphs wait for a worker, the rest are not drawn yet
+        results = []
+        pending = deque()
+        with ProcessPoolExecutor(max_workers=self._jobs) as executor:
+            for job in jobs:
+                pending.append((job, executor.submit(render_job, job)))
+                if len(pending) >= self._jobs * 2:
+                    results.append(self._collect(*pending.popleft()))
+
+            while pending:
+                results.append(self._collect(*pending.popleft()))
+
+        return results
+
+    def render(self, jobs: Iterable[RenderJob]) -> list[RenderResult]:
+        if self._jobs > 1:
+            results = self._render_parallel(jobs)
+        else:
+            results = [render_job(job) for job in jobs]
+
+        for result in results:
+            if not result.ok:
+                log.error(msg=f"Could not render {result.output}: {result.error}")
+
+        return results
+
+
+class AsyncRenderer:
+    """
+    Lays out graphs with `dot` subprocesses from an event loop and hands
+    out each result as soon as its graph is written. At most `limit` layouts
+    run at once and each is killed after `timeout` seconds. Graph sources
+    are drawn in a worker thread, one at a time, so the loop stays free.
+    """
+
+    def __init__(
+        self,
+        limit: int = 4,
+        timeout: Optional[float] = None,
+        dot: str = "dot",
+    ) -> None:
+        self._limit = limit if limit > 0 else os.cpu_count() or 1
+        self._timeout = timeout
+        self._dot = dot
+
+    async def _layout(self, job: RenderJob) -> Optional[str]:
+        process = await asyncio.create_subprocess_exec(
+            self._dot,
+            f"-T{job.format}",
+            "-o",
+            job.output,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            _, stderr = await asyncio.wait_for(
+                process.communicate(job.source.encode()), self._timeout
+            )
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            # act: never leave a layout running for a result nobody waits on
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            raise
+
+        if process.returncode:
+            return stderr.decode().strip() or f"{self._dot} exited {process.returncode}"
+
+        return None
+
+    async def _write(self, job: RenderJob) -> Optional[str]:
+        if job.format not in TEXT_GRAPHS:
+            return await self._layout(job)
+
+        with open(job.output, "w") as file:
+            file.write(job.source)
+        return None
+
+    async def render_job(
+        self, job: RenderJob, semaphore: asyncio.Semaphore
+    ) -> RenderResult:
+        async with semaphore:
+            try:
+                error = await self._write(job)
+            except asyncio.TimeoutError:
+                error = f"layout took longer than {self._timeout}s"
+            except Exception as exception:
+                error = repr(exception)
+
+        if error:
+            log.error(msg=f"Could not render {job.output}: {error}")
+        return RenderResult(output=job.output, error=error)
+
+    async def render(self, jobs: Iterable[RenderJob]) -> AsyncIterator[RenderResult]:
+        semaphore = asyncio.Semaphore(self._limit)
+        jobs = iter(jobs)
+        pending: set[asyncio.Task] = set()
+        try:
+            while True:
+                job = await asyncio.to_thread(next, jobs, None)
+                if job is None:
+                    break
+                pending.add(asyncio.ensure_future(self.render_job(job, semaphore)))
+
+                # act: only a few graphs wait for a layout, the rest are not drawn yet
+                if len(pending) >= self._limit * 2:
+                    done, pending = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                else:
+                    done = {task for task in pending if task.done()}
+                    pending -= done
+
+                for task in done:
+                    yield task.result()
+
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
@@ -0,0 +1,2 @@
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
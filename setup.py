@@ -1,8 +1,10 @@
 from setuptools import find_packages, setup
 
+from settings.version import VERSION
+
 setup(
     name="docupyt",
-    version="0.1.1",
+    version=VERSION,
     author="Eyup Fatih Ersoy",
     author_email="eyupfatih.ersoy@hotmail.com",
     description="Docupyt",
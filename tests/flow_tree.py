@@ -0,0 +1,54 @@
+import os
+import tempfile
+from parser.doctree_parser import CommentParser
+from unittest import TestCase
+
+from client import DocupytClient
+from settings.language import ArchitecturalKeywords, ClusterKeywords, Keywords
+
+INNER = f"""
+# {ClusterKeywords.CLUSTER} notify
+# {Keywords.ACTIVITY} send email
+# {ClusterKeywords.END_CLUSTER}
+"""
+
+PAYMENT = f"""
+# {ClusterKeywords.MAIN_CLUSTER} payment
+# {ArchitecturalKeywords.SUBSCRIBES} orders
+# {Keywords.ACTIVITY} charge card
+# {ClusterKeywords.INNER_FLOW} notify
+# {ClusterKeywords.END_MAIN_CLUSTER}
+"""
+
+REFUND = f"""
+# {ClusterKeywords.MAIN_CLUSTER} refund
+# {Keywords.ACTIVITY} return money
+# {ClusterKeywords.END_MAIN_CLUSTER}
+"""
+
+
+class FlowTreeCase(TestCase):
+    """
+    Sources written under `root` of a temporary directory, outputs going to
+    `out_path` next to it, and a client reading comments only.
+    """
+
+    def setUp(self) -> None:
+        self._directory = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self._directory.name, "src")
+        self.out_path = os.path.join(self._directory.name, "out")
+        os.makedirs(self.root)
+        self.client = self._client()
+
+    def tearDown(self) -> None:
+        self._directory.cleanup()
+
+    def _client(self, **options) -> DocupytClient:
+        return DocupytClient(parser=CommentParser(), **options)
+
+    def _write(self, name: str, source: str) -> str:
+        path = os.path.join(self.root, f"{name}.py")
+        with open(path, "w") as file:
+            file.write(source)
+
+        return path
@@ -0,0 +1,114 @@
+import os
+import tempfile
+from parser.doctree_parser import CommentParser
+from unittest import TestCase
+
+from pygraphviz import AGraph
+
+from architecture import ArchitectureIndex
+from cache import FlowCache
+from client import DocupytClient, FileFormat
+from compose import Composer
+from ir import ComposedDiagram
+from render import OutputFormat
+from settings.language import (
+    ArchitecturalKeywords,
+    ClusterKeywords,
+    ContextKeywords,
+    Keywords,
+)
+
+
+def _composed(name: str, tokens: list[str], inner: dict = None) -> ComposedDiagram:
+    composer = Composer()
+    return ComposedDiagram(
+        diagram=composer.compose(parsed=tokens, name=name),
+        inner=[
+            composer.compose(parsed=inner_tokens, name=inner_name)
+            for inner_name, inner_tokens in (inner or {}).items()
+        ],
+    )
+
+
+PAYMENT = [
+    f"# {ArchitecturalKeywords.SUBSCRIBES} orders",
+    f"# {ArchitecturalKeywords.SUBSCRIBES} orders",
+    f"# {Keywords.ACTIVITY} charge card {ContextKeywords.DATABASE} payments",
+    f"# {Keywords.EVENT} paid {ArchitecturalKeywords.PUBLISHES} payment.done",
+    f"# {Keywords.EVENT} failed {ArchitecturalKeywords.PUBLISHES} payment.done",
+]
+
+SHIPPING = [
+    f"# {ArchitecturalKeywords.SUBSCRIBES} payment.done",
+    f"# {Keywords.ACTIVITY} ship {ContextKeywords.DATABASE} orders_db",
+]
+
+NOTIFY = [
+    f"# {Keywords.ACTIVITY} send email {ContextKeywords.API_CALL_OUT} mailer",
+]
+
+
+class TestArchitecture(TestCase):
+    def setUp(self) -> None:
+        self.index = ArchitectureIndex()
+        self.index.add(_composed("payment", PAYMENT, inner={"notify": NOTIFY}))
+        self.index.add(_composed("shipping", SHIPPING, inner={"notify": NOTIFY}))
+
+    def test_looks_up_topics_databases_and_api_calls(self):
+        # After
+        assert self.index.subscribers("orders") == ["payment"]
+        assert self.index.publishers("payment.done") == ["payment"]
+        assert self.index.subscribers("payment.done") == ["shipping"]
+        assert self.index.flows_using("payments") == ["payment"]
+        assert self.index.callers("mailer") == ["notify"]
+        assert self.index.publishers("unknown") == []
+
+    def test_draws_every_node_and_edge_once(self):
+        # Before
+        graph = AGraph(directed=True, compound=True)
+
+        # Test
+        self.index.draw(graph)
+
+        # After
+        assert sorted(graph.nodes()) == [
+            "orders",
+            "payment",
+            "payment.done",
+            "shipping",
+        ]
+        assert sorted(graph.edges()) == [
+            ("orders", "payment"),
+            ("payment", "payment.done"),
+            ("payment.done", "shipping"),
+        ]
+
+    def test_client_indexes_diagrams_drawn_before(self):
+        # Before
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "shipping.py")
+        with open(path, "w") as file:
+            file.write(
+                f"# {ClusterKeywords.MAIN_CLUSTER} shipping\n"
+                + "".join(f"{token}\n" for token in SHIPPING)
+                + f"# {ClusterKeywords.END_MAIN_CLUSTER}\n"
+            )
+        out_path = os.path.join(directory.name, "out")
+
+        def index() -> ArchitectureIndex:
+            client = DocupytClient(parser=CommentParser(), cache=FlowCache(out_path))
+            client.draw_epc(
+                out_path, [FileFormat(input_path=path)], output_format=OutputFormat.DOT
+            )
+            return client.architecture
+
+        first = index()
+
+        # Test
+        cached = index()
+
+        # After
+        for architecture in (first, cached):
+            assert architecture.flows_using("orders_db") == ["shipping"]
+            assert architecture.subscribers("payment.done") == ["shipping"]
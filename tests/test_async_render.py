@@ -0,0 +1,90 @@
+import asyncio
+import os
+import stat
+import time
+
+from flow_tree import PAYMENT, FlowTreeCase
+
+from client import FileFormat
+from render import AsyncRenderer, OutputFormat, RenderJob
+
+# stands in for dot: copies the source to the output, slowly when asked to
+FAKE_DOT = """#!/bin/sh
+source=$(cat)
+case "$source" in *slow*) exec sleep 2;; esac
+case "$source" in *broken*) echo "syntax error" >&2; exit 3;; esac
+printf %s "$source" > "$3"
+"""
+
+
+async def _collect(results) -> list:
+    return [result async for result in results]
+
+
+class TestAsyncRender(FlowTreeCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.dot = os.path.join(self.root, "dot")
+        with open(self.dot, "w") as file:
+            file.write(FAKE_DOT)
+        os.chmod(self.dot, os.stat(self.dot).st_mode | stat.S_IEXEC)
+
+    def _job(self, name: str, source: str) -> RenderJob:
+        return RenderJob(
+            source=source,
+            output=os.path.join(self.root, f"{name}.svg"),
+            format=OutputFormat.SVG,
+        )
+
+    def test_yields_results_as_they_finish(self):
+        # Before
+        renderer = AsyncRenderer(limit=2, dot=self.dot, timeout=1)
+        jobs = [self._job("slow", "slow graph"), self._job("fast", "fast graph")]
+
+        # Test
+        started = time.monotonic()
+        results = asyncio.run(_collect(renderer.render(jobs)))
+
+        # After
+        assert [os.path.basename(result.output) for result in results] == [
+            "fast.svg",
+            "slow.svg",
+        ]
+        assert results[0].ok
+        assert "longer than 1s" in results[1].error
+        assert time.monotonic() - started < 2
+
+    def test_reports_failing_layouts(self):
+        # Before
+        renderer = AsyncRenderer(dot=self.dot)
+
+        # Test
+        (result,) = asyncio.run(
+            _collect(renderer.render([self._job("broken", "broken graph")]))
+        )
+
+        # After
+        assert result.error == "syntax error"
+
+    def test_draw_epc_async_streams_every_output(self):
+        # Before
+        path = self._write("payment", PAYMENT)
+        os.makedirs(self.out_path)
+
+        # Test
+        results = asyncio.run(
+            _collect(
+                self.client.draw_epc_async(
+                    self.out_path,
+                    [FileFormat(input_path=path)],
+                    output_format=OutputFormat.DOT,
+                )
+            )
+        )
+
+        # After
+        assert sorted(os.path.basename(result.output) for result in results) == [
+            "architecture.dot",
+            "payment.dot",
+        ]
+        assert os.path.exists(os.path.join(self.out_path, "manifest.json"))
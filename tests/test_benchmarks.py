@@ -0,0 +1,66 @@
+import json
+import tempfile
+from parser.doctree_parser import CommentParser
+from unittest import TestCase
+
+import typer
+
+from benchmarks.generator import TreeSpec, generate
+from benchmarks.suite import BASELINE, PHASES, compare, main
+from clusterer import Cluster
+from compose import Composer
+from doctree import IfNode
+
+
+class TestBenchmarks(TestCase):
+    def test_generated_tree_has_the_requested_shape(self):
+        # Before
+        spec = TreeSpec(files=3, mains=2, inners=2, steps=5, depth=4, annotations=3)
+
+        # Test
+        with tempfile.TemporaryDirectory() as root:
+            files = generate(root, spec)
+            extracted = [
+                flows
+                for _, flows in Cluster(parser=CommentParser()).extract_files(files)
+            ]
+
+        # After
+        assert sum(len(flows.main) for flows in extracted) == 6
+        assert sum(len(flows.inner) for flows in extracted) == 6
+        assert not any(flows.issues for flows in extracted)
+
+        diagram = Composer().compose(parsed=extracted[0].main[0].tokens)
+        assert diagram.inner_flow_names == ["helper 0 0", "helper 0 1"]
+        node = diagram.head
+        assert node._database and node._incoming_api_calls
+        while not isinstance(node, IfNode):
+            node = node.next
+        for _ in range(3):
+            node = node.branches[0].next
+        assert isinstance(node, IfNode)
+
+    def test_compare_reports_slower_and_steeper_phases(self):
+        # Before
+        baseline = {"phases": {"parse": {"seconds": [1.0, 4.0], "exponent": 1.0}}}
+        results = {"phases": {"parse": {"seconds": [1.0, 16.0], "exponent": 2.0}}}
+
+        # Test
+        regressions = compare(results, baseline, tolerance=0.3)
+
+        # After
+        assert len(regressions) == 2
+        assert compare(baseline, baseline, tolerance=0.3) == []
+
+    def test_stored_baseline_covers_every_phase(self):
+        # Test
+        with open(BASELINE) as file:
+            baseline = json.load(file)
+
+        # After
+        assert sorted(baseline["phases"]) == sorted(PHASES)
+
+    def test_missing_baseline_is_an_error(self):
+        # Test
+        with self.assertRaises(typer.BadParameter):
+            main(baseline="no-such-baseline.json")
@@ -0,0 +1,150 @@
+import os
+import tempfile
+from parser.doctree_parser import CommentParser
+from unittest import TestCase
+
+from cache import FlowCache
+from client import DocupytClient, FileFormat
+from clusterer import Cluster
+from render import OutputFormat
+from settings.language import ArchitecturalKeywords, ClusterKeywords, Keywords
+
+SOURCE = f"""
+# {ClusterKeywords.MAIN_CLUSTER} checkout
+# {Keywords.ACTIVITY} charge card
+# {ClusterKeywords.END_MAIN_CLUSTER}
+"""
+
+
+REFUND = f"""
+# {ClusterKeywords.MAIN_CLUSTER} refund
+# {ArchitecturalKeywords.SUBSCRIBES} orders
+# {Keywords.ACTIVITY} return money
+# {Keywords.ACTIVITY} notify customer
+# {ClusterKeywords.END_MAIN_CLUSTER}
+"""
+
+
+class ComposeCountingClient(DocupytClient):
+    def __init__(self, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.composed = []
+
+    def _compose_main(self, main_flow, inner_flows):
+        self.composed.append(main_flow.name)
+        return super()._compose_main(main_flow, inner_flows)
+
+
+class CountingParser(CommentParser):
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def parse(self, file_path: str):
+        self.calls += 1
+        return super().parse(file_path)
+
+
+class TestFlowCache(TestCase):
+    def setUp(self) -> None:
+        self._directory = tempfile.TemporaryDirectory()
+        self.root = self._directory.name
+
+    def tearDown(self) -> None:
+        self._directory.cleanup()
+
+    def test_entries_are_keyed_by_content(self):
+        # Before
+        cache = FlowCache(self.root)
+        key = cache.key(b"content")
+
+        # Test
+        cache.put(key, {"inner": [], "main": []})
+
+        # After
+        assert cache.get(key) == {"inner": [], "main": []}
+        assert cache.get(cache.key(b"other content")) is None
+        assert cache.key(b"content", namespace="Parser") != key
+
+    def test_rebuild_ignores_existing_entries(self):
+        # Before
+        cache = FlowCache(self.root)
+        key = cache.key(b"content")
+        cache.put(key, {"inner": [], "main": []})
+        cache.save_diagrams({"flow.png": "fingerprint"})
+
+        # Test
+        rebuilt = FlowCache(self.root, rebuild=True)
+
+        # After
+        assert rebuilt.get(key) is None
+        assert rebuilt.diagrams() == {}
+
+    def test_evicts_least_recently_used(self):
+        # Before
+        cache = FlowCache(self.root, max_bytes=200)
+        keys = [cache.key(str(index).encode()) for index in range(4)]
+        for index, key in enumerate(keys):
+            cache.put(key, {"inner": [], "main": [], "padding": "x" * 60})
+            path = cache._entry_path(key)
+            os.utime(path, (index, index))
+
+        # Test
+        cache.evict()
+
+        # After
+        assert cache.get(keys[0]) is None
+        assert cache.get(keys[3]) is not None
+
+    def test_cluster_skips_parsing_cached_files(self):
+        # Before
+        path = os.path.join(self.root, "checkout.py")
+        with open(path, "w") as file:
+            file.write(SOURCE)
+        parser = CountingParser()
+        cache = FlowCache(os.path.join(self.root, "out"))
+
+        # Test
+        Cluster(parser=parser, cache=cache).extract_flows([path])
+        cluster = Cluster(parser=parser, cache=cache)
+        flows_before = len(cluster._main_flows)
+        cluster.extract_flows([path])
+
+        # After
+        assert parser.calls == 1
+        assert cluster._main_flows[flows_before].name == "checkout"
+        assert cluster._main_flows[flows_before].tokens[1].endswith("charge card")
+
+    def test_unchanged_diagrams_are_not_composed_again(self):
+        # Before
+        out_path = os.path.join(self.root, "out")
+        files = []
+        for name, source in (("checkout", SOURCE), ("refund", REFUND)):
+            files.append(os.path.join(self.root, f"{name}.py"))
+            with open(files[-1], "w") as file:
+                file.write(source)
+
+        def draw() -> list[str]:
+            client = ComposeCountingClient(
+                parser=CommentParser(), cache=FlowCache(out_path), page_size=1
+            )
+            client.draw_epc(
+                out_path,
+                [FileFormat(input_path=path) for path in files],
+                output_format=OutputFormat.DOT,
+            )
+            return client.composed
+
+        first = draw()
+
+        # Test
+        unchanged = draw()
+        with open(files[1], "w") as file:
+            file.write(REFUND.replace("return money", "refund card"))
+        changed = draw()
+
+        # After
+        assert sorted(first) == ["checkout", "refund"]
+        assert unchanged == []
+        assert changed == ["refund"]
+        assert os.path.exists(os.path.join(out_path, "architecture.dot"))
+        assert os.path.exists(os.path.join(out_path, "refund.page-2.dot"))
@@ -0,0 +1,101 @@
+from parser.doctree_parser import CommentParser
+from unittest import TestCase
+
+import code_tokenize as ctok
+
+from compose import Composer
+from ir import encode_diagram
+from settings.language import ClusterKeywords, Keywords
+
+SOURCE = f'''"""module docstring # {Keywords.ACTIVITY} not a comment"""
+import os
+
+# {ClusterKeywords.MAIN_CLUSTER} payment
+value = "# {Keywords.ACTIVITY} inside a string"
+# {Keywords.IF} balance is enough
+# {Keywords.IF} fraud suspected
+# {Keywords.EVENT} fraud alert
+# {Keywords.ENDIF}
+# {Keywords.ACTIVITY} charge  # trailing
+# {Keywords.ENDIF}
+# {ClusterKeywords.END_MAIN_CLUSTER}
+text = \'\'\'
+# not a comment either
+\'\'\'
+'''
+
+
+class TestCommentParser(TestCase):
+    def __init__(self, methodName: str = "runTest") -> None:
+        super().__init__(methodName)
+        self.parser = CommentParser()
+
+    def test_yields_only_comments(self):
+        # Test
+        comments = list(self.parser.scan(SOURCE))
+
+        # After
+        assert [comment.line for comment in comments] == [4, 6, 7, 8, 9, 10, 11, 12]
+        assert comments[0].text == f"# {ClusterKeywords.MAIN_CLUSTER} payment"
+        assert str(comments[5]) == f"# {Keywords.ACTIVITY} charge  # trailing"
+
+    def test_matches_tokenizer_comments(self):
+        # Before
+        tokens = ctok.tokenize(SOURCE, lang="python")
+
+        # Test
+        comments = [str(comment) for comment in self.parser.scan(SOURCE)]
+
+        # After
+        assert comments == [str(token) for token in tokens if token.type == "comment"]
+
+    def test_composes_like_the_tokenizer_without_keyword_strings(self):
+        # Before
+        source = f"""
+# {ClusterKeywords.MAIN_CLUSTER} payment
+# {Keywords.ACTIVITY} charge card
+message = "{Keywords.ACTIVITY} retry"
+# {Keywords.EVENT} charged
+# {ClusterKeywords.END_MAIN_CLUSTER}
+"""
+        without_string = source.replace(f'"{Keywords.ACTIVITY} retry"', '""')
+
+        def diagram(tokens) -> dict:
+            return encode_diagram(Composer().compose(parsed=tokens, name="payment"))
+
+        # Test
+        scanned = diagram(self.parser.scan(source))
+        tokenized = diagram(ctok.tokenize(source, lang="python"))
+
+        # After
+        assert scanned == diagram(ctok.tokenize(without_string, lang="python"))
+        assert [node["description"] for node in tokenized["nodes"]] == [
+            "charge card",
+            'retry"',
+            "charged",
+        ]
+        assert [node["description"] for node in scanned["nodes"]] == [
+            "charge card",
+            "charged",
+        ]
+
+    def test_is_lazy(self):
+        # Test
+        comments = self.parser.scan(SOURCE)
+
+        # After
+        assert next(comments).line == 4
+
+    def test_composes_nested_conditions(self):
+        # Before
+        comments = list(self.parser.scan(SOURCE))
+
+        # Test
+        diagram = Composer().compose(parsed=comments)
+
+        # After
+        outer = diagram.head
+        inner = outer.branches[0]
+        assert inner.branches[0]._description == "fraud alert"
+        assert inner.next._description == "charge  # trailing"
+        assert outer.next is None
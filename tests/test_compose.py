@@ -0,0 +1,96 @@
+from unittest import TestCase
+
+from compose import Composer, KeywordScan
+from doctree import ActivityNode, EventNode
+from settings.language import ArchitecturalKeywords, ContextKeywords, Keywords
+
+
+def _nodes(tokens: list[str]) -> list:
+    diagram = Composer().compose(parsed=tokens)
+    nodes = []
+    node = diagram.head
+    while node:
+        nodes.append(node)
+        node = node.next
+
+    return nodes
+
+
+class TestCompose(TestCase):
+    def test_overlapping_keywords_are_all_found(self):
+        # Before
+        token = f"# {Keywords.ACTIVITY} sync <-> bank"
+
+        # Test
+        scanned = KeywordScan(token)
+        (node,) = _nodes([token])
+
+        # After
+        found = [keyword for _, keyword in scanned.positions]
+        assert found == [
+            Keywords.ACTIVITY,
+            ContextKeywords.API_CALL_IN,
+            ContextKeywords.API_CALL_OUT,
+        ]
+        assert node._description == "sync"
+        assert node._incoming_api_calls == ["> bank"]
+        assert node._outgoing_api_calls == ["bank"]
+
+    def test_database_and_api_calls_in_one_comment(self):
+        # Test
+        (node,) = _nodes(
+            [
+                f"# {Keywords.ACTIVITY} charge card {ContextKeywords.DATABASE} payments"
+                f" {ContextKeywords.API_CALL_OUT} bank, fraud"
+                f" {ContextKeywords.API_CALL_IN} shop"
+            ]
+        )
+
+        # After
+        assert isinstance(node, ActivityNode)
+        assert node._description == "charge card"
+        assert node._database == "payments"
+        assert node._outgoing_api_calls == ["bank", "fraud"]
+        assert node._incoming_api_calls == ["shop"]
+
+    def test_event_publishes_a_topic(self):
+        # Before
+        composer = Composer()
+
+        # Test
+        diagram = composer.compose(
+            parsed=[
+                f"# {Keywords.EVENT} paid {ArchitecturalKeywords.PUBLISHES} payment.done"
+            ]
+        )
+
+        # After
+        assert isinstance(diagram.head, EventNode)
+        assert diagram.head._description == "paid"
+        assert diagram.architecture._publishes == ["payment.done"]
+
+    def test_comment_with_several_node_keywords(self):
+        # Test
+        nodes = _nodes(
+            [
+                f"# {Keywords.ACTIVITY} charge {ContextKeywords.DATABASE} cards"
+                f" {Keywords.EVENT} charged {Keywords.ACTIVITY} notify"
+            ]
+        )
+
+        # After
+        assert [(type(node), node._description) for node in nodes] == [
+            (ActivityNode, "charge"),
+            (EventNode, "charged"),
+            (ActivityNode, "notify"),
+        ]
+        assert [node._database for node in nodes] == ["cards", None, None]
+
+    def test_text_stops_at_the_end_of_the_line(self):
+        # Test
+        trailing = _nodes([f"# {Keywords.ACTIVITY} charge card\n"])
+        broken = _nodes([f"# {Keywords.ACTIVITY} first\n{Keywords.ACTIVITY} second"])
+
+        # After
+        assert [node._description for node in trailing] == ["charge card"]
+        assert [node._description for node in broken] == ["second"]
@@ -0,0 +1,87 @@
+from unittest import TestCase
+
+from compose import Composer
+from doctree import IfNode
+from settings.language import ArchitecturalKeywords, ClusterKeywords, Keywords
+
+
+def _nested(depth: int) -> list[str]:
+    opened = [f"# {Keywords.IF} level {level}" for level in range(depth)]
+    closed = [f"# {Keywords.ENDIF}"] * depth
+    return opened + [f"# {Keywords.ACTIVITY} deepest"] + closed
+
+
+class TestConditions(TestCase):
+    def __init__(self, methodName: str = "runTest") -> None:
+        super().__init__(methodName)
+        self.composer = Composer()
+
+    def test_composes_thousands_of_steps(self):
+        # Before
+        tokens = []
+        for index in range(2000):
+            tokens += [
+                f"# {Keywords.IF} check {index}",
+                f"# {Keywords.ACTIVITY} left {index}",
+                f"# {Keywords.ELSE} {Keywords.EVENT} right {index}",
+                f"# {Keywords.ENDIF}",
+            ]
+
+        # Test
+        diagram = self.composer.compose(parsed=tokens)
+
+        # After
+        assert diagram.length == 2000
+        node = diagram.head
+        for index in range(2000):
+            assert isinstance(node, IfNode)
+            assert node.branches[0]._description == f"left {index}"
+            assert node.branches[1]._description == f"right {index}"
+            node = node.next
+
+    def test_composes_deep_nesting(self):
+        # Test
+        diagram = self.composer.compose(parsed=_nested(100))
+
+        # After
+        node = diagram.head
+        for _ in range(100):
+            assert isinstance(node, IfNode)
+            assert len(node.branches) == 1
+            assert node.next is None
+            node = node.branches[0]
+
+        assert node._description == "deepest"
+
+    def test_unmatched_markers_are_plain_flow(self):
+        # Before
+        tokens = [
+            f"# {Keywords.ENDIF} {Keywords.ACTIVITY} first",
+            f"# {Keywords.IF} never closed {Keywords.ACTIVITY} second",
+            f"# {Keywords.ELSE} {Keywords.ACTIVITY} third",
+        ]
+
+        # Test
+        diagram = self.composer.compose(parsed=tokens)
+
+        # After
+        assert diagram.head._description == "first"
+        assert diagram.head.next._description == "second"
+        assert diagram.tail._description == "third"
+
+    def test_branches_keep_inner_flows_and_topics(self):
+        # Before
+        tokens = [
+            f"# {Keywords.IF} paid",
+            f"# {ClusterKeywords.INNER_FLOW} ship order",
+            f"# {Keywords.ELSE} {Keywords.EVENT} failed "
+            f"{ArchitecturalKeywords.PUBLISHES} payment.failed",
+            f"# {Keywords.ENDIF}",
+        ]
+
+        # Test
+        diagram = self.composer.compose(parsed=tokens)
+
+        # After
+        assert diagram.inner_flow_names == ["ship order"]
+        assert diagram.architecture._publishes == ["payment.failed"]
@@ -0,0 +1,176 @@
+import http.client
+import json
+import os
+import socket
+import threading
+
+import typer
+from flow_tree import PAYMENT, FlowTreeCase
+
+import main
+from cache import CACHE_DIRECTORY, FlowCache
+from daemon import DaemonClient, RenderDaemon
+from manifest import MANIFEST_NAME
+from render import OutputFormat
+from settings.language import Keywords
+
+
+class TestDaemon(FlowTreeCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self._write("payment", PAYMENT)
+
+        # act: a page per two steps, payment draws on one
+        self.daemon = RenderDaemon(self._client(page_size=2), port=0)
+        self._thread = threading.Thread(target=self.daemon.serve, daemon=True)
+        self._thread.start()
+        self.remote = DaemonClient(port=self.daemon.server.server_address[1])
+
+    def tearDown(self) -> None:
+        self.daemon.shutdown()
+        self._thread.join()
+        super().tearDown()
+
+    def test_renders_and_picks_up_changes(self):
+        # Before
+        self.remote.render(self.root, self.out_path, OutputFormat.DOT)
+        self._write("payment", PAYMENT.replace("charge card", "charge wallet"))
+        os.utime(os.path.join(self.root, "payment.py"), ns=(1, 1))
+
+        # Test
+        reply = self.remote.render(self.root, self.out_path, OutputFormat.DOT)
+
+        # After
+        assert reply["changed"] == 1
+        assert reply["rendered"] == [os.path.join(self.out_path, "payment.dot")]
+        with open(os.path.join(self.out_path, "payment.dot")) as file:
+            assert "charge wallet" in file.read()
+
+    def test_renders_one_diagram(self):
+        # Test
+        reply = self.remote.diagram(
+            self.root, self.out_path, OutputFormat.DOT, "payment"
+        )
+
+        # After
+        assert reply["rendered"] == [os.path.join(self.out_path, "payment.dot")]
+        assert not os.path.exists(os.path.join(self.out_path, "architecture.dot"))
+
+    def test_renders_every_page_of_one_diagram(self):
+        # Before
+        self._write(
+            "payment",
+            PAYMENT.replace(
+                "charge card", f"charge card\n# {Keywords.ACTIVITY} receipt"
+            ),
+        )
+        pages = [
+            os.path.join(self.out_path, name)
+            for name in ("payment.dot", "payment.page-2.dot")
+        ]
+
+        # Test
+        reply = self.remote.diagram(
+            self.root, self.out_path, OutputFormat.DOT, "payment"
+        )
+        render = self.remote.render(self.root, self.out_path, OutputFormat.DOT)
+
+        # After
+        assert reply["rendered"] == pages
+        with open(os.path.join(self.out_path, MANIFEST_NAME)) as file:
+            manifest = json.load(file)
+        assert sorted(manifest["outputs"]) == [
+            "architecture.dot",
+            "payment.dot",
+            "payment.page-2.dot",
+        ]
+        assert render["rendered"] == [os.path.join(self.out_path, "architecture.dot")]
+
+    def test_returns_ir(self):
+        # Test
+        header, record = self.remote.ir(self.root)
+
+        # After
+        assert header["format"] == "docupyt-ir"
+        assert record["diagram"]["name"] == "payment"
+
+    def test_answers_none_without_daemon(self):
+        # Before
+        self.daemon.shutdown()
+
+        # Test
+        reply = self.remote.render(self.root, self.out_path, OutputFormat.DOT)
+
+        # After
+        assert reply is None
+
+    def test_falls_back_when_the_daemon_does_not_answer(self):
+        # Before
+        silent = socket.socket()
+        silent.bind(("127.0.0.1", 0))
+        silent.listen()
+        self.addCleanup(silent.close)
+        client = DaemonClient(port=silent.getsockname()[1], timeout=0.1)
+
+        # Test
+        reply = client.render(self.root, self.out_path, OutputFormat.DOT)
+
+        # After
+        assert reply is None
+
+    def test_workspaces_keep_their_own_cache(self):
+        # Before
+        served = os.path.join(self._directory.name, "served")
+        daemon = RenderDaemon(self._client(cache=FlowCache(served)), port=0)
+        self.addCleanup(daemon.server.server_close)
+        out_paths = [os.path.join(self._directory.name, name) for name in "ab"]
+
+        # Test
+        for out_path in out_paths:
+            daemon.handle(
+                "/render", {"path": self.root, "out_path": out_path, "format": "dot"}
+            )
+
+        # After
+        for out_path in out_paths:
+            drawn = FlowCache(out_path).diagrams()
+            assert os.path.join(out_path, "payment.dot") in drawn
+            assert all(output.startswith(out_path) for output in drawn)
+        assert not os.path.exists(
+            os.path.join(served, CACHE_DIRECTORY, "diagrams.json")
+        )
+
+    def _post(self, body: str, headers: dict) -> int:
+        connection = http.client.HTTPConnection(*self.daemon.server.server_address[:2])
+        try:
+            connection.request("POST", "/render", body=body, headers=headers)
+            return connection.getresponse().status
+        finally:
+            connection.close()
+
+    def test_refuses_requests_a_web_page_could_send(self):
+        # Before
+        body = json.dumps({"path": self.root, "out_path": self.out_path})
+        port = self.daemon.server.server_address[1]
+
+        # Test
+        plain = self._post(body, {"Content-Type": "text/plain"})
+        rebound = self._post(
+            body, {"Content-Type": "application/json", "Host": f"evil.test:{port}"}
+        )
+
+        # After
+        assert (plain, rebound) == (415, 403)
+        assert not os.path.exists(self.out_path)
+
+    def test_refuses_options_the_daemon_cannot_take(self):
+        # Test
+        with self.assertRaises(typer.BadParameter) as raised:
+            main.app(
+                ["--path", self.root, "--out-path", self.out_path, "--daemon"]
+                + ["--jobs", "2", "--no-cache"],
+                standalone_mode=False,
+            )
+
+        # After
+        assert "--no-cache, --jobs" in str(raised.exception)
@@ -0,0 +1,80 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from discovery import FileDiscovery, IgnoreRule
+
+
+class TestFileDiscovery(TestCase):
+    def setUp(self) -> None:
+        self._directory = tempfile.TemporaryDirectory()
+        self.root = self._directory.name
+
+        for path in [
+            "app/service.py",
+            "app/logo.png",
+            "app/generated/models.py",
+            "app/keep/generated/models.py",
+            "build/out.py",
+            ".git/hooks/hook.py",
+            "env/lib/site.py",
+            "docs/conf.py",
+        ]:
+            self._touch(path)
+        self._touch("env/pyvenv.cfg")
+        self._touch(".gitignore", "build/\ngenerated/\n!app/keep/generated/\n")
+
+    def tearDown(self) -> None:
+        self._directory.cleanup()
+
+    def _touch(self, path: str, content: str = ""):
+        full_path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "w") as file:
+            file.write(content)
+
+    def _discover(self, **kwargs) -> list[str]:
+        return [
+            os.path.relpath(path, self.root).replace(os.sep, "/")
+            for path in FileDiscovery(**kwargs).discover(self.root)
+        ]
+
+    def test_defaults_to_python_sources_and_prunes(self):
+        # Test
+        paths = self._discover()
+
+        # After
+        assert paths == [
+            "app/service.py",
+            "app/keep/generated/models.py",
+            "docs/conf.py",
+        ]
+
+    def test_include_and_exclude_globs(self):
+        # Test
+        paths = self._discover(include=("*.png", "*.py"), exclude=("docs",))
+
+        # After
+        assert paths == [
+            "app/logo.png",
+            "app/service.py",
+            "app/keep/generated/models.py",
+        ]
+
+    def test_is_a_generator(self):
+        # Test
+        paths = FileDiscovery().discover(self.root)
+
+        # After
+        assert next(paths).endswith("service.py")
+
+    def test_ignore_rule_anchoring(self):
+        # Before
+        anchored = IgnoreRule.parse("/docs/*.py")
+        floating = IgnoreRule.parse("**/conf.py")
+
+        # After
+        assert anchored.regex.match("docs/conf.py")
+        assert not anchored.regex.match("app/docs/conf.py")
+        assert floating.regex.match("app/docs/conf.py")
+        assert floating.regex.match("conf.py")
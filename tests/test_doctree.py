@@ -0,0 +1,50 @@
+from unittest import TestCase
+
+from pygraphviz import AGraph
+
+from client import DocupytClient
+from compose import Composer
+from settings.language import ContextKeywords, Keywords
+
+FLOW = [
+    f"# {Keywords.ACTIVITY} charge card {ContextKeywords.DATABASE} payments"
+    f" {ContextKeywords.API_CALL_OUT} bank",
+    f"# {Keywords.IF} card accepted",
+    f"# {Keywords.EVENT} paid",
+    f"# {Keywords.ELSE} {Keywords.EVENT} declined",
+    f"# {Keywords.ENDIF}",
+]
+
+
+def _source(name: str = "payment") -> str:
+    diagram = Composer().compose(parsed=FLOW, name=name)
+    graph = AGraph(directed=True, compound=True)
+    DocupytClient()._draw(pygraph=graph, diagram=diagram)
+    return graph.string()
+
+
+class TestDoctree(TestCase):
+    def test_same_flow_gives_same_graph(self):
+        # Test
+        first, second = _source(), _source()
+
+        # After
+        assert first == second
+
+    def test_conditions_of_other_flows_get_other_ids(self):
+        # Test
+        payment, refund = _source("payment"), _source("refund")
+
+        # After
+        assert payment != refund
+
+    def test_nodes_have_no_instance_dict(self):
+        # Before
+        diagram = Composer().compose(parsed=FLOW)
+
+        # Test
+        nodes = [diagram.head, diagram.head.next, *diagram.head.next.branches]
+
+        # After
+        for node in nodes:
+            assert not hasattr(node, "__dict__")
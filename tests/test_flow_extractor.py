@@ -0,0 +1,82 @@
+from parser.doctree_parser import Comment
+from unittest import TestCase
+
+from clusterer import FlowExtractor
+from settings.language import ClusterKeywords, Keywords
+
+
+def _extract(lines: list[str]):
+    extractor = FlowExtractor()
+    for index, line in enumerate(lines):
+        extractor.feed(Comment(line=index + 1, text=f"# {line}"), index)
+
+    return extractor.close()
+
+
+class TestFlowExtractor(TestCase):
+    def test_finds_adjacent_inner_diagrams(self):
+        # Before
+        lines = []
+        for index in range(50):
+            lines += [
+                f"{ClusterKeywords.CLUSTER} inner {index}",
+                f"{Keywords.ACTIVITY} step {index}",
+                f"{ClusterKeywords.END_CLUSTER}",
+            ]
+
+        # Test
+        flows = _extract(lines)
+
+        # After
+        assert [flow.name for flow in flows.inner] == [
+            f"inner {index}" for index in range(50)
+        ]
+        assert flows.inner[7].tokens == [
+            f"# {ClusterKeywords.CLUSTER} inner 7",
+            f"# {Keywords.ACTIVITY} step 7",
+        ]
+        assert flows.issues == []
+
+    def test_inner_diagram_is_cut_out_of_main_flow(self):
+        # Test
+        flows = _extract(
+            [
+                f"{ClusterKeywords.MAIN_CLUSTER} checkout",
+                f"{Keywords.ACTIVITY} before",
+                f"{ClusterKeywords.CLUSTER} validate",
+                f"{Keywords.ACTIVITY} inside",
+                f"{ClusterKeywords.END_CLUSTER}",
+                f"{Keywords.ACTIVITY} after",
+                f"{ClusterKeywords.END_MAIN_CLUSTER}",
+            ]
+        )
+
+        # After
+        assert flows.main[0].name == "checkout"
+        assert flows.main[0].tokens == [
+            f"# {ClusterKeywords.MAIN_CLUSTER} checkout",
+            f"# {Keywords.ACTIVITY} before",
+            f"# {Keywords.ACTIVITY} after",
+        ]
+        assert flows.inner[0].tokens[1] == f"# {Keywords.ACTIVITY} inside"
+
+    def test_reports_unterminated_and_stray_blocks(self):
+        # Test
+        flows = _extract(
+            [
+                f"{ClusterKeywords.END_MAIN_CLUSTER}",
+                f"{ClusterKeywords.MAIN_CLUSTER} first",
+                f"{ClusterKeywords.MAIN_CLUSTER} second",
+                f"{ClusterKeywords.END_MAIN_CLUSTER}",
+                f"{ClusterKeywords.CLUSTER} dangling",
+            ]
+        )
+
+        # After
+        assert [flow.name for flow in flows.main] == ["second"]
+        assert flows.inner == []
+        assert flows.issues == [
+            f"line 1: {ClusterKeywords.END_MAIN_CLUSTER} without a diagram",
+            f"line 2: {ClusterKeywords.MAIN_CLUSTER} 'first' is not terminated",
+            f"line 5: {ClusterKeywords.CLUSTER} 'dangling' is not terminated",
+        ]
@@ -0,0 +1,109 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from compose import Composer
+from ir import ComposedDiagram, IRError, IRReader, IRWriter, encode_diagram
+from settings.language import (
+    ArchitecturalKeywords,
+    ClusterKeywords,
+    ContextKeywords,
+    Keywords,
+)
+
+FLOW = [
+    f"# {ArchitecturalKeywords.SUBSCRIBES} order.created",
+    f"# {Keywords.ACTIVITY} load account {ContextKeywords.DATABASE} bank.accounts "
+    f"{ContextKeywords.API_CALL_OUT} acc_id {ContextKeywords.API_CALL_IN} balance",
+    f"# {Keywords.IF} enough balance",
+    f"# {Keywords.IF} fraud suspected",
+    f"# {Keywords.EVENT} fraud alert {ArchitecturalKeywords.PUBLISHES} fraud.detected",
+    f"# {Keywords.ENDIF}",
+    f"# {ClusterKeywords.INNER_FLOW} notify user",
+    f"# {Keywords.ELSE} {Keywords.EVENT} insufficient funds",
+    f"# {Keywords.ENDIF}",
+]
+
+
+class TestIR(TestCase):
+    def setUp(self) -> None:
+        self._directory = tempfile.TemporaryDirectory()
+        self.root = self._directory.name
+
+    def tearDown(self) -> None:
+        self._directory.cleanup()
+
+    def _composed(self, name: str) -> ComposedDiagram:
+        diagram = Composer().compose(parsed=FLOW)
+        diagram.name = name
+        inner = Composer().compose(parsed=[f"# {Keywords.ACTIVITY} send email"])
+        inner.name = "notify user"
+        return ComposedDiagram(diagram=diagram, inner=[inner])
+
+    def _assert_round_trip(self, file_name: str):
+        # Before
+        path = os.path.join(self.root, file_name)
+        composed = [self._composed("payment"), self._composed("refund")]
+
+        # Test
+        with IRWriter(path) as writer:
+            for index, item in enumerate(composed):
+                writer.write(item, fingerprint=str(index))
+        entries = list(IRReader(path))
+
+        # After
+        assert [entry.name for entry in entries] == ["payment", "refund"]
+        assert [entry.fingerprint for entry in entries] == ["0", "1"]
+        for entry, item in zip(entries, composed):
+            loaded = entry.load()
+            assert encode_diagram(loaded.diagram) == encode_diagram(item.diagram)
+            assert [encode_diagram(inner) for inner in loaded.inner] == [
+                encode_diagram(inner) for inner in item.inner
+            ]
+
+    def test_round_trip(self):
+        self._assert_round_trip("diagrams.ir")
+
+    def test_round_trip_compressed(self):
+        self._assert_round_trip("diagrams.ir.gz")
+
+    def test_keeps_annotations(self):
+        # Test
+        data = encode_diagram(self._composed("payment").diagram)
+
+        # After
+        activity, condition = data["nodes"]
+        assert activity["database"] == "bank.accounts"
+        assert activity["incoming"] == ["balance"]
+        assert activity["outgoing"] == ["acc_id"]
+        assert condition["branches"][0][0]["branches"][0][0]["type"] == "event"
+        assert condition["branches"][1][0]["description"] == "insufficient funds"
+        assert data["inner_flow_names"] == ["notify user"]
+        assert data["subscribes"] == ["order.created"]
+        assert data["publishes"] == ["fraud.detected"]
+
+    def test_records_without_fingerprint_get_one_from_their_content(self):
+        # Before
+        path = os.path.join(self.root, "flows.ir")
+        with IRWriter(path) as writer:
+            for name in ("payment", "refund", "payment"):
+                writer.write(self._composed(name))
+
+        # Test
+        payment, refund, again = [entry.fingerprint for entry in IRReader(path)]
+
+        # After
+        assert payment and refund
+        assert payment != refund
+        assert payment == again
+
+    def test_rejects_other_versions(self):
+        # Before
+        path = os.path.join(self.root, "future.ir")
+        with open(path, "w") as file:
+            file.write(json.dumps({"format": "docupyt-ir", "version": 99}) + "\n")
+
+        # Test
+        with self.assertRaises(IRError):
+            list(IRReader(path))
@@ -0,0 +1,83 @@
+import json
+import os
+
+from flow_tree import PAYMENT, REFUND, FlowTreeCase
+
+from client import FileFormat
+from manifest import MANIFEST_NAME
+from render import OutputFormat
+
+
+class TestManifest(FlowTreeCase):
+    def setUp(self) -> None:
+        super().setUp()
+        os.makedirs(self.out_path)
+        self.files = {
+            "payment": self._write("payment", PAYMENT),
+            "refund": self._write("refund", REFUND),
+        }
+
+    def _draw(self, output_format: OutputFormat = OutputFormat.DOT) -> dict:
+        self.client.draw_epc(
+            self.out_path,
+            [FileFormat(input_path=path) for path in self.files.values()],
+            output_format=output_format,
+        )
+        with open(os.path.join(self.out_path, MANIFEST_NAME)) as file:
+            return json.load(file)
+
+    def test_first_run_creates_every_output(self):
+        # Test
+        manifest = self._draw()
+
+        # After
+        assert manifest["created"] == ["architecture.dot", "payment.dot", "refund.dot"]
+        assert sorted(manifest["outputs"]) == manifest["created"]
+
+    def test_unchanged_outputs_are_not_written(self):
+        # Before
+        self._draw()
+        output = os.path.join(self.out_path, "payment.dot")
+        os.utime(output, ns=(0, 0))
+
+        # Test
+        manifest = self._draw()
+
+        # After
+        assert manifest["created"] == manifest["updated"] == []
+        assert len(manifest["unchanged"]) == 3
+        assert os.stat(output).st_mtime_ns == 0
+
+    def test_changed_and_removed_outputs_are_listed(self):
+        # Before
+        self._draw()
+        self._write("payment", PAYMENT.replace("charge card", "charge wallet"))
+        del self.files["refund"]
+
+        # Test
+        manifest = self._draw()
+
+        # After
+        assert manifest["updated"] == ["payment.dot"]
+        assert manifest["unchanged"] == ["architecture.dot"]
+        assert manifest["removed"] == ["refund.dot"]
+        assert not os.path.exists(os.path.join(self.out_path, "refund.dot"))
+
+    def test_outputs_of_other_formats_are_kept_while_their_diagram_is(self):
+        # Before
+        self._draw()
+        self._draw(OutputFormat.MERMAID)
+        del self.files["refund"]
+
+        # Test
+        manifest = self._draw(OutputFormat.MERMAID)
+
+        # After
+        assert manifest["removed"] == ["refund.dot", "refund.mmd"]
+        assert sorted(manifest["outputs"]) == [
+            "architecture.dot",
+            "architecture.mmd",
+            "payment.dot",
+            "payment.mmd",
+        ]
+        assert os.path.exists(os.path.join(self.out_path, "payment.dot"))
@@ -0,0 +1,116 @@
+import os
+import tempfile
+from parser.doctree_parser import CommentParser
+from unittest import TestCase
+
+from client import DocupytClient, FileFormat
+from compose import Composer
+from doctree import IfNode
+from ir import ComposedDiagram
+from pagination import paginate, weight
+from render import OutputFormat
+from settings.language import ClusterKeywords, Keywords
+
+FLOW = [
+    f"# {Keywords.ACTIVITY} take order",
+    f"# {Keywords.ACTIVITY} check stock",
+    f"# {Keywords.IF} in stock",
+    f"# {Keywords.ACTIVITY} reserve items",
+    f"# {Keywords.EVENT} reserved",
+    f"# {Keywords.ELSE} {Keywords.EVENT} out of stock",
+    f"# {Keywords.ENDIF}",
+    f"# {Keywords.ACTIVITY} charge card",
+    f"# {Keywords.EVENT} paid",
+]
+
+ORDER = "\n".join(
+    [
+        f"# {ClusterKeywords.MAIN_CLUSTER} order",
+        *FLOW,
+        f"# {ClusterKeywords.END_MAIN_CLUSTER}",
+    ]
+)
+
+
+def _composed() -> ComposedDiagram:
+    return ComposedDiagram(diagram=Composer().compose(parsed=FLOW, name="order"))
+
+
+class TestPagination(TestCase):
+    def test_condition_weighs_its_branches(self):
+        # Before
+        condition = _composed().diagram.head.next.next
+
+        # Test
+        total = weight(condition)
+
+        # After
+        assert isinstance(condition, IfNode)
+        assert total == 5
+
+    def test_pages_are_cut_between_top_level_nodes(self):
+        # Before
+        composed = _composed()
+
+        # Test
+        pages = paginate(composed, budget=3)
+
+        # After
+        assert [len(page.nodes) for page in pages] == [2, 1, 2]
+        assert isinstance(pages[1].nodes[0], IfNode)
+
+    def test_no_budget_gives_one_page(self):
+        # Test
+        pages = paginate(_composed(), budget=0)
+
+        # After
+        assert len(pages) == 1
+        assert len(pages[0].nodes) == 5
+
+
+class TestPaginatedDiagrams(TestCase):
+    def setUp(self) -> None:
+        self._directory = tempfile.TemporaryDirectory()
+        self.out_path = os.path.join(self._directory.name, "out")
+        os.makedirs(self.out_path)
+        self.path = os.path.join(self._directory.name, "order.py")
+        with open(self.path, "w") as file:
+            file.write(ORDER)
+
+    def tearDown(self) -> None:
+        self._directory.cleanup()
+
+    def _draw(self, page_size: int) -> list[str]:
+        client = DocupytClient(parser=CommentParser(), page_size=page_size)
+        client.draw_epc(
+            self.out_path,
+            [FileFormat(input_path=self.path)],
+            output_format=OutputFormat.DOT,
+        )
+        return sorted(name for name in os.listdir(self.out_path) if "order" in name)
+
+    def _read(self, name: str) -> str:
+        with open(os.path.join(self.out_path, name)) as file:
+            return file.read()
+
+    def test_pages_are_linked_by_connectors(self):
+        # Test
+        outputs = self._draw(page_size=3)
+
+        # After
+        assert outputs == ["order.dot", "order.page-2.dot", "order.page-3.dot"]
+        assert "continues on page 2" in self._read("order.dot")
+        assert "from page 1" in self._read("order.page-2.dot")
+        assert "continues on page 3" in self._read("order.page-2.dot")
+        assert "continues" not in self._read("order.page-3.dot")
+
+    def test_pages_left_over_are_removed(self):
+        # Before
+        self._draw(page_size=3)
+
+        # Test
+        outputs = self._draw(page_size=0)
+
+        # After
+        assert outputs == ["order.dot"]
+        assert "from page" not in self._read("order.dot")
@@ -0,0 +1,69 @@
+import os
+import tempfile
+from parser.doctree_parser import CommentParser
+from unittest import TestCase
+
+from clusterer import Cluster, FlowExtractionError, extract_file_flows
+from settings.language import ClusterKeywords, Keywords
+
+
+class TestParallelExtraction(TestCase):
+    def setUp(self) -> None:
+        self._directory = tempfile.TemporaryDirectory()
+        self.files = []
+        for index in range(12):
+            path = os.path.join(self._directory.name, f"module_{index}.py")
+            with open(path, "w") as file:
+                file.write(
+                    f"# {ClusterKeywords.CLUSTER} inner {index}\n"
+                    f"# {Keywords.ACTIVITY} step {index}\n"
+                    f"# {ClusterKeywords.END_CLUSTER}\n"
+                    f"# {ClusterKeywords.MAIN_CLUSTER} main {index}\n"
+                    f"# {ClusterKeywords.INNER_FLOW} inner {index}\n"
+                    f"# {ClusterKeywords.END_MAIN_CLUSTER}\n"
+                )
+            self.files.append(path)
+
+    def tearDown(self) -> None:
+        self._directory.cleanup()
+
+    def _extract(self, jobs: int, files: list[str]):
+        cluster = Cluster(parser=CommentParser())
+        inner_start, main_start = len(cluster._inner_flows), len(cluster._main_flows)
+        cluster.extract_flows(files, jobs=jobs)
+
+        return (
+            [flow.to_dict() for flow in cluster._inner_flows[inner_start:]],
+            [flow.to_dict() for flow in cluster._main_flows[main_start:]],
+        )
+
+    def test_parallel_matches_serial(self):
+        # Test
+        serial = self._extract(jobs=1, files=self.files)
+        parallel = self._extract(jobs=4, files=iter(self.files))
+
+        # After
+        assert parallel == serial
+        assert [flow["name"] for flow in parallel[1]] == [
+            f"main {index}" for index in range(12)
+        ]
+
+    def test_errors_name_the_file(self):
+        # Before
+        missing = os.path.join(self._directory.name, "missing.py")
+
+        # Test
+        with self.assertRaises(FlowExtractionError) as raised:
+            self._extract(jobs=2, files=self.files[:3] + [missing])
+
+        # After
+        assert raised.exception.file_path == missing
+        assert "missing.py" in str(raised.exception)
+
+    def test_worker_returns_flows(self):
+        # Test
+        flows = extract_file_flows(CommentParser(), self.files[0])
+
+        # After
+        assert [flow.name for flow in flows.inner] == ["inner 0"]
+        assert [flow.name for flow in flows.main] == ["main 0"]
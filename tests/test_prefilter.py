@@ -0,0 +1,84 @@
+import os
+import tempfile
+from parser.doctree_parser import CommentParser
+from unittest import TestCase
+
+from cache import FlowCache
+from clusterer import Cluster, has_diagrams
+from settings.language import ClusterKeywords, Keywords
+
+FLOW = (
+    f"# {ClusterKeywords.MAIN_CLUSTER} payment\n"
+    f"# {Keywords.ACTIVITY} charge card\n"
+    f"# {ClusterKeywords.END_MAIN_CLUSTER}\n"
+)
+
+PLAIN = f"""
+def charge(card):
+    if card.valid:
+        return True
+    else:
+        return False  # {Keywords.ACTIVITY} not in a diagram
+"""
+
+
+class RecordingParser(CommentParser):
+    def __init__(self) -> None:
+        self.parsed = []
+
+    def parse(self, file_path: str):
+        self.parsed.append(os.path.basename(file_path))
+        return super().parse(file_path)
+
+
+class TestPrefilter(TestCase):
+    def setUp(self) -> None:
+        self._directory = tempfile.TemporaryDirectory()
+        self.files = [
+            self._write("payment.py", FLOW),
+            self._write("plain.py", PLAIN),
+            self._write("stray.py", f"# {ClusterKeywords.END_CLUSTER}\n"),
+        ]
+
+    def tearDown(self) -> None:
+        self._directory.cleanup()
+
+    def _write(self, name: str, source: str) -> str:
+        path = os.path.join(self._directory.name, name)
+        with open(path, "w") as file:
+            file.write(source)
+
+        return path
+
+    def test_node_keywords_alone_do_not_match(self):
+        # Test
+        matches = [has_diagrams(source.encode()) for source in (FLOW, PLAIN)]
+
+        # After
+        assert matches == [True, False]
+
+    def test_files_without_diagram_keywords_are_not_parsed(self):
+        # Before
+        parser = RecordingParser()
+        cluster = Cluster(parser=parser)
+
+        # Test
+        cluster.extract_flows(self.files)
+
+        # After
+        assert parser.parsed == ["payment.py", "stray.py"]
+        assert [flow.name for flow in cluster._main_flows] == ["payment"]
+        assert cluster.skipped.files == 1
+        assert cluster.skipped.bytes == len(PLAIN.encode())
+
+    def test_skipped_files_are_not_cached(self):
+        # Before
+        cache = FlowCache(os.path.join(self._directory.name, "out"))
+        cluster = Cluster(parser=CommentParser(), cache=cache)
+
+        # Test
+        flows = dict(cluster.extract_files(self.files))
+
+        # After
+        assert flows[self.files[1]].main == []
+        assert cache.get(cache.key(PLAIN.encode(), namespace="CommentParser")) is None
@@ -0,0 +1,92 @@
+import os
+import tempfile
+from parser.doctree_parser import CommentParser
+from unittest import TestCase
+
+import profiling
+from clusterer import Cluster
+from profiling import ProfileHook, Profiler
+from settings.language import ClusterKeywords, Keywords
+
+SOURCE = f"""
+# {ClusterKeywords.MAIN_CLUSTER} checkout
+# {Keywords.ACTIVITY} charge card
+# {ClusterKeywords.END_MAIN_CLUSTER}
+"""
+
+
+class TestProfiler(TestCase):
+    def test_disabled_profiler_records_nothing(self):
+        # Before
+        profiler = Profiler()
+        tokens = [1, 2, 3]
+
+        # Test
+        with profiler.measure("compose", "flow"):
+            produced = profiler.iterate("parse", "file", lambda: tokens)
+
+        # After
+        assert produced is tokens
+        assert profiler.records == []
+
+    def test_records_phases_and_slowest(self):
+        # Before
+        profiler = Profiler()
+        profiler.enable()
+
+        # Test
+        with profiler.measure("extract", "a.py"):
+            consumed = list(profiler.iterate("parse", "a.py", range, 3))
+        with profiler.measure("compose", "checkout"):
+            sum(range(100000))
+        profiler.disable()
+
+        # After
+        assert consumed == [0, 1, 2]
+        assert [record["phase"] for record in profiler.records] == [
+            "parse",
+            "extract",
+            "compose",
+        ]
+        assert profiler.phases()["compose"]["count"] == 1
+        assert profiler.slowest(top=1)[0]["item"] == "checkout"
+
+    def test_nested_memory_peaks(self):
+        # Before
+        profiler = Profiler()
+        profiler.enable(hook=ProfileHook.TRACEMALLOC)
+
+        # Test
+        with profiler.measure("outer"):
+            with profiler.measure("inner"):
+                block = bytearray(2_000_000)
+            del block
+        report = profiler.report()
+        profiler.disable()
+
+        # After
+        inner, outer = profiler.records
+        assert inner["traced_peak_bytes"] >= 2_000_000
+        assert outer["traced_peak_bytes"] >= inner["traced_peak_bytes"]
+        assert "allocations" in report
+
+    def test_cluster_reports_parse_and_extract(self):
+        # Before
+        profiler = profiling.profiler
+        profiler.enable()
+        self.addCleanup(profiler.disable)
+
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "checkout.py")
+            with open(path, "w") as file:
+                file.write(SOURCE)
+
+            # Test
+            list(Cluster(parser=CommentParser()).extract_files([path]))
+
+        # After
+        assert {record["phase"] for record in profiler.records} == {
+            "parse",
+            "extract",
+        }
+        assert all(record["item"] == path for record in profiler.records)
@@ -0,0 +1,66 @@
+from unittest import TestCase
+
+from clusterer import Flow
+from registry import FlowRegistry
+from settings.language import ClusterKeywords, Keywords
+
+
+def _flow(name: str, file: str, *tokens: str) -> Flow:
+    flow = Flow(name=name, file=file)
+    flow.tokens = list(tokens)
+    return flow
+
+
+class TestFlowRegistry(TestCase):
+    def setUp(self) -> None:
+        self.registry = FlowRegistry()
+        self.registry.add(
+            inner=[
+                _flow("notify", "notify.py", f"# {Keywords.ACTIVITY} send email"),
+                _flow("audit", "audit.py", f"# {Keywords.ACTIVITY} write log"),
+                _flow("notify", "copy.py", f"# {Keywords.ACTIVITY} send sms"),
+            ],
+            main=[
+                _flow(
+                    "payment",
+                    "pay.py",
+                    f"# {ClusterKeywords.INNER_FLOW} notify",
+                    f"# {ClusterKeywords.INNER_FLOW} audit",
+                    f"# {ClusterKeywords.INNER_FLOW} notify",
+                ),
+                _flow(
+                    "refund",
+                    "refund.py",
+                    f"# {ClusterKeywords.INNER_FLOW} audit",
+                    f"# {ClusterKeywords.INNER_FLOW} archive",
+                ),
+            ],
+        )
+
+    def test_resolves_references_once(self):
+        # Test
+        references = self.registry.references("payment")
+
+        # After
+        assert [flow.name for flow in references] == ["notify", "audit"]
+        assert references[0].file == "notify.py"
+
+    def test_reports_duplicates_and_missing(self):
+        # After
+        assert len(self.registry.duplicates) == 1
+        assert "copy.py" in self.registry.duplicates[0]
+        assert self.registry.missing("refund") == ["archive"]
+        assert self.registry.missing("payment") == []
+
+    def test_tracks_dependents(self):
+        # After
+        assert self.registry.dependents("audit") == {"payment", "refund"}
+        assert self.registry.dependents("archive") == {"refund"}
+        assert self.registry.dependents("unknown") == set()
+
+    def test_affected_by_changed_files(self):
+        # After
+        assert self.registry.affected(["notify.py"]) == {"payment"}
+        assert self.registry.affected(["audit.py"]) == {"payment", "refund"}
+        assert self.registry.affected(["refund.py"]) == {"refund"}
+        assert self.registry.affected(["other.py"]) == set()
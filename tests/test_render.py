@@ -0,0 +1,55 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from render import OutputFormat, Renderer, RenderJob
+
+SOURCE = "digraph { a -> b }"
+
+
+class TestRenderer(TestCase):
+    def setUp(self) -> None:
+        self._directory = tempfile.TemporaryDirectory()
+        self.root = self._directory.name
+
+    def tearDown(self) -> None:
+        self._directory.cleanup()
+
+    def _jobs(self) -> list[RenderJob]:
+        return [
+            RenderJob(source=SOURCE, output=os.path.join(self.root, "first.png")),
+            RenderJob(
+                source=SOURCE, output=os.path.join(self.root, "missing", "bad.png")
+            ),
+            RenderJob(source=SOURCE, output=os.path.join(self.root, "last.png")),
+        ]
+
+    def _assert_failure_is_isolated(self, jobs: int):
+        # Test
+        results = Renderer(jobs=jobs).render(self._jobs())
+
+        # After
+        assert [result.ok for result in results] == [True, False, True]
+        assert results[1].output.endswith("bad.png")
+        assert os.path.exists(os.path.join(self.root, "first.png"))
+        assert os.path.exists(os.path.join(self.root, "last.png"))
+
+    def test_serial_failure_is_isolated(self):
+        self._assert_failure_is_isolated(jobs=1)
+
+    def test_parallel_failure_is_isolated(self):
+        self._assert_failure_is_isolated(jobs=2)
+
+    def test_dot_format_writes_source_without_layout(self):
+        # Before
+        output = os.path.join(self.root, "graph.dot")
+
+        # Test
+        results = Renderer().render(
+            [RenderJob(source=SOURCE, output=output, format=OutputFormat.DOT)]
+        )
+
+        # After
+        assert results[0].ok
+        with open(output) as file:
+            assert file.read() == SOURCE
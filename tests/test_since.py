@@ -0,0 +1,131 @@
+import os
+import subprocess
+import threading
+
+from flow_tree import INNER, PAYMENT, REFUND, FlowTreeCase
+
+import main
+from changes import changes_since
+from client import FileFormat
+from daemon import RenderDaemon
+from discovery import FileDiscovery
+from render import OutputFormat
+
+
+class TestSince(FlowTreeCase):
+    def setUp(self) -> None:
+        super().setUp()
+        os.makedirs(self.out_path)
+
+        self._git("init", "-q")
+        for name, source in (
+            ("inner", INNER),
+            ("payment", PAYMENT),
+            ("refund", REFUND),
+            ("notes", "# nothing to draw\n"),
+        ):
+            self._write(name, source)
+        self._git("add", ".")
+        self._git("commit", "-q", "-m", "flows")
+
+        self.client.draw_epc(
+            self.out_path,
+            [
+                FileFormat(input_path=path)
+                for path in FileDiscovery().discover(self.root)
+            ],
+            output_format=OutputFormat.DOT,
+        )
+
+    def _git(self, *args: str):
+        subprocess.run(
+            ["git", "-c", "user.name=docupyt", "-c", "user.email=docupyt@localhost"]
+            + ["-C", self.root, *args],
+            check=True,
+        )
+
+    def _draw_since(self) -> list[str]:
+        results = self.client.draw_since(
+            self.out_path, self.root, "HEAD", output_format=OutputFormat.DOT
+        )
+        return sorted(os.path.basename(result.output) for result in results)
+
+    def test_lists_changed_renamed_and_untracked_files(self):
+        # Before
+        self._write("inner", INNER.replace("send email", "send sms"))
+        self._git("mv", "notes.py", "readme.py")
+        os.remove(os.path.join(self.root, "refund.py"))
+        self._write("new", REFUND)
+
+        # Test
+        changes = changes_since(self.root, "HEAD")
+
+        # After
+        names = {os.path.basename(path) for path in changes.changed}
+        assert names == {"inner.py", "readme.py", "new.py"}
+        assert {os.path.basename(path) for path in changes.removed} == {
+            "notes.py",
+            "refund.py",
+        }
+        assert changes.previous[os.path.join(self.root, "readme.py")] == os.path.join(
+            self.root, "notes.py"
+        )
+
+    def test_inner_flow_change_redraws_the_main_diagrams_using_it(self):
+        # Before
+        self._write("inner", INNER.replace("send email", "send sms"))
+
+        # Test
+        rendered = self._draw_since()
+
+        # After
+        assert rendered == ["payment.dot"]
+        assert os.path.exists(os.path.join(self.out_path, "refund.dot"))
+
+    def test_outputs_of_deleted_flows_are_removed(self):
+        # Before
+        os.remove(os.path.join(self.root, "refund.py"))
+
+        # Test
+        rendered = self._draw_since()
+
+        # After
+        assert rendered == []
+        assert not os.path.exists(os.path.join(self.out_path, "refund.dot"))
+        assert os.path.exists(os.path.join(self.out_path, "payment.dot"))
+
+    def test_renamed_main_flow_is_drawn_under_its_new_name(self):
+        # Before
+        self._write("payment", PAYMENT.replace("payment", "checkout"))
+
+        # Test
+        rendered = self._draw_since()
+
+        # After
+        assert rendered == ["architecture.dot", "checkout.dot"]
+        assert not os.path.exists(os.path.join(self.out_path, "payment.dot"))
+        assert os.path.exists(os.path.join(self.out_path, "refund.dot"))
+
+    def test_since_is_not_sent_to_a_daemon(self):
+        # Before
+        self._write("inner", INNER.replace("send email", "send sms"))
+        daemon = RenderDaemon(self.client, port=0)
+        thread = threading.Thread(target=daemon.serve, daemon=True)
+        thread.start()
+
+        # Test
+        try:
+            main.app(
+                ["--path", self.root, "--out-path", self.out_path, "--since", "HEAD"]
+                + ["--daemon", "--port", str(daemon.server.server_address[1])]
+                + ["--parser", "comments", "--format", "dot", "--no-cache"],
+                standalone_mode=False,
+            )
+        finally:
+            daemon.shutdown()
+            thread.join()
+
+        # After
+        assert daemon._workspaces == {}
+        with open(os.path.join(self.out_path, "payment.dot")) as file:
+            assert "send sms" in file.read()
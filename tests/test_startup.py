@@ -0,0 +1,42 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from benchmarks.generator import TreeSpec, generate
+from benchmarks.startup import _run
+
+
+class TestStartup(TestCase):
+    def test_help_imports_no_phase_dependencies(self):
+        # Test
+        _, imports = _run(["--help"])
+
+        # After
+        assert "pygraphviz" not in imports
+        assert "code_tokenize" not in imports
+
+    def test_emitting_ir_does_not_import_graphviz(self):
+        # Before
+        with tempfile.TemporaryDirectory() as root:
+            source = os.path.join(root, "src")
+            generate(source, TreeSpec(files=2, directories=1))
+            ir_path = os.path.join(root, "flows.jsonl")
+
+            # Test
+            _, imports = _run(
+                [
+                    "--path",
+                    source,
+                    "--parser",
+                    "comments",
+                    "--out-path",
+                    os.path.join(root, "out"),
+                    "--emit-ir",
+                    ir_path,
+                ]
+            )
+
+            # After
+            assert os.path.exists(ir_path)
+            assert "pygraphviz" not in imports
+            assert "code_tokenize" not in imports
@@ -0,0 +1,64 @@
+import os
+import tempfile
+from parser.doctree_parser import CommentParser
+from unittest import TestCase
+
+from cache import FlowSpill
+from clusterer import Cluster
+from settings.language import ClusterKeywords, Keywords
+
+SOURCE = f"""
+x = 1  # a plain comment
+# {ClusterKeywords.MAIN_CLUSTER} payment
+# {Keywords.ACTIVITY} charge card
+# {ClusterKeywords.END_MAIN_CLUSTER}
+"""
+
+
+class TestStreaming(TestCase):
+    def setUp(self) -> None:
+        self._directory = tempfile.TemporaryDirectory()
+        self.file = os.path.join(self._directory.name, "payment.py")
+        with open(self.file, "w") as file:
+            file.write(SOURCE)
+
+    def tearDown(self) -> None:
+        self._directory.cleanup()
+
+    def test_clusters_do_not_share_flows(self):
+        # Before
+        first = Cluster(parser=CommentParser())
+        first.extract_flows([self.file])
+
+        # Test
+        second = Cluster(parser=CommentParser())
+
+        # After
+        assert len(first._main_flows) == 1
+        assert second._main_flows == []
+
+    def test_spilled_tokens_read_back(self):
+        # Before
+        spill = FlowSpill()
+
+        # Test
+        first = spill.write(["a", "b"])
+        second = spill.write(["c"])
+
+        # After
+        assert list(first) == ["a", "b"]
+        assert list(second) == ["c"]
+        assert len(first) == 2
+        assert first[1] == "b"
+
+    def test_spilled_flows_keep_only_keyword_tokens(self):
+        # Before
+        cluster = Cluster(parser=CommentParser(), spill=FlowSpill())
+
+        # Test
+        cluster.extract_flows([self.file])
+
+        # After
+        (flow,) = cluster._main_flows
+        assert "a plain comment" not in " ".join(flow.tokens)
+        assert any(Keywords.ACTIVITY in token for token in flow.tokens)
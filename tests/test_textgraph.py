@@ -0,0 +1,144 @@
+from unittest import TestCase
+
+from pygraphviz import AGraph
+
+from client import DocupytClient
+from compose import Composer
+from ir import ComposedDiagram
+from render import OutputFormat
+from settings.language import ContextKeywords, Keywords
+from textgraph import DotGraph, MermaidGraph, PlantUMLGraph, TextGraph
+
+FLOW = [
+    f"# {Keywords.ACTIVITY} charge card {ContextKeywords.DATABASE} payments"
+    f" {ContextKeywords.API_CALL_OUT} bank",
+    f"# {Keywords.IF} card accepted",
+    f"# {Keywords.EVENT} paid",
+    f"# {Keywords.ELSE} {Keywords.EVENT} declined",
+    f"# {Keywords.ENDIF}",
+    f"# {Keywords.ACTIVITY} send receipt",
+]
+INNER = [f"# {Keywords.ACTIVITY} send email {ContextKeywords.DATABASE} mails"]
+
+
+def _composed() -> ComposedDiagram:
+    composer = Composer()
+    return ComposedDiagram(
+        diagram=composer.compose(parsed=FLOW, name="payment"),
+        inner=[composer.compose(parsed=INNER, name="notify")],
+    )
+
+
+def _shape(graph: AGraph) -> tuple:
+    nodes = sorted((node, sorted(graph.get_node(node).attr.items())) for node in graph)
+    subgraphs = sorted(
+        (subgraph.name, sorted(subgraph.nodes())) for subgraph in graph.subgraphs()
+    )
+    return nodes, sorted(graph.edges()), subgraphs
+
+
+class TestTextGraph(TestCase):
+    def test_dot_text_describes_the_same_graph_as_agraph(self):
+        # Before
+        client = DocupytClient()
+
+        # Test
+        text = client._source(_composed(), OutputFormat.DOT)
+        agraph = client._source(_composed(), OutputFormat.SVG)
+
+        # After
+        assert _shape(AGraph(string=text)) == _shape(AGraph(string=agraph))
+
+    def test_edges_are_added_once(self):
+        # Before
+        graph = DotGraph()
+
+        # Test
+        graph.add_edge("a", "b")
+        graph.add_edge("a", "b")
+
+        # After
+        assert graph.string().count('"a" -> "b"') == 1
+
+    def test_mermaid_flowchart(self):
+        # Test
+        text = DocupytClient()._source(_composed(), OutputFormat.MERMAID)
+
+        # After
+        assert text.startswith("flowchart TD\n")
+        assert '[["API CALL<br/>→ bank"]]' in text
+        assert '[("payments")]' in text
+        assert 'subgraph s0["notify"]' in text
+
+    def test_plantuml_activity(self):
+        # Before
+        graph = PlantUMLGraph()
+        graph.add_node("charge card")
+        graph.add_edge("charge card", "paid")
+        graph.add_node("alone")
+
+        # Test
+        text = graph.string()
+
+        # After
+        assert text.splitlines() == [
+            "@startuml",
+            '(*) --> "charge card" as n0',
+            '(*) --> "alone" as n2',
+            'n0 --> "paid" as n1',
+            "@enduml",
+        ]
+
+    def test_plantuml_inner_flow_is_written_in_its_partition(self):
+        # Before
+        graph = PlantUMLGraph()
+        graph.add_edge("charge card", "paid")
+        graph.add_subgraph(name="notify", label="notify")
+        graph.get_subgraph("notify").add_edge("send", "log")
+        graph.add_subgraph(name="audit", label="audit")
+        graph.get_subgraph("audit").add_node("record")
+
+        # Test
+        text = graph.string()
+
+        # After
+        assert text.splitlines() == [
+            "@startuml",
+            '(*) --> "charge card" as n0',
+            'n0 --> "paid" as n1',
+            'partition "notify" {',
+            '  (*) --> "send" as n2',
+            '  n2 --> "log" as n3',
+            "}",
+            'partition "audit" {',
+            '  (*) --> "record" as n4',
+            "}",
+            "@enduml",
+        ]
+
+    def test_plantuml_draws_inner_diagrams_in_partitions(self):
+        # Test
+        text = DocupytClient()._source(_composed(), OutputFormat.PLANTUML)
+
+        # After
+        lines = text.splitlines()
+        start = lines.index('partition "notify" {')
+        assert '"send email" as' in lines[start + 1]
+        assert not any("send email" in line for line in lines[:start])
+
+    def test_only_known_nodes_join_a_subgraph(self):
+        # Before
+        graph = MermaidGraph()
+        graph.add_node("a")
+
+        # Test
+        subgraph = graph.add_subgraph(["a", "b"], name="group", label="group")
+
+        # After
+        assert list(subgraph.members) == ["a"]
+        assert graph.nodes() == ["a"]
+
+    def test_text_graph_needs_a_backend(self):
+        # Test
+        with self.assertRaises(TypeError):
+            TextGraph()
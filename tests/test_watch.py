@@ -0,0 +1,78 @@
+import os
+import time
+
+from flow_tree import INNER, PAYMENT, REFUND, FlowTreeCase
+
+from render import OutputFormat
+from watch import Watcher, WatchSession
+
+
+class TestWatch(FlowTreeCase):
+    def setUp(self) -> None:
+        super().setUp()
+        os.makedirs(self.out_path)
+        for name, source in (
+            ("inner", INNER),
+            ("payment", PAYMENT),
+            ("refund", REFUND),
+        ):
+            self._write(name, source)
+
+        self.session = WatchSession(
+            self.client, self.out_path, output_format=OutputFormat.DOT
+        )
+        self.watcher = Watcher(self.root, self.session)
+
+    def _rendered(self, results) -> list[str]:
+        return sorted(os.path.basename(result.output) for result in results)
+
+    def test_first_update_renders_everything(self):
+        # Test
+        results = self.session.update(changed=list(self.watcher.snapshot()))
+
+        # After
+        assert self._rendered(results) == [
+            "architecture.dot",
+            "payment.dot",
+            "refund.dot",
+        ]
+
+    def test_redraws_only_affected_diagrams(self):
+        # Before
+        self.session.update(changed=list(self.watcher.snapshot()))
+        changed = self._write("inner", INNER.replace("send email", "send sms"))
+
+        # Test
+        results = self.session.update(changed=[changed])
+
+        # After
+        assert self._rendered(results) == ["payment.dot"]
+        with open(os.path.join(self.out_path, "payment.dot")) as file:
+            assert "send sms" in file.read()
+
+    def test_removed_files_drop_their_diagrams(self):
+        # Before
+        self.session.update(changed=list(self.watcher.snapshot()))
+        removed = os.path.join(self.root, "refund.py")
+        os.remove(removed)
+
+        # Test
+        results = self.session.update(changed=[], removed=[removed])
+
+        # After
+        assert self._rendered(results) == []
+        assert not os.path.exists(os.path.join(self.out_path, "refund.dot"))
+
+    def test_poll_reports_changed_and_removed_files(self):
+        # Before
+        self.watcher._snapshot = self.watcher.snapshot()
+        time.sleep(0.01)
+        changed = self._write("payment", PAYMENT + "\n")
+        os.remove(os.path.join(self.root, "refund.py"))
+
+        # Test
+        found, removed = self.watcher._poll()
+
+        # After
+        assert found == {changed}
+        assert removed == {os.path.join(self.root, "refund.py")}
@@ -0,0 +1,266 @@
+"""
+Graphs written as text for a viewer to lay out, without Graphviz.
+
+The diagrams are drawn through the part of the pygraphviz `AGraph`
+interface they use: `add_node`, `add_edge`, `add_subgraph`, `get_subgraph`
+and `string`. `TextGraph` records those calls and each backend writes the
+recorded graph in its own language:
+
+    DotGraph       Graphviz DOT, the same graph `AGraph` writes
+    MermaidGraph   Mermaid flowchart
+    PlantUMLGraph  PlantUML activity diagram
+"""
+import html
+import re
+from abc import ABC, abstractmethod
+from typing import Iterable, Iterator, Optional
+
+_TAGS = re.compile(r"<[^>]*>")
+_CELLS = re.compile(r"<td[^>]*>(.*?)</td>", re.DOTALL)
+
+
+def _is_html(value: str) -> bool:
+    return value.startswith("<") and value.endswith(">")
+
+
+def plain_label(label: str) -> list[str]:
+    """The lines of a label, with the cells of an HTML table as lines."""
+    if not _is_html(label):
+        return [label]
+
+    cells = _CELLS.findall(label) or [label]
+    lines = [html.unescape(" ".join(_TAGS.sub("", cell).split())) for cell in cells]
+    return [line for line in lines if line]
+
+
+class TextGraph(ABC):
+    def __init__(
+        self,
+        name: Optional[str] = None,
+        root: Optional["TextGraph"] = None,
+        directed: bool = True,
+        **attributes,
+    ) -> None:
+        self.name = name
+        self.directed = directed
+        self.attributes = {key: str(value) for key, value in attributes.items()}
+        self._root = root or self
+        # node attributes and edges are kept by the root graph, membership by
+        # each graph
+        self._node_attributes: dict[str, dict[str, str]] = {}
+        self._edges: set[tuple[str, str]] = set()
+        self.members: dict[str, None] = {}
+        self.edges: list[tuple[str, str]] = []
+        self.subgraphs: dict[str, "TextGraph"] = {}
+
+    def add_node(self, node, **attributes):
+        node = str(node)
+        known = self._root._node_attributes.setdefault(node, {})
+        known.update({key: str(value) for key, value in attributes.items()})
+        self.members[node] = None
+
+    def add_edge(self, tail, head):
+        # like AGraph, an edge without a key is only added once
+        edge = (str(tail), str(head))
+        if edge in self._root._edges:
+            return
+
+        self.add_node(tail)
+        self.add_node(head)
+        self._root._edges.add(edge)
+        self.edges.append(edge)
+
+    def add_subgraph(self, nbunch: Iterable = (), name: str = None, **attributes):
+        """Like AGraph, only nodes already in the graph join the subgraph."""
+        subgraph = type(self)(name=name, root=self._root, **attributes)
+        for node in map(str, nbunch or ()):
+            if node in self._root._node_attributes:
+                subgraph.add_node(node)
+        self.subgraphs[name] = subgraph
+        return subgraph
+
+    def get_subgraph(self, name: str) -> Optional["TextGraph"]:
+        return self.subgraphs.get(name)
+
+    def node_attributes(self, node: str) -> dict[str, str]:
+        return self._root._node_attributes.get(node, {})
+
+    def label(self, node: str, separator: str = "\n") -> str:
+        label = self.node_attributes(node).get("label", node)
+        return separator.join(plain_label(label))
+
+    def nodes(self) -> list[str]:
+        return list(self._root._node_attributes)
+
+    def walk(self) -> Iterator["TextGraph"]:
+        """This graph and every subgraph in it, parents first."""
+        stack = [self]
+        while stack:
+            graph = stack.pop()
+            yield graph
+            stack.extend(reversed(list(graph.subgraphs.values())))
+
+    @abstractmethod
+    def string(self) -> str:
+        pass
+
+
+def _quote(value: str) -> str:
+    if _is_html(value):
+        return value
+
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+class DotGraph(TextGraph):
+    def _attributes(self, attributes: dict[str, str]) -> str:
+        return ", ".join(f"{key}={_quote(value)}" for key, value in attributes.items())
+
+    def _lines(self, indent: str) -> Iterator[str]:
+        if self.attributes:
+            yield f"{indent}graph [{self._attributes(self.attributes)}];"
+
+        # act: subgraphs only list their nodes, the root sets the attributes
+        root = self is self._root
+        for node in self.nodes() if root else self.members:
+            if root:
+                attributes = self.node_attributes(node)
+                yield f"{indent}{_quote(node)}" + (
+                    f" [{self._attributes(attributes)}];" if attributes else ";"
+                )
+            else:
+                yield f"{indent}{_quote(node)};"
+
+        for subgraph in self.subgraphs.values():
+            yield f"{indent}subgraph {_quote(subgraph.name)} {{"
+            yield from subgraph._lines(indent + "\t")
+            yield f"{indent}}}"
+
+        arrow = "->" if self.directed else "--"
+        for tail, head in self.edges:
+            yield f"{indent}{_quote(tail)} {arrow} {_quote(head)};"
+
+    def string(self) -> str:
+        kind = "digraph" if self.directed else "graph"
+        return "\n".join([f"{kind} {{", *self._lines("\t"), "}"]) + "\n"
+
+
+_MERMAID_SHAPES = {
+    "polygon": '["{}"]',
+    "octagon": '{{{{"{}"}}}}',
+    "cylinder": '[("{}")]',
+    "component": '[["{}"]]',
+    "ellipse": '(("{}"))',
+}
+
+
+class MermaidGraph(TextGraph):
+    def _ids(self) -> dict[str, str]:
+        return {node: f"n{index}" for index, node in enumerate(self.nodes())}
+
+    def _node(self, node: str, id: str) -> Iterator[str]:
+        attributes = self.node_attributes(node)
+        label = self.label(node, "<br/>").replace('"', "#quot;")
+        shape = _MERMAID_SHAPES.get(attributes.get("shape", "ellipse"), '["{}"]')
+        yield f"    {id}{shape.format(label)}"
+
+        style = []
+        if attributes.get("style") == "filled" and "color" in attributes:
+            style.append(f"fill:{attributes['color']}")
+        if "fontcolor" in attributes:
+            style.append(f"color:{attributes['fontcolor']}")
+        if style:
+            yield f"    style {id} {','.join(style)}"
+
+    def string(self) -> str:
+        ids = self._ids()
+        lines = ["flowchart TD"]
+        for node, id in ids.items():
+            lines += self._node(node, id)
+
+        # act: mermaid draws a node in the last subgraph listing it
+        labelled = [
+            subgraph
+            for subgraph in self.walk()
+            if subgraph is not self and subgraph.attributes.get("label")
+        ]
+        for index, subgraph in enumerate(labelled):
+            title = subgraph.attributes["label"].replace('"', "#quot;")
+            lines.append(f'    subgraph s{index}["{title}"]')
+            lines += [f"        {ids[node]}" for node in subgraph.members]
+            lines.append("    end")
+
+        for graph in self.walk():
+            lines += [f"    {ids[tail]} --> {ids[head]}" for tail, head in graph.edges]
+
+        return "\n".join(lines) + "\n"
+
+
+class PlantUMLGraph(TextGraph):
+    def _text(self, node: str) -> str:
+        return self.label(node, "\\n").replace('"', "'")
+
+    def _owners(self) -> tuple[dict[str, TextGraph], list[TextGraph]]:
+        """
+        The graph each node is written in: the last labelled subgraph listing
+        it, like mermaid, or this graph. The graphs are listed in order.
+        """
+        owners = {node: self for node in self.nodes()}
+        blocks = [self]
+        stack = [(self, self)]
+        while stack:
+            graph, owner = stack.pop()
+            if graph is not self and graph.attributes.get("label"):
+                owner = graph
+                blocks.append(graph)
+            for node in graph.members:
+                owners[node] = owner
+            stack.extend(
+                (subgraph, owner) for subgraph in reversed(graph.subgraphs.values())
+            )
+
+        return owners, blocks
+
+    def string(self) -> str:
+        ids = {node: f"n{index}" for index, node in enumerate(self.nodes())}
+        named = set()
+
+        def mention(node: str) -> str:
+            if node in named:
+                return ids[node]
+
+            named.add(node)
+            return f'"{self._text(node)}" as {ids[node]}'
+
+        owners, blocks = self._owners()
+        edges = [edge for graph in self.walk() for edge in graph.edges]
+        heads = {head for _, head in edges}
+
+        lines = ["@startuml"]
+        for block in blocks:
+            # act: nodes nothing leads to start the diagram, so none is left out
+            block_lines = [
+                f"(*) --> {mention(node)}"
+                for node in ids
+                if owners[node] is block and node not in heads
+            ]
+            block_lines += [
+                f"{mention(tail)} --> {mention(head)}"
+                for tail, head in edges
+                if owners[tail] is block and owners[head] is block
+            ]
+            if block is self:
+                lines += block_lines
+            elif block_lines:
+                lines.append(f'partition "{block.attributes["label"]}" {{')
+                lines += [f"  {line}" for line in block_lines]
+                lines.append("}")
+
+        # act: edges between partitions are written after all of them
+        lines += [
+            f"{mention(tail)} --> {mention(head)}"
+            for tail, head in edges
+            if owners[tail] is not owners[head]
+        ]
+        lines.append("@enduml")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,197 @@
+import os
+import time
+from functools import cache
+from typing import Callable, Iterable, Optional
+
+from client import DocupytClient
+from clusterer import Cluster, FileFlows, FlowExtractionError
+from discovery import FileDiscovery
+from ir import DiagramEntry
+from logs import log
+from registry import FlowRegistry
+from render import OutputFormat, Renderer, RenderResult
+
+Snapshot = dict[str, tuple[int, int]]
+
+
+class WatchSession:
+    """
+    Keeps the flows of every watched file and the composed diagrams in
+    memory. An update extracts only the changed files again and redraws
+    the main diagrams they affect and the architecture graph.
+    """
+
+    def __init__(
+        self,
+        client: DocupytClient,
+        out_path: str,
+        jobs: int = 1,
+        output_format: OutputFormat = OutputFormat.PNG,
+    ) -> None:
+        self._client = client
+        self._out_path = out_path
+        self._jobs = jobs
+        self._output_format = output_format
+        self._renderer = Renderer(jobs=jobs)
+        self._cluster = Cluster(parser=client._parser, cache=client._cache)
+        self._flows: dict[str, FileFlows] = {}
+        self._registry = FlowRegistry()
+        self._entries: dict[str, DiagramEntry] = {}
+        self._drawn = client._cache.diagrams() if client._cache else {}
+
+    def _build_registry(self) -> FlowRegistry:
+        registry = FlowRegistry()
+        for flows in self._flows.values():
+            registry.add(inner=flows.inner, main=flows.main)
+
+        return registry
+
+    def _entry(self, registry: FlowRegistry, name: str) -> DiagramEntry:
+        entry = self._entries.get(name)
+        if entry is None:
+            entry = self._client._entry(registry, registry.main(name))
+            # act: keep the composed diagram until its flows change
+            entry.loader = cache(entry.loader)
+            self._entries[name] = entry
+
+        return entry
+
+    def entries(self) -> list[DiagramEntry]:
+        return [
+            self._entry(self._registry, flow.name)
+            for flow in self._registry.main_flows()
+        ]
+
+    def entry(self, name: str) -> Optional[DiagramEntry]:
+        if not self._registry.main(name):
+            return None
+
+        return self._entry(self._registry, name)
+
+    def refresh(self, changed: Iterable[str], removed: Iterable[str] = ()):
+        """Extracts the changed files and forgets the diagrams they affect."""
+        files = list(changed)
+        removed = list(removed)
+        extracted = dict(self._cluster.extract_files(files, jobs=self._jobs))
+        for file in removed:
+            self._flows.pop(file, None)
+        self._flows.update(extracted)
+
+        touched = files + removed
+        previous, self._registry = self._registry, self._build_registry()
+        for name in previous.affected(touched) | self._registry.affected(touched):
+            self._entries.pop(name, None)
+
+    def render(self, name: Optional[str] = None) -> list[RenderResult]:
+        """Draws every diagram and the architecture, or only the diagram `name`."""
+        if name is None:
+            entries, scope = self.entries(), None
+        else:
+            entries, scope = [self.entry(name)], {name}
+
+        results, self._drawn = self._client._render(
+            self._out_path,
+            entries,
+            self._renderer,
+            self._output_format,
+            self._drawn,
+            scope=scope,
+            draw_architecture=name is None,
+        )
+
+        if self._client._cache:
+            self._client._cache.save_diagrams(self._drawn)
+
+        return results
+
+    def update(
+        self, changed: Iterable[str], removed: Iterable[str] = ()
+    ) -> list[RenderResult]:
+        self.refresh(changed, removed)
+        return self.render()
+
+
+class Watcher:
+    """
+    Polls the files under a directory and hands the files that changed to
+    a `WatchSession`. Changes are collected until no file changed for
+    `debounce` seconds, so a burst of saves is handled as one update.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        session: WatchSession,
+        discovery: FileDiscovery = None,
+        interval: float = 0.2,
+        debounce: float = 0.1,
+    ) -> None:
+        self._root = root
+        self._session = session
+        self._discovery = discovery or FileDiscovery()
+        self._interval = interval
+        self._debounce = debounce
+        self._snapshot: Snapshot = {}
+
+    def snapshot(self) -> Snapshot:
+        files = {}
+        for path in self._discovery.discover(self._root):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files[path] = (stat.st_mtime_ns, stat.st_size)
+
+        return files
+
+    def _poll(self) -> tuple[set[str], set[str]]:
+        current = self.snapshot()
+        changed = {
+            path for path, stamp in current.items() if self._snapshot.get(path) != stamp
+        }
+        removed = set(self._snapshot) - set(current)
+        self._snapshot = current
+        return changed, removed
+
+    def _settle(self, changed: set[str], removed: set[str]):
+        quiet_since = time.monotonic()
+        while time.monotonic() - quiet_since < self._debounce:
+            time.sleep(self._debounce / 4)
+            more_changed, more_removed = self._poll()
+            if more_changed or more_removed:
+                quiet_since = time.monotonic()
+
+            changed |= more_changed
+            changed -= more_removed
+            removed |= more_removed
+            removed -= more_changed
+
+    def run(self, stop: Optional[Callable[[], bool]] = None):
+        self._snapshot = self.snapshot()
+        self._session.update(changed=list(self._snapshot))
+        log.info(msg=f"Watching {self._root} for changes.")
+
+        try:
+            while not (stop and stop()):
+                time.sleep(self._interval)
+                changed, removed = self._poll()
+                if not changed and not removed:
+                    continue
+
+                self._settle(changed, removed)
+                started = time.monotonic()
+                try:
+                    self._session.update(
+                        changed=sorted(changed), removed=sorted(removed)
+                    )
+                except FlowExtractionError as error:
+                    # act: keep watching, the next save tries again
+                    log.error(msg=str(error))
+                    continue
+
+                log.info(
+                    msg=f"Updated {len(changed) + len(removed)} files"
+                    f" in {(time.monotonic() - started) * 1000:.0f} ms."
+                )
+        except KeyboardInterrupt:
+            pass